@@ -0,0 +1,76 @@
+import os
+import argparse
+import polars as pl
+from benchmarks import run_benchmarks
+
+# ==== Paths ====
+file_path = os.path.dirname(__file__)
+project_path = os.path.abspath(os.path.join(file_path, "../../"))
+data_path = os.path.join(project_path, "data")
+run_script_path = os.path.join(project_path, "run", "data_prep", "data_prep_run.py")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the data prep and modeling stages on synthetic data."
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Approximate rows of the synthetic throw_home_runner_on_<base> data.",
+    )
+    parser.add_argument(
+        "--bases",
+        nargs="+",
+        default=["third"],
+        choices=["third", "second", "first"],
+        help="Bases of the runner of interest.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed calls per stage.",
+    )
+    parser.add_argument(
+        "--model-max-rows",
+        type=int,
+        default=1_000_000,
+        help="Skip the model_prep_on_base benchmark above this many prepared rows.",
+    )
+    parser.add_argument(
+        "--skip-full-flow",
+        action="store_true",
+        help="Do not time the full data_prep_run.py flow.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=os.path.join(data_path, "benchmarks", "synthetic"),
+        help="Directory of the synthetic data, one sub directory per scale.",
+    )
+    parser.add_argument(
+        "--results-path",
+        default=os.path.join(data_path, "benchmarks", "benchmark_results.parquet"),
+        help="Parquet file the results are appended to, tagged with the git commit.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=123,
+        help="Random seed of the synthetic data.",
+    )
+    args = parser.parse_args()
+
+    results_pl = run_benchmarks(work_dir = args.work_dir,
+                                scales = args.scales,
+                                bases = args.bases,
+                                repeats = args.repeats,
+                                model_max_rows = args.model_max_rows,
+                                run_script_path = None if args.skip_full_flow else run_script_path,
+                                results_path = args.results_path,
+                                seed = args.seed)
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(results_pl.select(["scale", "base", "stage", "rows_in", "min_s", "median_s"]))
@@ -0,0 +1,60 @@
+import os
+import argparse
+import polars as pl
+from benchmarks import benchmark_oversampling
+
+# ==== Paths ====
+file_path = os.path.dirname(__file__)
+project_path = os.path.abspath(os.path.join(file_path, "../../"))
+data_path = os.path.join(project_path, "data")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark FastSMOTE against imblearn's SMOTE on synthetic training matrices."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[100_000, 500_000],
+        help="Training rows.",
+    )
+    parser.add_argument(
+        "--features",
+        type=int,
+        nargs="+",
+        default=[10, 40],
+        help="Columns of the training matrix after preprocessing.",
+    )
+    parser.add_argument(
+        "--n-probes",
+        type=int,
+        nargs="+",
+        default=[2, 4, 8],
+        help="Lists searched by the approximate neighbors.",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed calls per method.",
+    )
+    parser.add_argument(
+        "--results-path",
+        default=os.path.join(data_path, "benchmarks", "oversampling_results.parquet"),
+        help="Parquet file the results are written to.",
+    )
+    args = parser.parse_args()
+
+    results_pl = benchmark_oversampling(n_rows = args.rows,
+                                        n_features = args.features,
+                                        n_probes = args.n_probes,
+                                        repeats = args.repeats)
+
+    os.makedirs(os.path.dirname(args.results_path), exist_ok=True)
+    results_pl.write_parquet(args.results_path)
+    print(f"Saved oversampling benchmark to: {args.results_path}")
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(results_pl)
@@ -0,0 +1,56 @@
+import os
+import argparse
+import polars as pl
+from benchmarks import benchmark_scoring
+
+# ==== Paths ====
+file_path = os.path.dirname(__file__)
+project_path = os.path.abspath(os.path.join(file_path, "../../"))
+data_path = os.path.join(project_path, "data")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the per play latency of a saved model artifact."
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        required=True,
+        help="Directory of a model artifact from save_model_artifact.",
+    )
+    parser.add_argument(
+        "--source",
+        default=os.path.join(data_path, "throw_home_runner_wide_sprint_arm", "base=third"),
+        help="on_base parquet file or base=<base> directory the plays are sampled from.",
+    )
+    parser.add_argument(
+        "--n-requests",
+        type=int,
+        default=1000,
+        help="Plays scored per method.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Concurrent HTTP clients of each server run.",
+    )
+    parser.add_argument(
+        "--results-path",
+        default=os.path.join(data_path, "benchmarks", "scoring_results.parquet"),
+        help="Parquet file the results are written to.",
+    )
+    args = parser.parse_args()
+
+    results_pl = benchmark_scoring(artifact_dir = args.artifact_dir,
+                                   source = args.source,
+                                   n_requests = args.n_requests,
+                                   concurrency = args.concurrency)
+
+    os.makedirs(os.path.dirname(args.results_path), exist_ok=True)
+    results_pl.write_parquet(args.results_path)
+    print(f"Saved scoring benchmark to: {args.results_path}")
+
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        print(results_pl)
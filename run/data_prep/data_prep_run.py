@@ -1,10 +1,18 @@
 import polars as pl
 from pathlib import Path
 import os
+import io
 import glob
-from data_prep import (pivot_on_fielder, game_state_filter, get_sprint_data, 
-                       merge_sprint_by_position, prep_arm_strength, merge_arm_strength_by_position,
-                       create_is_successful)
+import time
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from data_prep import (pivot_on_fielder, game_state_filter, get_sprint_data,
+                       merge_sprint_by_position, prep_arm_strength, merge_by_positions,
+                       create_is_successful, write_on_base, write_on_base_dataset,
+                       scan_on_base, StageCache, PipelineProfiler)
 from data_eng import fielder_distance
 
 # ==== Data Paths ====
@@ -15,101 +23,313 @@ file_path = os.path.dirname(__file__)
 project_path = os.path.abspath(os.path.join(file_path, "../../"))
 data_path = os.path.join(project_path, "data")
 
-# Get available running datasets
-on_base_paths = []
-for base in pos_dict.keys():
-    on_base_path = os.path.join(data_path, f"throw_home_runner_on_{base}.parquet")   
-    if os.path.exists(on_base_path):
-        on_base_paths.append(on_base_path)
 
+def prep_on_base(on_base_path: str, sprint_ipc_path: str, arm_ipc_path: str,
+                 max_lookback_years: int = 1, stage_cache: StageCache = None,
+                 report_dir: str = None, output_options: dict = None):
+    """
+    Run the full preparation pipeline for one throw_home_runner_on_<base> dataset. Runs inside a
+    worker process. The shared sprint and arm strength tables are memory mapped from Arrow IPC
+    files written once by the parent process, so they are not copied per worker.
 
-# Get available arm_strength datasets
-arm_strength_paths = glob.glob(os.path.join(data_path, "arm_strength_*.csv"))
+    Args:
+        on_base_path (str): Path to throw_home_runner_on_<base>.parquet
+        sprint_ipc_path (str): Path to the materialized sprint data Arrow IPC file
+        arm_ipc_path (str): Path to the materialized arm strength data Arrow IPC file
+        max_lookback_years (int, optional): Seasons before the game year used as a fallback
+        stage_cache (StageCache, optional): Checkpoint cache for the stage outputs
+        report_dir (str, optional): Profile each stage and write the run report to this directory
+        output_options (dict, optional): Output layout with the keys layout ("partitioned" or
+            "file"), compression, row_group_size and csv. Defaults to one zstd parquet file,
+            throw_home_runner_on_<base>_wide_sprint_arm.parquet, as read by the notebooks.
+    Returns:
+        tuple: base name, worker process ID, elapsed seconds, and the worker log text
+    """
+    start_time = time.perf_counter()
+    log_buffer = io.StringIO()
 
-# Check if path lists are empty
-if not on_base_paths:
-    raise ValueError(f"throw_home_runner_on_<base>.parquet files not found at: {data_path}")
+    if stage_cache is None:
+        stage_cache = StageCache(cache_dir = "", enabled = False)
 
-if not arm_strength_paths:
-    raise ValueError(f"arm_strenth_<year>.csv not found at: {data_path}")
+    output_options = {"layout": "file", "compression": "zstd", "row_group_size": 100_000,
+                      "csv": False, **(output_options or {})}
 
-# ==== Download and Prepare Supplimental Data, Sprint and Arm Stength ====
+    with contextlib.redirect_stdout(log_buffer):
+        sprint_lf = pl.scan_ipc(sprint_ipc_path, memory_map=True)
+        arm_lf = pl.scan_ipc(arm_ipc_path, memory_map=True)
 
-sprint_lf = get_sprint_data(year_start = 2020)
-arm_lf = prep_arm_strength(arm_strength_paths)
-# print("\n".join(arm_lf.collect_schema()))
+        # Get base of interest from file name
+        file_name = os.path.basename(on_base_path)
+        base = str(file_name.split("_")[-1].split(".")[0])
+        print(f"Processing runner on {base} data at: {on_base_path}")
 
-# ==== Prepare on_base data ====
+        # Stage timings, row counts, memory and plans
+        profiler = PipelineProfiler(label = base, enabled = report_dir is not None)
 
-on_base_lf_list = list()
+        # Scan on_base data lazily so filters and projections are pushed down to the file
+        on_base_lf = pl.scan_parquet(on_base_path)
 
-for on_base_path in on_base_paths:
-    # Get base of interest from file name
-    file_name = os.path.basename(on_base_path)
-    base = str(file_name.split("_")[-1].split(".")[0])
-    print(f"Processing runner on {base} data at: {on_base_path}")
+        # Filter for less than 2 outs before widening. The game state is the same on every row
+        # of a play, so filtering the long data is equivalent and shrinks the pivot.
+        on_base_lf = profiler.run("game_state_filter", stage_cache.run, game_state_filter,
+                                  on_base_lf, input_paths = [on_base_path])
+        print(f"Filtered runner on {base} data for plays with less than one out")
 
-    # Read in on_base data
-    on_base_pl = pl.read_parquet(on_base_path)
-    # print("\n".join(on_base_pl.collect_schema()))
+        # Pivot fielder features wider
+        on_base_lf = profiler.run("pivot_on_fielder", stage_cache.run, pivot_on_fielder,
+                                  on_base_lf)
+        print(f"Widened runner on {base} by fielder features")
+        # print("\n".join(on_base_lf.collect_schema()))
 
-    # Pivot fielder features wider
-    on_base_lf = pivot_on_fielder(on_base_pl)
-    print(f"Widened runner on {base} by fielder features")
-    # print("\n".join(on_base_pl.collect_schema()))
+        # Correct Manny Pina's name to match Statcast
+        on_base_lf = on_base_lf.with_columns(
+            pl.col("runner_name").str.replace_all("Manny Pina", "Manny Piña").alias("runner_name"),
+            pl.col("fielder_name").str.replace_all("Manny Pina", "Manny Piña").alias("fielder_name")
+        )
 
-    # Filter for less than 2 outs
-    on_base_lf = game_state_filter(on_base_lf)
-    print(f"Filtered runner on {base} data for plays with less than one out")
+        # Get runner of interest player_id column name
+        position = pos_dict[base]
 
-    # Correct Manny Pina's name to match Statcast
-    on_base_lf = on_base_lf.with_columns(
-        pl.col("runner_name").str.replace_all("Manny Pina", "Manny Piña").alias("runner_name"),
-        pl.col("fielder_name").str.replace_all("Manny Pina", "Manny Piña").alias("fielder_name")
+        # Merge Sprint data for the runner of intereest
+        on_base_lf = profiler.run("merge_sprint_by_position", stage_cache.run,
+                                  merge_sprint_by_position,
+                                  on_base_lf = on_base_lf,
+                                  sprint_data_lf = sprint_lf,
+                                  position = position,
+                                  max_lookback_years = max_lookback_years,
+                                  input_paths = [sprint_ipc_path])
+
+        print(f"Merged Sprint data for runner on {base} by fielder features")
+        # print("\n".join(on_base_pl.collect_schema()))
+
+        # Merge arm strengths of all out fielders and the out fielder that caught the ball
+        on_base_lf = profiler.run("merge_arm_strength", stage_cache.run, merge_by_positions,
+                                  on_base_lf = on_base_lf,
+                                  player_data_lf = arm_lf,
+                                  positions = ["mlb_person_id_LF",
+                                               "mlb_person_id_CF",
+                                               "mlb_person_id_RF",
+                                               "fielder_mlb_person_id"],
+                                  max_lookback_years = max_lookback_years,
+                                  input_paths = [arm_ipc_path])
+
+        # Get fielder coordinates, fielder distance to home plate, fielder distance travled to catch
+        on_base_lf = profiler.run("fielder_distance", stage_cache.run, fielder_distance,
+                                  on_base_lf = on_base_lf,
+                                  home_coord_x = 0.0,
+                                  home_coord_y = 0.0)
+
+        print(f"Merged arm strength data for runner on {base} by fielder features")
+        # print("\n".join(on_base_pl.collect_schema()))
+
+        # Create target feature
+        on_base_lf = profiler.run("create_is_successful", stage_cache.run, create_is_successful,
+                                  on_base_lf)
+        print("Created Target Feature Successful Sac Fly")
+
+        # Save engineered on_base data next to the input. The lazy plan is executed once.
+        output_dir = os.path.dirname(on_base_path)
+        mod_file_name = f"throw_home_runner_on_{base}_wide_sprint_arm"
+        if output_options["layout"] == "partitioned":
+            # Partition by base and season so scans filtering either skip the other files
+            dataset_dir = os.path.join(output_dir, "throw_home_runner_wide_sprint_arm")
+            profiler.run("write_on_base_dataset", write_on_base_dataset,
+                         on_base_lf = on_base_lf.with_columns(pl.lit(base).alias("base")),
+                         dataset_dir = dataset_dir,
+                         partition_by = ["base", "year"],
+                         sort_by = ["game_date", "play_id"],
+                         compression = output_options["compression"],
+                         row_group_size = output_options["row_group_size"])
+            print(f"Saved partitioned data to: {dataset_dir}")
+
+            # Export CSV from the written partitions instead of executing the plan again
+            if output_options["csv"]:
+                write_on_base(on_base_lf = scan_on_base(dataset_dir, bases = [base]),
+                              output_dir = output_dir,
+                              file_name = mod_file_name,
+                              formats = ["csv"])
+                print(f"Exported CSV to: {output_dir}")
+        else:
+            formats = ["parquet", "csv"] if output_options["csv"] else ["parquet"]
+            profiler.run("write_on_base", write_on_base,
+                         on_base_lf = on_base_lf,
+                         output_dir = output_dir,
+                         file_name = mod_file_name,
+                         formats = formats,
+                         compression = output_options["compression"],
+                         row_group_size = output_options["row_group_size"])
+            print(f"Saved data to: {output_dir}")
+
+        if profiler.enabled:
+            report_paths = profiler.write_report(report_dir, f"data_prep_report_{base}")
+            print(f"Saved stage report to: {report_paths}")
+
+    elapsed = time.perf_counter() - start_time
+
+    return base, os.getpid(), elapsed, log_buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare throw_home_runner_on_<base> data.")
+    parser.add_argument(
+        "--data-dir",
+        default=data_path,
+        help="Directory with the throw_home_runner_on_<base>.parquet and arm_strength_<year>.csv "
+             "files. Outputs are written to the same directory.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of bases processed concurrently. Defaults to one worker per base.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Read sprint data from the sprint cache directory without downloading.",
     )
+    parser.add_argument(
+        "--sprint-cache-dir",
+        default=None,
+        help="Directory of the per season sprint split parquet cache or offline fixtures. "
+             "Defaults to <data-dir>/sprint_cache.",
+    )
+    parser.add_argument(
+        "--max-lookback-years",
+        type=int,
+        default=1,
+        help="Seasons before the game year used when a player's sprint or arm data is missing.",
+    )
+    parser.add_argument(
+        "--stage-cache",
+        action="store_true",
+        help="Reuse cached stage outputs when the stage inputs, parameters and source are "
+             "unchanged.",
+    )
+    parser.add_argument(
+        "--stage-cache-dir",
+        default=None,
+        help="Directory of the cached stage outputs. Defaults to <data-dir>/stage_cache.",
+    )
+    parser.add_argument(
+        "--stage-cache-gb",
+        type=float,
+        default=10.0,
+        help="Size of the stage cache in GB before the least recently used outputs are evicted.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record time, rows, columns, peak memory and the plan of each stage.",
+    )
+    parser.add_argument(
+        "--report-dir",
+        default=None,
+        help="Directory of the --profile run reports. Defaults to <data-dir>/reports.",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=["file", "partitioned"],
+        default="file",
+        help="Write one parquet file per base, as read by the notebooks, or a dataset partitioned "
+             "by base and year for scan_on_base.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["zstd", "lz4", "snappy", "gzip", "brotli", "uncompressed"],
+        default="zstd",
+        help="Parquet compression of the output.",
+    )
+    parser.add_argument(
+        "--row-group-size",
+        type=int,
+        default=100_000,
+        help="Rows per parquet row group of the output.",
+    )
+    parser.add_argument(
+        "--csv",
+        action="store_true",
+        help="Also export throw_home_runner_on_<base>_wide_sprint_arm.csv.",
+    )
+    args = parser.parse_args()
 
-    # Get runner of interest player_id column name
-    position = pos_dict[base]
+    data_path = os.path.abspath(args.data_dir)
+    if args.sprint_cache_dir is None:
+        args.sprint_cache_dir = os.path.join(data_path, "sprint_cache")
+    if args.stage_cache_dir is None:
+        args.stage_cache_dir = os.path.join(data_path, "stage_cache")
+    if args.report_dir is None:
+        args.report_dir = os.path.join(data_path, "reports")
 
-    # Merge Sprint data for the runner of intereest
-    on_base_lf = merge_sprint_by_position(on_base_lf = on_base_lf,
-                                          sprint_data_lf = sprint_lf,
-                                          position = position)
+    stage_cache = StageCache(cache_dir = args.stage_cache_dir,
+                             max_cache_bytes = int(args.stage_cache_gb * 1024**3),
+                             enabled = args.stage_cache)
+    report_dir = args.report_dir if args.profile else None
+    output_options = {"layout": args.layout, "compression": args.compression,
+                      "row_group_size": args.row_group_size, "csv": args.csv}
 
-    print(f"Merged Sprint data for runner on {base} by fielder features")
-    # print("\n".join(on_base_pl.collect_schema()))
+    # Get available running datasets
+    on_base_paths = []
+    for base in pos_dict.keys():
+        on_base_path = os.path.join(data_path, f"throw_home_runner_on_{base}.parquet")
+        if os.path.exists(on_base_path):
+            on_base_paths.append(on_base_path)
 
-    # Merge arm strengths of all out fielders and the out fielder that caught the ball
-    on_base_lf = merge_arm_strength_by_position(on_base_lf = on_base_lf,
-                                   arm_strength_data_lf = arm_lf,
-                                   position = "mlb_person_id_LF")
 
-    on_base_lf = merge_arm_strength_by_position(on_base_lf = on_base_lf,
-                                   arm_strength_data_lf = arm_lf,
-                                   position = "mlb_person_id_CF")
+    # Get available arm_strength datasets
+    arm_strength_paths = glob.glob(os.path.join(data_path, "arm_strength_*.csv"))
 
-    on_base_lf = merge_arm_strength_by_position(on_base_lf = on_base_lf,
-                                   arm_strength_data_lf = arm_lf,
-                                   position = "mlb_person_id_RF")
+    # Check if path lists are empty
+    if not on_base_paths:
+        raise ValueError(f"throw_home_runner_on_<base>.parquet files not found at: {data_path}")
 
-    on_base_lf = merge_arm_strength_by_position(on_base_lf = on_base_lf,
-                                   arm_strength_data_lf = arm_lf,
-                                   position = "fielder_mlb_person_id")
+    if not arm_strength_paths:
+        raise ValueError(f"arm_strenth_<year>.csv not found at: {data_path}")
 
-    # Get fielder coordinates, fielder distance to home plate, fielder distance travled to catch
-    on_base_lf = fielder_distance(on_base_lf = on_base_lf,
-                                  home_coord_x = 0.0,
-                                  home_coord_y = 0.0)
+    workers = args.workers if args.workers is not None else len(on_base_paths)
+    if workers < 1:
+        raise ValueError(f"--workers must be at least 1, got: {workers}")
+    workers = min(workers, len(on_base_paths))
+
+    # ==== Download and Prepare Supplimental Data, Sprint and Arm Stength ====
+
+    sprint_lf = get_sprint_data(year_start = 2020,
+                                cache_dir = args.sprint_cache_dir,
+                                offline = args.offline)
+    arm_lf = prep_arm_strength(arm_strength_paths)
+    # print("\n".join(arm_lf.collect_schema()))
+
+    with tempfile.TemporaryDirectory(prefix="data_prep_") as shared_dir:
+        # Materialize the shared tables once so each worker memory maps the same Arrow buffers
+        sprint_ipc_path = os.path.join(shared_dir, "sprint.arrow")
+        arm_ipc_path = os.path.join(shared_dir, "arm_strength.arrow")
+        sprint_lf.collect().write_ipc(sprint_ipc_path, compression="uncompressed")
+        arm_lf.collect().write_ipc(arm_ipc_path, compression="uncompressed")
+        print(f"Materialized sprint and arm strength data for {workers} worker(s)")
 
-    print(f"Merged arm strength data for runner on {base} by fielder features")
-    # print("\n".join(on_base_pl.collect_schema()))
+        # ==== Prepare on_base data ====
 
-    # Create target feature
-    on_base_lf = create_is_successful(on_base_lf)
-    print("Created Target Feature Successful Sac Fly")
+        if workers == 1:
+            results = [
+                prep_on_base(path, sprint_ipc_path, arm_ipc_path, args.max_lookback_years,
+                             stage_cache, report_dir, output_options)
+                for path in on_base_paths
+            ]
+        else:
+            # Split the cores between workers so the Polars thread pools do not oversubscribe
+            os.environ.setdefault("POLARS_MAX_THREADS", str(max(1, os.cpu_count() // workers)))
+            # Spawn workers since forking a process after the Polars thread pool starts can deadlock
+            mp_context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+                futures = [
+                    executor.submit(prep_on_base, path, sprint_ipc_path, arm_ipc_path,
+                                    args.max_lookback_years, stage_cache, report_dir,
+                                    output_options)
+                    for path in on_base_paths
+                ]
+                results = [future.result() for future in futures]
 
-    # Save engineered on_base data as parquet and csv
-    mod_file_name = f"throw_home_runner_on_{base}_wide_sprint_arm"
-    on_base_lf.collect().write_parquet(os.path.join(data_path, f"{mod_file_name}.parquet"))
-    on_base_lf.collect().write_csv(os.path.join(data_path, f"{mod_file_name}.csv"))
-    print(f"Saved data to: {data_path}")
+    # Aggregate the worker logs by base
+    for base, pid, elapsed, log_text in results:
+        print(f"==== Runner on {base} (worker pid {pid}, {elapsed:.1f}s) ====")
+        print(log_text, end="")
@@ -0,0 +1,56 @@
+import os
+import argparse
+from models import batch_score
+
+# ==== Paths ====
+file_path = os.path.dirname(__file__)
+project_path = os.path.abspath(os.path.join(file_path, "../../"))
+data_path = os.path.join(project_path, "data")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score on_base parquet data with a saved model artifact in record batches."
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        required=True,
+        help="Directory of a model artifact from save_model_artifact.",
+    )
+    parser.add_argument(
+        "--source",
+        default=os.path.join(data_path, "throw_home_runner_wide_sprint_arm", "base=third"),
+        help="on_base parquet file or base=<base> directory of the partitioned dataset.",
+    )
+    parser.add_argument(
+        "--output-path",
+        default=os.path.join(data_path, "scores", "throw_home_runner_on_third_scores.parquet"),
+        help="Parquet file the probabilities are written to.",
+    )
+    parser.add_argument(
+        "--years",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Seasons to score. Defaults to every season.",
+    )
+    parser.add_argument(
+        "--id-cols",
+        nargs="+",
+        default=["game_id", "play_id"],
+        help="Columns identifying a play, copied to the output.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100_000,
+        help="Maximum rows per record batch.",
+    )
+    args = parser.parse_args()
+
+    batch_score(artifact_dir = args.artifact_dir,
+                source = args.source,
+                output_path = args.output_path,
+                id_cols = args.id_cols,
+                years = args.years,
+                batch_size = args.batch_size)
@@ -0,0 +1,43 @@
+import argparse
+from models import serve_model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve a saved model artifact over HTTP with a compiled predictor."
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        required=True,
+        help="Directory of a model artifact from save_model_artifact.",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Host name to listen on.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        help="Port to listen on.",
+    )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Maximum plays per batch.",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=0.0,
+        help="Longest a request waits for other requests to batch with.",
+    )
+    args = parser.parse_args()
+
+    serve_model(artifact_dir = args.artifact_dir,
+                host = args.host,
+                port = args.port,
+                max_batch_size = args.max_batch_size,
+                max_wait_ms = args.max_wait_ms)
@@ -0,0 +1,8 @@
+from .synthetic_data import generate_on_base
+from .synthetic_data import generate_arm_strength
+from .synthetic_data import generate_sprint_splits
+from .synthetic_data import generate_fixtures
+from .benchmark_pipeline import benchmark_stages
+from .benchmark_pipeline import run_benchmarks
+from .benchmark_oversampling import benchmark_oversampling
+from .benchmark_scoring import benchmark_scoring
@@ -0,0 +1,280 @@
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import polars as pl
+
+from benchmarks.synthetic_data import generate_fixtures
+from data_eng import fielder_distance
+from data_prep import (
+  game_state_filter,
+  get_sprint_data,
+  merge_arm_strength_by_position,
+  merge_by_positions,
+  merge_sprint_by_position,
+  pivot_on_fielder,
+  prep_arm_strength,
+)
+from models import create_model_pipeline, model_prep_on_base
+
+# Runner of interest player ID column by base
+RUNNER_POSITIONS = {
+  "third": "mlb_person_id_R3",
+  "second": "mlb_person_id_R2",
+  "first": "mlb_person_id_R1",
+}
+
+# Player ID columns merged with arm strength data
+ARM_POSITIONS = [
+  "mlb_person_id_LF",
+  "mlb_person_id_CF",
+  "mlb_person_id_RF",
+  "fielder_mlb_person_id",
+]
+
+
+def time_call(func: Callable, repeats: int = 3) -> Dict[str, float]:
+  """
+  Time a function call.
+
+  Args:
+      func (Callable): Function without arguments to time
+      repeats (int, optional): Number of timed calls
+  Returns:
+      dict: Minimum and median seconds of the calls
+  """
+  seconds = list()
+  for _ in range(repeats):
+    start_time = time.perf_counter()
+    func()
+    seconds.append(time.perf_counter() - start_time)
+  seconds = sorted(seconds)
+
+  return {"min_s": seconds[0], "median_s": seconds[len(seconds) // 2]}
+
+
+def benchmark_stages(
+  data_dir: str,
+  base: str = "third",
+  repeats: int = 3,
+  model_max_rows: int = 1_000_000,
+) -> List[Dict]:
+  """
+  Time each data prep stage and model_prep_on_base on a synthetic data directory from
+  generate_fixtures. Each stage is timed on the collected output of the stages before it, so a
+  timing only covers that stage.
+
+  Args:
+      data_dir (str): Directory from generate_fixtures
+      base (str, optional): Base of the runner of interest
+      repeats (int, optional): Number of timed calls per stage
+      model_max_rows (int, optional): Skip model_prep_on_base for larger inputs. None never skips.
+  Returns:
+      List[dict]: One record per stage with the stage name, input rows and timings
+  """
+  on_base_path = os.path.join(data_dir, f"throw_home_runner_on_{base}.parquet")
+  sprint_lf = get_sprint_data(
+    year_start=2020, cache_dir=os.path.join(data_dir, "sprint_cache"), offline=True
+  )
+  sprint_pl = sprint_lf.collect()
+  arm_pl = prep_arm_strength(
+    sorted(
+      os.path.join(data_dir, file_name)
+      for file_name in os.listdir(data_dir)
+      if file_name.startswith("arm_strength_") and file_name.endswith(".csv")
+    )
+  ).collect()
+  n_rows = pl.scan_parquet(on_base_path).select(pl.len()).collect().item()
+
+  records = list()
+
+  def add_record(stage: str, rows_in: int, func: Callable):
+    timings = time_call(func, repeats)
+    records.append({"stage": stage, "rows_in": rows_in, **timings})
+
+  # ==== Data prep stages ====
+  on_base_long_pl = game_state_filter(pl.scan_parquet(on_base_path)).collect()
+  add_record(
+    "pivot_on_fielder",
+    on_base_long_pl.height,
+    lambda: pivot_on_fielder(on_base_long_pl.lazy()).collect(),
+  )
+  wide_pl = pivot_on_fielder(on_base_long_pl.lazy()).collect()
+
+  position = RUNNER_POSITIONS[base]
+  add_record(
+    "merge_sprint_by_position",
+    wide_pl.height,
+    lambda: merge_sprint_by_position(wide_pl.lazy(), sprint_pl.lazy(), position).collect(),
+  )
+  sprint_merged_pl = merge_sprint_by_position(wide_pl.lazy(), sprint_pl.lazy(), position).collect()
+
+  add_record(
+    "merge_arm_strength_by_position_x4",
+    sprint_merged_pl.height,
+    lambda: _merge_arm_strength_each(sprint_merged_pl.lazy(), arm_pl.lazy()).collect(),
+  )
+  add_record(
+    "merge_by_positions",
+    sprint_merged_pl.height,
+    lambda: merge_by_positions(sprint_merged_pl.lazy(), arm_pl.lazy(), ARM_POSITIONS).collect(),
+  )
+  arm_merged_pl = merge_by_positions(
+    sprint_merged_pl.lazy(), arm_pl.lazy(), ARM_POSITIONS
+  ).collect()
+
+  add_record(
+    "fielder_distance",
+    arm_merged_pl.height,
+    lambda: fielder_distance(arm_merged_pl.lazy(), home_coord_x=0.0, home_coord_y=0.0).collect(),
+  )
+  prepared_pl = fielder_distance(
+    arm_merged_pl.lazy(), home_coord_x=0.0, home_coord_y=0.0
+  ).collect()
+
+  # ==== Modeling ====
+  if model_max_rows is None or prepared_pl.height <= model_max_rows:
+    add_record(
+      "model_prep_on_base", prepared_pl.height, lambda: _model_prep(prepared_pl.lazy(), base)
+    )
+
+  for record in records:
+    record.update({"base": base, "n_rows": n_rows})
+
+  return records
+
+
+def _merge_arm_strength_each(on_base_lf: pl.LazyFrame, arm_lf: pl.LazyFrame) -> pl.LazyFrame:
+  """
+  Arm strength merged one position at a time, for comparison with merge_by_positions.
+  """
+  for position in ARM_POSITIONS:
+    on_base_lf = merge_arm_strength_by_position(on_base_lf, arm_lf, position)
+  return on_base_lf
+
+
+def _model_prep(on_base_lf: pl.LazyFrame, base: str):
+  """
+  Small logistic regression grid search through model_prep_on_base.
+  """
+  num_predictors_drop = ["hang_time", "distance_catch_to_home"]
+  num_predictors_median = [
+    f"seconds_since_hit_085_{RUNNER_POSITIONS[base]}",
+    "arm_overall_fielder_mlb_person_id",
+  ]
+  grid_search = create_model_pipeline(
+    num_predictors_drop=num_predictors_drop,
+    num_predictors_median=num_predictors_median,
+    model_type="LogisticRegression",
+    oversampling_method="SMOTE",
+    param_grid={"classifier__C": [0.1, 1.0]},
+    cv=3,
+    verbose=False,
+  )
+  return model_prep_on_base(
+    on_base_lf=on_base_lf,
+    grid_search=grid_search,
+    responses=["is_out"],
+    num_predictors_drop=num_predictors_drop,
+    num_predictors_median=num_predictors_median,
+    verbose=False,
+  )
+
+
+def _run_data_prep(run_script_path: str, data_dir: str):
+  """
+  Run data_prep_run.py on the synthetic data directory in a new process.
+  """
+  subprocess.run(
+    [sys.executable, run_script_path, "--data-dir", data_dir, "--offline"],
+    check=True,
+    capture_output=True,
+  )
+
+
+def run_benchmarks(
+  work_dir: str,
+  scales: List[int] = [10_000, 100_000, 1_000_000],
+  bases: List[str] = ["third"],
+  repeats: int = 3,
+  model_max_rows: int = 1_000_000,
+  run_script_path: str = None,
+  results_path: str = None,
+  seed: int = 123,
+) -> pl.DataFrame:
+  """
+  Generate synthetic fixtures at each scale and time every stage, and the full data_prep_run.py
+  flow when run_script_path is given. Results are tagged with the
+  git commit, time and library versions and appended to results_path, so performance changes
+  can be compared across commits.
+
+  Args:
+      work_dir (str): Directory for the synthetic data, one sub directory per scale
+      scales (List[int], optional): Approximate rows of the throw_home_runner_on_<base> data
+      bases (List[str], optional): Bases of the runner of interest
+      repeats (int, optional): Number of timed calls per stage
+      model_max_rows (int, optional): Skip model_prep_on_base for larger inputs
+      run_script_path (str, optional): Path to data_prep_run.py to time the full flow
+      results_path (str, optional): Parquet file the results are appended to
+      seed (int, optional): Random seed of the synthetic data
+  Returns:
+      pl.DataFrame: Results of this run
+  """
+  run_info = {
+    "run_at": datetime.now().isoformat(timespec="seconds"),
+    "git_commit": _git_commit(),
+    "python_version": platform.python_version(),
+    "polars_version": pl.__version__,
+    "machine": platform.node(),
+    "cpu_count": os.cpu_count(),
+  }
+
+  records = list()
+  for scale in scales:
+    data_dir = os.path.join(work_dir, f"rows_{scale}")
+    print(f"Generating {scale} synthetic rows at: {data_dir}")
+    generate_fixtures(data_dir, n_rows=scale, bases=bases, seed=seed)
+    for base in bases:
+      print(f"Benchmarking runner on {base} at {scale} rows")
+      for record in benchmark_stages(data_dir, base, repeats, model_max_rows):
+        records.append({**run_info, "scale": scale, **record})
+
+    # Full data_prep_run.py flow over every base
+    if run_script_path is not None:
+      print(f"Benchmarking data_prep_run.py at {scale} rows")
+      timings = time_call(lambda: _run_data_prep(run_script_path, data_dir), repeats)
+      records.append({
+        **run_info, "scale": scale, "stage": "data_prep_run", "base": "all", "n_rows": scale,
+        **timings,
+      })
+
+  results_pl = pl.DataFrame(records)
+
+  if results_path is not None:
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    if os.path.exists(results_path):
+      results_pl = pl.concat([pl.read_parquet(results_path), results_pl], how="diagonal_relaxed")
+    results_pl.write_parquet(results_path)
+    print(f"Saved benchmark results to: {results_path}")
+
+  return pl.DataFrame(records)
+
+
+def _git_commit() -> str:
+  """
+  Current git commit of the repository, or None outside of a git checkout.
+  """
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"],
+      cwd=os.path.dirname(os.path.abspath(__file__)),
+      check=True,
+      capture_output=True,
+      text=True,
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from models import load_model_artifact, compile_pipeline, ScoringServer
+
+
+def benchmark_scoring(
+  artifact_dir: str,
+  source: str,
+  n_requests: int = 1000,
+  concurrency: List[int] = [1, 8, 32],
+  max_batch_size: int = 64,
+  max_wait_ms: float = 0.0,
+  seed: int = 123,
+) -> pl.DataFrame:
+  """
+  Measure the per play scoring latency of a saved model artifact. Plays are sampled from the
+  on_base data and scored one per call with the sklearn pipeline, with the compiled predictor,
+  and through the ScoringServer by concurrent keep-alive HTTP clients. Records the p50 and p99
+  latencies and the largest difference between the compiled and pipeline probabilities.
+
+  Args:
+      artifact_dir (str): Directory of an artifact from save_model_artifact
+      source (str): on_base parquet file or base=<base> directory with the artifact's predictors
+      n_requests (int, optional): Plays scored per method. The pipeline scores at most 200.
+      concurrency (List[int], optional): Concurrent HTTP clients of each server run
+      max_batch_size (int, optional): Maximum plays per batch of the server
+      max_wait_ms (float, optional): Batching window of the server
+      seed (int, optional): Random seed of the sampled plays
+  Returns:
+      pl.DataFrame: One row per method and concurrency with the latency percentiles in ms
+  """
+  pipeline, metadata = load_model_artifact(artifact_dir)
+  predictor = compile_pipeline(pipeline)
+  feature_names = metadata["feature_names"]
+  plays = (
+    pl.scan_parquet(source)
+    .select(feature_names)
+    .drop_nulls(metadata["drop_null_features"])
+    .collect()
+    .sample(n_requests, with_replacement=True, seed=seed)
+    .to_dicts()
+  )
+
+  # Agreement of the compiled predictor and the pipeline
+  pipeline_proba = pipeline.predict_proba(pd.DataFrame(plays, columns=feature_names))[:, 1]
+  max_abs_diff = float(np.max(np.abs(predictor.predict_proba(plays) - pipeline_proba)))
+
+  records = list()
+  pipeline_plays = plays[:200]
+  latencies = _time_each(
+    lambda play: pipeline.predict_proba(pd.DataFrame([play], columns=feature_names)),
+    pipeline_plays
+  )
+  records.append(_latency_record("pipeline", 1, latencies))
+
+  latencies = _time_each(predictor.predict_one, plays)
+  records.append(_latency_record("compiled", 1, latencies))
+
+  for n_clients in concurrency:
+    latencies, wall_s = asyncio.run(
+      _benchmark_server(predictor, plays, n_clients, max_batch_size, max_wait_ms)
+    )
+    records.append(_latency_record("server", n_clients, latencies, wall_s))
+
+  return pl.DataFrame(records).with_columns(
+    pl.lit(metadata["model_type"]).alias("model_type"),
+    pl.lit(max_abs_diff).alias("max_abs_diff"),
+  )
+
+
+def _time_each(func, plays: List[Dict]) -> np.ndarray:
+  """
+  Seconds of each call of func on one play.
+  """
+  latencies = np.empty(len(plays))
+  for idx, play in enumerate(plays):
+    start = time.perf_counter()
+    func(play)
+    latencies[idx] = time.perf_counter() - start
+  return latencies
+
+
+def _latency_record(method: str, n_clients: int, latencies: np.ndarray, wall_s: float = None):
+  """
+  Latency percentiles in ms and the throughput of one method.
+  """
+  wall_s = wall_s if wall_s is not None else float(latencies.sum())
+  return {
+    "method": method,
+    "concurrency": n_clients,
+    "n_requests": len(latencies),
+    "p50_ms": float(np.percentile(latencies, 50) * 1000),
+    "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    "mean_ms": float(latencies.mean() * 1000),
+    "requests_per_s": len(latencies) / wall_s,
+  }
+
+
+async def _benchmark_server(
+  predictor, plays: List[Dict], n_clients: int, max_batch_size: int, max_wait_ms: float
+):
+  """
+  Send every play as its own request from n_clients keep-alive connections.
+  """
+  server = await ScoringServer(
+    predictor, port=0, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+  ).start()
+
+  async def client(client_plays: List[Dict]) -> List[float]:
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    latencies = list()
+    for play in client_plays:
+      body = json.dumps(play).encode()
+      start = time.perf_counter()
+      writer.write(
+        f"POST /score HTTP/1.1\r\nHost: {server.host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+      )
+      await writer.drain()
+      await reader.readline()
+      content_length = 0
+      while (line := await reader.readline()) not in [b"\r\n", b""]:
+        key, value = line.decode().split(":", 1)
+        if key.lower() == "content-length":
+          content_length = int(value)
+      await reader.readexactly(content_length)
+      latencies.append(time.perf_counter() - start)
+    writer.close()
+    return latencies
+
+  start = time.perf_counter()
+  client_latencies = await asyncio.gather(
+    *[client(plays[idx::n_clients]) for idx in range(n_clients)]
+  )
+  wall_s = time.perf_counter() - start
+  await server.close()
+
+  return np.concatenate(client_latencies), wall_s
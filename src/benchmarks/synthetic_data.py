@@ -0,0 +1,445 @@
+import glob
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import polars as pl
+
+from data_prep.get_sprint_data import RUN_SPLIT_COLS, sprint_cache_path
+
+# Column dtypes of the throw_home_runner_on_<base> data, ordered as in on_base_column_names.txt
+ON_BASE_SCHEMA = {
+  "game_id": pl.Int64,
+  "year": pl.Int64,
+  "game_date": pl.Date,
+  "pa_id": pl.String,
+  "play_id": pl.String,
+  "pitch_id": pl.String,
+  "is_advance": pl.Boolean,
+  "is_out": pl.Boolean,
+  "is_stay": pl.Boolean,
+  "fielder_credit_id": pl.Int64,
+  "event_type": pl.String,
+  "fielder_position": pl.Int64,
+  "fielder_mlb_person_id": pl.Int64,
+  "fielder_name": pl.String,
+  "fielder_credit_type": pl.String,
+  "runner_name": pl.String,
+  "fielder_team": pl.String,
+  "runner_team": pl.String,
+  "inning": pl.Int64,
+  "inning_top": pl.Boolean,
+  "pre_runner_1b": pl.Int64,
+  "pre_runner_2b": pl.Int64,
+  "pre_runner_3b": pl.Int64,
+  "pre_outs": pl.Int64,
+  "post_runner_1b": pl.Int64,
+  "post_runner_2b": pl.Int64,
+  "post_runner_3b": pl.Int64,
+  "post_outs": pl.Int64,
+  "pos_id": pl.Int64,
+  "pos_code": pl.String,
+  "mlb_person_id": pl.Float64,
+  "at_pitch_x": pl.Float64,
+  "at_pitch_y": pl.Float64,
+  "at_zone_x": pl.Float64,
+  "at_zone_y": pl.Float64,
+  "at_landing_x": pl.Float64,
+  "at_landing_y": pl.Float64,
+  "at_fielded_x": pl.Float64,
+  "at_fielded_y": pl.Float64,
+  "at_throw_1_x": pl.Float64,
+  "at_throw_1_y": pl.Float64,
+  "start_time": pl.Float64,
+  "start_pos_x": pl.Float64,
+  "start_pos_y": pl.Float64,
+  "start_pos_z": pl.Float64,
+  "start_vel_x": pl.Float64,
+  "start_vel_y": pl.Float64,
+  "start_vel_z": pl.Float64,
+  "start_speed": pl.Float64,
+  "end_time": pl.Float64,
+  "end_pos_x": pl.Float64,
+  "end_pos_y": pl.Float64,
+  "end_pos_z": pl.Float64,
+  "end_vel_x": pl.Float64,
+  "end_vel_y": pl.Float64,
+  "end_vel_z": pl.Float64,
+  "end_speed": pl.Float64,
+  "landing_time": pl.Float64,
+  "landing_pos_x": pl.Float64,
+  "landing_pos_y": pl.Float64,
+  "landing_pos_z": pl.Float64,
+  "arm_strength": pl.Float64,
+  "distance_covered": pl.Float64,
+  "total_distance_covered": pl.Float64,
+  "throw_distance": pl.Float64,
+  "angle_to_ball_landing": pl.Float64,
+  "angle_to_ball_caught": pl.Float64,
+  "lead_distance": pl.Float64,
+  "sprint_speed_runner": pl.Float64,
+  "t_3b_to_home": pl.Float64,
+  "exit_speed": pl.Float64,
+  "vert_exit_angle": pl.Float64,
+  "horz_exit_angle": pl.Float64,
+  "exit_spin_rate": pl.Float64,
+  "exit_spin_axis": pl.Float64,
+  "landing_bearing": pl.Float64,
+  "landing_distance": pl.Float64,
+  "score_differential": pl.Int64,
+  "hang_time": pl.Float64,
+  "url": pl.String,
+}
+
+# Position ID: (label, mean x, mean y) of the at_* coordinates in feet from home plate
+POSITIONS = {
+  7: ("LF", -110.0, 270.0),
+  8: ("CF", 0.0, 310.0),
+  9: ("RF", 110.0, 270.0),
+  35: ("R1", 63.64, 63.64),
+  36: ("R2", 0.0, 127.28),
+  37: ("R3", -63.64, 63.64),
+}
+
+# Probability that a play has a runner on each base, by the base of the runner of interest
+RUNNER_PROBS = {
+  "third": {35: 0.25, 36: 0.35, 37: 1.0},
+  "second": {35: 0.30, 36: 1.0, 37: 0.0},
+  "first": {35: 1.0, 36: 0.0, 37: 0.0},
+}
+
+TEAMS = [
+  "ARI", "ATL", "BAL", "BOS", "CHC", "CWS", "CIN", "CLE", "COL", "DET",
+  "HOU", "KC", "LAA", "LAD", "MIA", "MIL", "MIN", "NYM", "NYY", "OAK",
+  "PHI", "PIT", "SD", "SEA", "SF", "STL", "TB", "TEX", "TOR", "WSH",
+]
+
+# Player ID pools. Sizes match the number of outfielders and runners in a few seasons.
+OUTFIELDER_IDS = np.arange(500_000, 501_200)
+RUNNER_IDS = np.arange(600_000, 602_500)
+
+
+def _null_out(values: np.ndarray, rng: np.random.Generator, null_rate: float) -> np.ndarray:
+  """
+  Replace a share of the values with NaN, which becomes null when loaded with nan_to_null.
+  """
+  values = values.astype(np.float64)
+  values[rng.random(len(values)) < null_rate] = np.nan
+  return values
+
+
+def _generate_on_base_chunk(
+  rng: np.random.Generator, play_start: int, n_plays: int, base: str, years: List[int]
+) -> pl.DataFrame:
+  """
+  One chunk of long throw_home_runner_on_<base> data with one row per play and position.
+  """
+  play_idx = np.arange(play_start, play_start + n_plays)
+
+  # ==== Play level columns ====
+  year = rng.choice(years, n_plays)
+  outcome = rng.choice(3, n_plays, p=[0.85, 0.12, 0.03])  # advance, stay, out
+  fielder_position = rng.choice([7, 8, 9], n_plays, p=[0.3, 0.4, 0.3])
+  pre_outs = rng.choice(3, n_plays, p=[0.35, 0.45, 0.20])
+  position_ids = {pos_id: rng.choice(OUTFIELDER_IDS, n_plays) for pos_id in [7, 8, 9]}
+  position_ids.update({pos_id: rng.choice(RUNNER_IDS, n_plays) for pos_id in [35, 36, 37]})
+  has_position = {pos_id: np.ones(n_plays, dtype=bool) for pos_id in [7, 8, 9]}
+  has_position.update(
+    {pos_id: rng.random(n_plays) < prob for pos_id, prob in RUNNER_PROBS[base].items()}
+  )
+  fielder_id = np.choose(fielder_position - 7, [position_ids[7], position_ids[8], position_ids[9]])
+  hang_time = _null_out(rng.normal(5.2, 0.7, n_plays), rng, 0.02)
+  event_type = np.where(
+    outcome == 0, "sac_fly", np.where(outcome == 1, "field_out", "sac_fly_double_play")
+  )
+  runner_id = position_ids[{"third": 37, "second": 36, "first": 35}[base]]
+  fielding_team = rng.integers(0, len(TEAMS), n_plays)
+
+  play_pl = pl.DataFrame({
+    "play_idx": play_idx,
+    "game_id": 600_000 + (year - min(years)) * 3_000 + rng.integers(0, 2_430, n_plays),
+    "year": year,
+    "game_date_offset": rng.integers(0, 185, n_plays),
+    "is_advance": outcome == 0,
+    "is_out": outcome == 2,
+    "is_stay": outcome == 1,
+    "fielder_credit_id": fielder_id,
+    "event_type": event_type,
+    "fielder_position": fielder_position,
+    "fielder_mlb_person_id": fielder_id,
+    "fielder_credit_type": np.full(n_plays, "f_putout"),
+    "runner_id": runner_id,
+    "fielder_team": np.array(TEAMS)[fielding_team],
+    "runner_team": np.array(TEAMS)[(fielding_team + rng.integers(1, 30, n_plays)) % 30],
+    "inning": rng.integers(1, 10, n_plays),
+    "inning_top": rng.random(n_plays) < 0.5,
+    "pre_runner_1b": np.where(has_position[35], position_ids[35], -1),
+    "pre_runner_2b": np.where(has_position[36], position_ids[36], -1),
+    "pre_runner_3b": np.where(has_position[37], position_ids[37], -1),
+    "pre_outs": pre_outs,
+    "post_outs": np.minimum(pre_outs + 1 + (outcome == 2), 3),
+    "sprint_speed_runner": _null_out(rng.normal(27.0, 1.5, n_plays), rng, 0.05),
+    "t_3b_to_home": _null_out(rng.normal(3.4, 0.2, n_plays), rng, 0.3),
+    "lead_distance": _null_out(rng.normal(12.0, 3.0, n_plays), rng, 0.1),
+    "exit_speed": _null_out(rng.normal(92.0, 6.0, n_plays), rng, 0.01),
+    "vert_exit_angle": _null_out(rng.normal(35.0, 8.0, n_plays), rng, 0.01),
+    "horz_exit_angle": _null_out(rng.uniform(-45.0, 45.0, n_plays), rng, 0.01),
+    "exit_spin_rate": _null_out(rng.normal(2_500.0, 400.0, n_plays), rng, 0.05),
+    "exit_spin_axis": _null_out(rng.uniform(0.0, 360.0, n_plays), rng, 0.05),
+    "landing_bearing": _null_out(rng.uniform(-45.0, 45.0, n_plays), rng, 0.02),
+    "landing_distance": _null_out(rng.normal(320.0, 30.0, n_plays), rng, 0.02),
+    "score_differential": rng.integers(-6, 7, n_plays),
+    "hang_time": hang_time,
+    # Throw and catch measures of the credited fielder, repeated on every row of the play
+    "arm_strength": _null_out(rng.normal(88.0, 4.0, n_plays), rng, 0.2),
+    "distance_covered": _null_out(rng.gamma(2.0, 15.0, n_plays), rng, 0.2),
+    "total_distance_covered": _null_out(rng.gamma(2.5, 15.0, n_plays), rng, 0.2),
+    "throw_distance": _null_out(rng.normal(250.0, 40.0, n_plays), rng, 0.2),
+    "angle_to_ball_landing": _null_out(rng.uniform(0, 360, n_plays), rng, 0.2),
+    "angle_to_ball_caught": _null_out(rng.uniform(0, 360, n_plays), rng, 0.2),
+  }, nan_to_null=True)
+
+  # Statcast ball tracking columns of the batted ball are only present on a share of the plays
+  tracking = {
+    col: _null_out(rng.normal(0.0, 50.0, n_plays), rng, 0.6)
+    for col, dtype in ON_BASE_SCHEMA.items()
+    if dtype == pl.Float64 and col.startswith(("start_", "end_", "landing_"))
+    and col not in ("landing_bearing", "landing_distance")
+  }
+  play_pl = play_pl.with_columns(pl.DataFrame(tracking, nan_to_null=True))
+
+  # ==== Position level rows ====
+  position_pl_list = list()
+  for pos_id, (pos_label, mean_x, mean_y) in POSITIONS.items():
+    mask = has_position[pos_id]
+    n_rows = int(mask.sum())
+    if n_rows == 0:
+      continue
+    coords = {
+      f"at_{event}_{axis}": _null_out(rng.normal(mean, 15.0, n_rows), rng, null_rate)
+      for event, null_rate in [
+        ("pitch", 0.03), ("zone", 0.03), ("landing", 0.05), ("fielded", 0.05), ("throw_1", 0.4)
+      ]
+      for axis, mean in [("x", mean_x), ("y", mean_y)]
+    }
+    position_pl_list.append(pl.DataFrame({
+      "play_idx": play_idx[mask],
+      "pos_id": np.full(n_rows, pos_id),
+      "pos_code": np.full(n_rows, pos_label),
+      "mlb_person_id": _null_out(position_ids[pos_id][mask], rng, 0.005),
+      **coords,
+    }, nan_to_null=True))
+
+  position_pl = pl.concat(position_pl_list).sort(["play_idx", "pos_id"])
+
+  on_base_pl = position_pl.join(play_pl, on="play_idx", how="left")
+
+  # Derive the ID, name and date columns
+  on_base_pl = on_base_pl.with_columns(
+    pl.format("pa-{}", pl.col("play_idx")).alias("pa_id"),
+    pl.format("play-{}", pl.col("play_idx")).alias("play_id"),
+    pl.format("pitch-{}", pl.col("play_idx")).alias("pitch_id"),
+    pl.format("Player {}", pl.col("fielder_mlb_person_id")).alias("fielder_name"),
+    pl.format("Player {}", pl.col("runner_id")).alias("runner_name"),
+    (pl.date(pl.col("year"), 3, 28) + pl.duration(days=pl.col("game_date_offset"))).alias(
+      "game_date"
+    ),
+    *[
+      pl.when(pl.col(col) < 0).then(None).otherwise(pl.col(col)).alias(col)
+      for col in ["pre_runner_1b", "pre_runner_2b", "pre_runner_3b"]
+    ],
+    pl.format("https://baseballsavant.mlb.com/sporty-videos?playId=play-{}", pl.col("play_idx"))
+    .alias("url"),
+  )
+  # Runners on base after the play, the runner of interest leaves third on an advance
+  on_base_pl = on_base_pl.with_columns(
+    pl.col("pre_runner_1b").alias("post_runner_1b"),
+    pl.col("pre_runner_2b").alias("post_runner_2b"),
+    pl.when(pl.col("is_stay")).then(pl.col("pre_runner_3b")).otherwise(None).alias(
+      "post_runner_3b"
+    ),
+  )
+
+  return on_base_pl.select(
+    [pl.col(col).cast(dtype) for col, dtype in ON_BASE_SCHEMA.items()]
+  )
+
+
+def generate_on_base(
+  output_path: str,
+  n_rows: int,
+  base: str = "third",
+  years: List[int] = [2021, 2022, 2023, 2024],
+  seed: int = 123,
+  chunk_rows: int = 1_000_000,
+) -> str:
+  """
+  Generate a synthetic throw_home_runner_on_<base>.parquet in the long format of the Statcast
+  data, one row per play and position (pos_id 7, 8, 9 for the outfielders and 35, 36, 37 for
+  the runners), with the columns of data/on_base_column_names.txt. Player ID cardinalities, the
+  runner on each base, outcome rates and null rates follow the real data closely enough to
+  benchmark the data prep and modeling functions.
+
+  The data is generated in chunks of about chunk_rows rows and streamed into one parquet file,
+  so memory use does not grow with n_rows. n_rows scales from thousands to hundreds of millions.
+
+  Args:
+      output_path (str): Path of the parquet file to write
+      n_rows (int): Approximate number of rows
+      base (str, optional): Base of the runner of interest, "third", "second" or "first"
+      years (List[int], optional): Seasons of the plays
+      seed (int, optional): Random seed for reproducibility
+      chunk_rows (int, optional): Rows generated at a time
+  Returns:
+      str: output_path
+  """
+  if base not in RUNNER_PROBS:
+    raise ValueError(f"Unknown base: {base}. Use one of {list(RUNNER_PROBS)}.")
+
+  rows_per_play = 3 + sum(RUNNER_PROBS[base].values())
+  n_plays = max(1, int(round(n_rows / rows_per_play)))
+  plays_per_chunk = max(1, int(chunk_rows / rows_per_play))
+
+  rng = np.random.default_rng(seed)
+  part_dir = f"{output_path}.parts"
+  shutil.rmtree(part_dir, ignore_errors=True)
+  os.makedirs(part_dir)
+
+  # Write the chunks as parts, then stream the parts into one file
+  for part_idx, play_start in enumerate(range(0, n_plays, plays_per_chunk)):
+    chunk_pl = _generate_on_base_chunk(
+      rng, play_start, min(plays_per_chunk, n_plays - play_start), base, years
+    )
+    chunk_pl.write_parquet(os.path.join(part_dir, f"part_{part_idx:06d}.parquet"))
+
+  part_paths = sorted(glob.glob(os.path.join(part_dir, "part_*.parquet")))
+  pl.scan_parquet(part_paths).sink_parquet(output_path)
+  shutil.rmtree(part_dir)
+
+  return output_path
+
+
+def generate_arm_strength(
+  output_dir: str, years: List[int] = [2020, 2021, 2022, 2023, 2024], seed: int = 123
+) -> List[str]:
+  """
+  Generate synthetic arm_strength_<year>.csv files for the outfielder ID pool. About 80% of the
+  outfielders have arm strength data each season, so the previous season fallback is exercised.
+
+  Args:
+      output_dir (str): Directory the csv files are written to
+      years (List[int], optional): Seasons to generate
+      seed (int, optional): Random seed for reproducibility
+  Returns:
+      List[str]: Paths of the csv files
+  """
+  rng = np.random.default_rng(seed)
+  os.makedirs(output_dir, exist_ok=True)
+
+  paths = list()
+  for year in years:
+    player_ids = OUTFIELDER_IDS[rng.random(len(OUTFIELDER_IDS)) < 0.8]
+    n_players = len(player_ids)
+    arm_overall = rng.normal(84.0, 4.0, n_players)
+    arm_pl = pl.DataFrame({
+      "year": np.full(n_players, year),
+      "player_id": player_ids,
+      "fielder_name": [f"Player {player_id}" for player_id in player_ids],
+      "total_throws": rng.integers(10, 400, n_players),
+      "max_arm_strength": arm_overall + rng.gamma(2.0, 2.0, n_players),
+      "arm_overall": arm_overall,
+    })
+    path = os.path.join(output_dir, f"arm_strength_{year}.csv")
+    arm_pl.write_csv(path)
+    paths.append(path)
+
+  return paths
+
+
+def generate_sprint_splits(
+  cache_dir: str,
+  years: List[int] = [2020, 2021, 2022, 2023, 2024],
+  min_samples: int = 10,
+  seed: int = 123,
+) -> List[str]:
+  """
+  Generate synthetic running split seasons in the get_sprint_data cache layout, so they can be
+  read with get_sprint_data(offline=True, cache_dir=cache_dir). About 85% of the runner ID pool
+  has running splits each season.
+
+  Args:
+      cache_dir (str): Directory the sprint_split_<year>_min<min_samples>.parquet files go to
+      years (List[int], optional): Seasons to generate
+      min_samples (int, optional): min_samples of the cache file names
+      seed (int, optional): Random seed for reproducibility
+  Returns:
+      List[str]: Paths of the parquet files
+  """
+  rng = np.random.default_rng(seed)
+  os.makedirs(cache_dir, exist_ok=True)
+
+  paths = list()
+  for year in years:
+    player_ids = RUNNER_IDS[rng.random(len(RUNNER_IDS)) < 0.85]
+    n_players = len(player_ids)
+    # Cumulative seconds to each 5 foot mark, faster runners are faster at every split
+    pace = rng.normal(1.0, 0.05, n_players)
+    split_times = {
+      col: (0.3 + 0.042 * feet) * pace
+      for col, feet in zip(RUN_SPLIT_COLS, range(0, 5 * len(RUN_SPLIT_COLS), 5))
+    }
+    sprint_pl = pl.DataFrame({"player_id": player_ids.astype(np.int64), **split_times})
+    path = sprint_cache_path(cache_dir, year, min_samples)
+    sprint_pl.write_parquet(path)
+    paths.append(path)
+
+  return paths
+
+
+def generate_fixtures(
+  data_dir: str,
+  n_rows: int,
+  bases: List[str] = ["third"],
+  years: List[int] = [2021, 2022, 2023, 2024],
+  seed: int = 123,
+) -> Dict[str, object]:
+  """
+  Generate a complete synthetic data directory for data_prep_run.py: one
+  throw_home_runner_on_<base>.parquet per base, arm_strength_<year>.csv files and an offline
+  sprint cache in <data_dir>/sprint_cache. Supplimental data starts one season before the plays
+  so the previous season fallback has data, and the sprint cache covers every season that
+  data_prep_run.py reads.
+
+  Args:
+      data_dir (str): Directory to write the fixtures to
+      n_rows (int): Approximate number of rows per base
+      bases (List[str], optional): Bases of the runner of interest
+      years (List[int], optional): Seasons of the plays
+      seed (int, optional): Random seed for reproducibility
+  Returns:
+      dict: Paths by fixture, "on_base" is a dictionary by base
+  """
+  supplimental_years = list(range(min(years) - 1, max(years) + 1))
+  # data_prep_run.py reads sprint data from 2020 through the current season
+  sprint_years = list(range(min(2020, min(years) - 1), max(datetime.now().year, max(years)) + 1))
+  sprint_cache_dir = os.path.join(data_dir, "sprint_cache")
+
+  on_base_paths = {
+    base: generate_on_base(
+      os.path.join(data_dir, f"throw_home_runner_on_{base}.parquet"),
+      n_rows=n_rows,
+      base=base,
+      years=years,
+      seed=seed + base_idx,
+    )
+    for base_idx, base in enumerate(bases)
+  }
+
+  return {
+    "on_base": on_base_paths,
+    "arm_strength": generate_arm_strength(data_dir, supplimental_years, seed),
+    "sprint_cache_dir": sprint_cache_dir,
+    "sprint_splits": generate_sprint_splits(sprint_cache_dir, sprint_years, seed=seed),
+  }
@@ -1,7 +1,13 @@
 from .game_state_filter import game_state_filter
 from .get_sprint_data import get_sprint_data
 from .merge_arm_strength_by_position import merge_arm_strength_by_position
+from .merge_by_positions import merge_by_positions
 from .merge_sprint_by_position import merge_sprint_by_position
 from .pivot_on_fielder import pivot_on_fielder
 from .prep_arm_strength import prep_arm_strength
 from .create_is_successful import create_is_successful
+from .write_on_base import write_on_base
+from .write_on_base_dataset import write_on_base_dataset
+from .scan_on_base import scan_on_base
+from .stage_cache import StageCache
+from .pipeline_profiler import PipelineProfiler
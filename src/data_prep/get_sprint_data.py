@@ -1,77 +1,179 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import polars as pl
 from pybaseball import statcast_running_splits
 
+# List of running split column names
+RUN_SPLIT_COLS = [
+  "seconds_since_hit_000",
+  "seconds_since_hit_005",
+  "seconds_since_hit_010",
+  "seconds_since_hit_015",
+  "seconds_since_hit_020",
+  "seconds_since_hit_025",
+  "seconds_since_hit_030",
+  "seconds_since_hit_035",
+  "seconds_since_hit_040",
+  "seconds_since_hit_045",
+  "seconds_since_hit_050",
+  "seconds_since_hit_055",
+  "seconds_since_hit_060",
+  "seconds_since_hit_065",
+  "seconds_since_hit_070",
+  "seconds_since_hit_075",
+  "seconds_since_hit_080",
+  "seconds_since_hit_085",
+  "seconds_since_hit_090",
+]
 
-def get_sprint_data(year_start: int, year_end: int = None, min_samples: int = 10):
+# Exclution lists
+SPRINT_SPLIT_EX = [
+  "last_name, first_name",
+  "team_id",
+  "team",
+  "position",
+  "age",
+  "competitive_runs",
+  "position_name",
+  "name_abbrev",
+]
+
+
+def sprint_cache_path(cache_dir: str, year: int, min_samples: int) -> str:
+  """
+  Path of the cached running split parquet for one season and minimum sample size.
+
+  Args:
+      cache_dir (str): Directory holding the cached seasons
+      year (int): Season of the running splits
+      min_samples (int): Minimum number of sprint opportunities used for the download
+  Returns:
+      str: Path to sprint_split_<year>_min<min_samples>.parquet in cache_dir
+  """
+  return os.path.join(cache_dir, f"sprint_split_{year}_min{min_samples}.parquet")
+
+
+def _download_sprint_split(year: int, min_samples: int) -> pl.DataFrame:
+  """
+  Download one season of running splits from StatCast, drop the unused columns and assign dtypes.
+  """
+  sprint_split_pl = pl.from_pandas(statcast_running_splits(year, min_samples))
+  sprint_split_pl = sprint_split_pl.select(pl.exclude(SPRINT_SPLIT_EX))
+  sprint_split_pl = sprint_split_pl.with_columns(
+    [pl.col(col).cast(pl.Float64) for col in RUN_SPLIT_COLS]
+  )
+  sprint_split_pl = sprint_split_pl.with_columns(pl.col("player_id").cast(pl.Int64))
+
+  return sprint_split_pl
+
+
+def _is_cache_fresh(path: str, year: int, cache_ttl_hours: float) -> bool:
+  """
+  Completed seasons never change, so a season cached after it ended, on or after Jan 1 of the
+  next year, is always fresh. A season cached while it was in progress, including one that has
+  ended since, is fresh until the cached file is older than cache_ttl_hours.
+  """
+  if not os.path.exists(path):
+    return False
+  cached_time = os.path.getmtime(path)
+  if cached_time >= datetime(year + 1, 1, 1).timestamp():
+    return True
+  return (time.time() - cached_time) < cache_ttl_hours * 3600
+
+
+def get_sprint_data(
+  year_start: int,
+  year_end: int = None,
+  min_samples: int = 10,
+  cache_dir: str = None,
+  cache_ttl_hours: float = 24.0,
+  max_workers: int = 4,
+  offline: bool = False,
+):
   """
   Download runner sprint data from StatCast for multiple years and append into one dataframe.
   Sprint data is a join of the sprint speed and running split datasets.
 
+  When cache_dir is given, each season is stored as sprint_split_<year>_min<min_samples>.parquet.
+  Seasons cached after they ended are never downloaded again. The current season, and a past
+  season cached before it ended, are refreshed once their cache is older than cache_ttl_hours.
+  Seasons that are missing or stale are downloaded concurrently. In offline mode nothing is
+  downloaded and every season must already exist in cache_dir, which can be a directory of
+  fixture files.
+
   Args:
       year_start (int): The first year to retrieve data from
       year_end (int, optional): The last year to retrieve data. defaults to current year.
       min_samples (int, optional): Minimum number of sprint opportunities required.
+      cache_dir (str, optional): Directory for the per season parquet cache. No cache if None.
+      cache_ttl_hours (float, optional): Hours before the cache of a season that was in progress
+          when it was cached is refreshed.
+      max_workers (int, optional): Maximum number of seasons downloaded at the same time.
+      offline (bool, optional): Read every season from cache_dir without downloading.
 
   Returns:
       sprint_data_lf (pl.LazyFrame): Merged sprint speed and time split by player_id and year.
   """
   # If year not specified, use current year
+  current_year = datetime.now().year
   if year_end is None:
-    year_end = datetime.now().year
-
-  # List of running split column names
-  run_split_cols = [
-    "seconds_since_hit_000",
-    "seconds_since_hit_005",
-    "seconds_since_hit_010",
-    "seconds_since_hit_015",
-    "seconds_since_hit_020",
-    "seconds_since_hit_025",
-    "seconds_since_hit_030",
-    "seconds_since_hit_035",
-    "seconds_since_hit_040",
-    "seconds_since_hit_045",
-    "seconds_since_hit_050",
-    "seconds_since_hit_055",
-    "seconds_since_hit_060",
-    "seconds_since_hit_065",
-    "seconds_since_hit_070",
-    "seconds_since_hit_075",
-    "seconds_since_hit_080",
-    "seconds_since_hit_085",
-    "seconds_since_hit_090",
-  ]
-
-  # list of data type assignments for running split
-  type_assign_loop_split = [pl.col(col).cast(pl.Float64) for col in run_split_cols]
-
-  # Exclution lists
-  sprint_split_ex = [
-    "last_name, first_name",
-    "team_id",
-    "team",
-    "position",
-    "age",
-    "competitive_runs",
-  ]
+    year_end = current_year
+
+  years = list(range(year_start, year_end + 1))
+  if not years:
+    raise ValueError(f"year_start ({year_start}) must not be after year_end ({year_end}).")
+
+  if offline and cache_dir is None:
+    raise ValueError("offline mode requires cache_dir with the sprint split parquet files.")
+
+  # Find the seasons that need to be downloaded
+  if cache_dir is None:
+    years_to_download = years
+  elif offline:
+    years_to_download = []
+    missing_paths = [
+      sprint_cache_path(cache_dir, year, min_samples)
+      for year in years
+      if not os.path.exists(sprint_cache_path(cache_dir, year, min_samples))
+    ]
+    if missing_paths:
+      raise FileNotFoundError(f"Offline sprint split files not found: {missing_paths}")
+  else:
+    os.makedirs(cache_dir, exist_ok=True)
+    years_to_download = [
+      year
+      for year in years
+      if not _is_cache_fresh(sprint_cache_path(cache_dir, year, min_samples), year, cache_ttl_hours)
+    ]
+
+  # Download the missing seasons through a bounded thread pool
+  downloaded_dict = dict()
+  if years_to_download:
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(years_to_download)))) as pool:
+      downloads = pool.map(
+        lambda year: _download_sprint_split(year, min_samples), years_to_download
+      )
+      downloaded_dict = dict(zip(years_to_download, downloads))
+
+  # Write downloads to the cache. Replace atomically so a failed run never leaves partial files.
+  if cache_dir is not None:
+    for year, sprint_split_pl in downloaded_dict.items():
+      cache_path = sprint_cache_path(cache_dir, year, min_samples)
+      sprint_split_pl.write_parquet(f"{cache_path}.tmp")
+      os.replace(f"{cache_path}.tmp", cache_path)
 
   # initialize list of merged sprint speed and time split
   sprint_data_list = list()
-
-  # Loop through year_start and year_end (inclusive)
-  while year_start <= year_end:
-    # Download running splits, filter data, and assign dtypes
-    sprint_split_lf = pl.LazyFrame(statcast_running_splits(year_start, min_samples))
-    sprint_split_lf = sprint_split_lf.drop(["position_name", "name_abbrev"])
-    sprint_split_lf = sprint_split_lf.select(pl.exclude(sprint_split_ex))
-    sprint_split_lf = sprint_split_lf.with_columns(type_assign_loop_split)
-    sprint_split_lf = sprint_split_lf.with_columns(pl.col("player_id").cast(pl.Int64))
-    sprint_split_lf = sprint_split_lf.with_columns(pl.lit(year_start).alias("curr_year"))
-    sprint_split_lf = sprint_split_lf.with_columns((pl.lit(year_start) + 1).alias("prev_year"))
+  for year in years:
+    if cache_dir is None:
+      sprint_split_lf = downloaded_dict[year].lazy()
+    else:
+      sprint_split_lf = pl.scan_parquet(sprint_cache_path(cache_dir, year, min_samples))
+    sprint_split_lf = sprint_split_lf.with_columns(pl.lit(year).alias("curr_year"))
     sprint_data_list.append(sprint_split_lf)
-    year_start += 1
 
   # Append each dataset year to the bottom
   sprint_data_lf = pl.concat(sprint_data_list)
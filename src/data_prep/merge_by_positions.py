@@ -0,0 +1,93 @@
+from typing import List
+
+import polars as pl
+
+
+def merge_by_positions(
+  on_base_lf: pl.LazyFrame,
+  player_data_lf: pl.LazyFrame,
+  positions: List[str],
+  max_lookback_years: int = 1,
+) -> pl.LazyFrame:
+  """
+  Merge yearly player data, such as arm strength from prep_arm_strength.py or sprint data from
+  get_sprint_data.py, to the on_base dataset for several position MLB ID columns in one pass. If
+  the current year data is missing, suppliment it with the most recent earlier year, up to
+  max_lookback_years before the game.
+
+  The position ID columns are unpivoted into one long (row, position, player_id) table that is
+  as-of joined once against the player data deduplicated to one row per player and season, and
+  then pivoted back to one column per value and position. The number of joins stays the same no
+  matter how many positions are merged or how deep the lookback is, and only the narrow long table
+  is sorted. Output columns are <value column>_<position>. merge_arm_strength_by_position and
+  merge_sprint_by_position are the single position case.
+
+  Args:
+      on_base_lf: (pl.LazyFrame) The throw_home_runner_on_<base> dataset.
+      player_data_lf: (pl.LazyFrame) Yearly player data with player_id and curr_year columns.
+      positions: (List[str]) position column names containing the MLB player ID
+      max_lookback_years: (int, optional) Seasons before the game year allowed as a fallback.
+  Returns:
+      pl.LazyFrame: Player data for every position merged with throw_home_runner_on_<base>
+  """
+  if max_lookback_years < 0:
+    raise ValueError(f"max_lookback_years must be 0 or more, got: {max_lookback_years}")
+
+  if not positions:
+    return on_base_lf
+
+  key_cols = ["player_id", "curr_year"]
+  value_cols = [col for col in player_data_lf.collect_schema().names() if col not in key_cols]
+
+  # One row per player and season, sorted by season for the as-of join. Duplicate rows of a player
+  # and season keep the first one so the merged values are reproducible.
+  lookup_lf = player_data_lf.select(
+    pl.col("player_id").cast(pl.Int64),
+    pl.col("curr_year").cast(pl.Int64),
+    *value_cols,
+  )
+  lookup_lf = lookup_lf.unique(subset=key_cols, keep="first", maintain_order=True).sort("curr_year")
+
+  # Row number is the key to pivot back to, so duplicate play_ids are not merged together
+  on_base_lf = on_base_lf.with_row_index("on_base_row_nr")
+
+  # Long table of position player IDs
+  position_ids_lf = on_base_lf.select(
+    "on_base_row_nr",
+    pl.col("year").cast(pl.Int64),
+    *[pl.col(position).cast(pl.Int64) for position in positions],
+  ).unpivot(
+    on=positions,
+    index=["on_base_row_nr", "year"],
+    variable_name="position",
+    value_name="player_id",
+  )
+
+  # Single as-of join for all positions using the latest season at or before the game year
+  position_ids_lf = position_ids_lf.sort("year")
+  position_data_lf = position_ids_lf.join_asof(
+    lookup_lf,
+    left_on="year",
+    right_on="curr_year",
+    by="player_id",
+    strategy="backward",
+    tolerance=max_lookback_years,
+    check_sortedness=False,
+  )
+
+  # Pivot wider by position
+  position_data_lf = position_data_lf.group_by("on_base_row_nr").agg(
+    [
+      pl.col(col).filter(pl.col("position") == position).first().alias(f"{col}_{position}")
+      for position in positions
+      for col in value_cols
+    ]
+  )
+
+  # Keep the original row order
+  merged_lf = on_base_lf.join(
+    position_data_lf, on="on_base_row_nr", how="left", maintain_order="left"
+  )
+  merged_lf = merged_lf.drop("on_base_row_nr")
+
+  return merged_lf
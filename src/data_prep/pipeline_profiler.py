@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+import polars as pl
+
+from .stage_cache import StageCache
+
+
+class PipelineProfiler:
+  """
+  Record wall time, rows in and out, column count, peak RSS and the optimized Polars plan for each
+  stage of the data prep pipeline, and write the records as a JSON and Parquet run report. The
+  peak RSS of a stage is the process peak while that stage runs, so a large earlier stage does not
+  carry over to the stages after it.
+
+  Polars plans are lazy, so a profiled stage collects its output to attribute the work to that
+  stage and passes the collected frame to the next stage as a LazyFrame. Profiling therefore
+  gives up the optimizations across stages and is meant for finding slow or memory hungry stages,
+  not for production runs. Outputs of StageCache.run are collected for the timings but passed on
+  as the scan of the cached file, so the next stage's cache key matches an unprofiled run. When
+  disabled, stages run unchanged.
+
+  Args:
+      label (str, optional): Label stored with every record, e.g. the base of the dataset.
+      enabled (bool, optional): If False, stages run without profiling.
+  """
+
+  def __init__(self, label: str = "", enabled: bool = True):
+    self.label = label
+    self.enabled = enabled
+    self.records = list()
+
+  def run(self, stage_name: str, func: Callable, *args, **kwargs):
+    """
+    Run and profile a pipeline stage. The stage input is the first LazyFrame or DataFrame
+    argument, or the on_base_lf keyword argument.
+
+    Args:
+        stage_name (str): Name of the stage in the report
+        func (Callable): Stage function, e.g. pivot_on_fielder or StageCache.run
+        *args: Positional arguments of func
+        **kwargs: Keyword arguments of func
+    Returns:
+        The stage output. LazyFrame outputs are collected and returned as a LazyFrame.
+    """
+    if not self.enabled:
+      return func(*args, **kwargs)
+
+    frame_args = [arg for arg in args if isinstance(arg, (pl.LazyFrame, pl.DataFrame))]
+    input_frame = kwargs.get("on_base_lf", frame_args[0] if frame_args else None)
+    rows_in = None
+    if input_frame is not None:
+      rows_in = input_frame.lazy().select(pl.len()).collect().item()
+
+    peak_rss = _StagePeakRss()
+    peak_rss.start()
+    start_time = time.perf_counter()
+    output = func(*args, **kwargs)
+
+    # Collect lazy outputs so the stage's work is timed here instead of in a later stage
+    plan = None
+    cached_scan = None
+    if isinstance(output, pl.LazyFrame):
+      plan = output.explain()
+      cache = getattr(func, "__self__", None)
+      if isinstance(cache, StageCache) and cache.enabled:
+        cached_scan = output
+      output = output.collect()
+    elapsed = time.perf_counter() - start_time
+    peak_rss_mb = peak_rss.stop()
+
+    is_frame = isinstance(output, pl.DataFrame)
+    self.records.append({
+      "label": self.label,
+      "stage": stage_name,
+      "started_at": datetime.now().isoformat(timespec="seconds"),
+      "wall_time_s": elapsed,
+      "rows_in": rows_in,
+      "rows_out": output.height if is_frame else None,
+      "columns_out": output.width if is_frame else None,
+      "peak_rss_mb": peak_rss_mb,
+      "plan": plan,
+    })
+
+    if cached_scan is not None:
+      return cached_scan
+    return output.lazy() if is_frame else output
+
+  def report(self) -> pl.DataFrame:
+    """
+    Stage records as a DataFrame.
+
+    Returns:
+        pl.DataFrame: One row per profiled stage
+    """
+    schema = {
+      "label": pl.String,
+      "stage": pl.String,
+      "started_at": pl.String,
+      "wall_time_s": pl.Float64,
+      "rows_in": pl.Int64,
+      "rows_out": pl.Int64,
+      "columns_out": pl.Int64,
+      "peak_rss_mb": pl.Float64,
+      "plan": pl.String,
+    }
+    return pl.DataFrame(self.records, schema=schema)
+
+  def write_report(self, output_dir: str, file_name: str) -> list:
+    """
+    Write the stage records to <file_name>.json and <file_name>.parquet in output_dir.
+
+    Args:
+        output_dir (str): Directory the report is written to
+        file_name (str): File name without the extension
+    Returns:
+        list: Paths of the JSON and Parquet reports
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, f"{file_name}.json")
+    parquet_path = os.path.join(output_dir, f"{file_name}.parquet")
+
+    with open(json_path, "w") as file:
+      json.dump(self.records, file, indent=2)
+    self.report().write_parquet(parquet_path)
+
+    return [json_path, parquet_path]
+
+
+class _StagePeakRss:
+  """
+  Peak resident set size of the process between start and stop, in MB.
+
+  On Linux the kernel high water mark is reset through /proc/self/clear_refs at start and read
+  from VmHWM at stop, so short peaks are counted exactly. Elsewhere, or if clear_refs cannot be
+  written, the RSS is sampled by a background thread every interval_s seconds with psutil. The
+  peak is None when neither is available.
+
+  Args:
+      interval_s (float, optional): Seconds between RSS samples of the background thread.
+  """
+
+  def __init__(self, interval_s: float = 0.01):
+    self.interval_s = interval_s
+    self._use_hwm = False
+    self._peak_bytes = None
+    self._stop_event = threading.Event()
+    self._thread = None
+
+  def start(self):
+    """
+    Reset the high water mark, or start sampling the RSS.
+    """
+    try:
+      with open("/proc/self/clear_refs", "w") as file:
+        file.write("5")
+      self._use_hwm = True
+      return
+    except OSError:
+      pass
+
+    try:
+      import psutil
+    except ImportError:
+      return
+
+    process = psutil.Process()
+    self._peak_bytes = process.memory_info().rss
+
+    def sample():
+      while not self._stop_event.wait(self.interval_s):
+        self._peak_bytes = max(self._peak_bytes, process.memory_info().rss)
+
+    self._thread = threading.Thread(target=sample, daemon=True)
+    self._thread.start()
+
+  def stop(self) -> float:
+    """
+    Peak RSS since start in MB, or None if it cannot be measured.
+    """
+    if self._use_hwm:
+      with open("/proc/self/status") as file:
+        for line in file:
+          if line.startswith("VmHWM:"):
+            # Reported in kB
+            return int(line.split()[1]) / 1024
+      return None
+
+    if self._thread is None:
+      return None
+    self._stop_event.set()
+    self._thread.join()
+    return self._peak_bytes / 1024**2
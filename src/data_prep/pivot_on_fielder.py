@@ -1,75 +1,104 @@
 import polars as pl
 
+# Position IDs mapped to the position labels appended to the fielder values
+POSITION_LABELS = {
+  7: "LF",  # Left Fielder
+  8: "CF",  # Center Fielder
+  9: "RF",  # Right Fielder
+  35: "R1",  # Runner on 1st
+  36: "R2",  # Runner on 2nd
+  37: "R3",  # Runner on 3rd
+}
 
-def pivot_on_fielder(on_base_pl: pl.DataFrame) -> pl.LazyFrame:
+# Value columns for the pivot
+FIELDER_VALUES = [
+  "pos_code",
+  "pos_id",
+  "mlb_person_id",
+  "at_pitch_x",
+  "at_pitch_y",
+  "at_zone_x",
+  "at_zone_y",
+  "at_landing_x",
+  "at_landing_y",
+  "at_fielded_x",
+  "at_fielded_y",
+  "at_throw_1_x",
+  "at_throw_1_y",
+]
+
+
+def pivot_on_fielder(on_base_lf: pl.LazyFrame, check_play_cols: bool = False) -> pl.LazyFrame:
   """
   Pivots fielder data wider based on their position.
 
-  Function takes a Polars DataFrame because pivot is an eager operation. Function drops rows with
-  null fielder player ID, 'player_id', maps position IDs (7, 8, 9, 37) to position
-  labels ('LF', 'CF', 'RF', '3R'), and then pivots the DataFrame wider. Each position label is
-  appended to the end of the fielder values such as positioning. The resulting dataset is wider
-  and uses the play_id as the key. Contains a check if there are columns not included in pivot.
+  Function drops rows with null fielder player ID, 'player_id', maps position IDs (7, 8, 9, 35, 36,
+  37) to position labels ('LF', 'CF', 'RF', 'R1', 'R2', 'R3'), and then pivots the data wider with a
+  lazy group by on play_id, in the order the plays first appear. Each position label is appended to
+  the end of the fielder values such as positioning, and every label gets its columns even when no
+  row has that position, so the output schema is fixed.
+
+  Every column not in FIELDER_VALUES is assumed to be a play level column with one value per
+  play_id, and keeps the first value of the play. A column that varies across the fielder rows of
+  a play is collapsed to one arbitrary row's value without warning, so add such columns to
+  FIELDER_VALUES. check_play_cols verifies the assumption before the pivot.
+
+  The reshape is lazy, so it can run from pl.scan_parquet and row filters on play level columns,
+  such as game_state_filter, can be applied before the pivot. A pl.DataFrame is also accepted.
 
   Args:
-      on_base_pl (pl.DataFrame): Takes in throw_home_runner_on_* data.
+      on_base_lf (pl.LazyFrame): Takes in throw_home_runner_on_* data.
+      check_play_cols (bool, optional): Raise a ValueError if a play level column has more than
+          one distinct value in a play. The check collects the data once, so it is off by
+          default.
   Returns:
       pl.LazyFrame: wider throw_home_runner_on_* data.
   """
+  if isinstance(on_base_lf, pl.DataFrame):
+    on_base_lf = on_base_lf.lazy()
+
   # Drop Null Fielder data (Note: Fielder values may still be null)
-  on_base_pl = on_base_pl.filter(
+  on_base_lf = on_base_lf.filter(
     pl.col("pos_id").is_not_null() | pl.col("mlb_person_id").is_not_null()
   )
 
-  on_base_pl = on_base_pl.with_columns(
+  on_base_lf = on_base_lf.with_columns(
     pl.col("mlb_person_id").cast(pl.Int64),
   )
 
-  # Get column names
-  on_base_pl_cols = on_base_pl.columns
-
-  # Specify the value columns for pivot
-  fielder_values = [
-    "pos_code",
-    "pos_id",
-    "mlb_person_id",
-    "at_pitch_x",
-    "at_pitch_y",
-    "at_zone_x",
-    "at_zone_y",
-    "at_landing_x",
-    "at_landing_y",
-    "at_fielded_x",
-    "at_fielded_y",
-    "at_throw_1_x",
-    "at_throw_1_y",
+  # whatever isnt a value column is a play level column
+  play_cols = [col for col in on_base_lf.collect_schema().names() if col not in FIELDER_VALUES]
+
+  if check_play_cols:
+    n_unique = (on_base_lf
+      .group_by("play_id")
+      .agg([pl.col(col).n_unique() for col in play_cols if col != "play_id"])
+      .drop("play_id")
+      .max()
+      .collect()
+    )
+    varying_cols = [col for col in n_unique.columns if (n_unique.item(0, col) or 0) > 1]
+    if varying_cols:
+      raise ValueError(
+        f"Play level columns vary within a play, add them to FIELDER_VALUES: {varying_cols}"
+      )
+
+  # Fielder value columns by position label
+  fielder_exprs = [
+    pl.col(value).filter(pl.col("pos_id") == pos_id).first().alias(f"{value}_{pos_label}")
+    for value in FIELDER_VALUES
+    for pos_id, pos_label in POSITION_LABELS.items()
   ]
 
-  # whatever isnt a value column is a key column. Duplicate Keys will be removed next
-  fielder_index = [col for col in on_base_pl_cols if col not in fielder_values]
-
-  # Make a column that converts position id to position names
-  on_base_pl = on_base_pl.with_columns(
-    pl.when(pl.col("pos_id") == 7)
-    .then(pl.lit("LF"))  # Left Fielder
-    .when(pl.col("pos_id") == 8)
-    .then(pl.lit("CF"))  # Center Fielder
-    .when(pl.col("pos_id") == 9)
-    .then(pl.lit("RF"))  # Right Fielder
-    .when(pl.col("pos_id") == 37)
-    .then(pl.lit("R3"))  # Runner on 3rd
-    .when(pl.col("pos_id") == 36)
-    .then(pl.lit("R2"))  # Runner on 2nd
-    .otherwise(pl.lit(None))
-    .alias("pos_label")
+  # Take the first value of each play level column and each fielder value by position label. Plays
+  # keep the order they first appear in, so downstream seeded splits select the same rows.
+  on_base_wide_lf = on_base_lf.group_by("play_id", maintain_order=True).agg(
+    [pl.col(col).first() for col in play_cols if col != "play_id"] + fielder_exprs
   )
 
-  # Pivot wider by position and take the first row of the index
-  on_third_wide_pl = on_base_pl.pivot(
-    values=fielder_values, index=fielder_index, on="pos_label", aggregate_function="first"
+  # Keep the original column order
+  on_base_wide_lf = on_base_wide_lf.select(
+    play_cols + [expr.meta.output_name() for expr in fielder_exprs]
   )
 
-  # Convert to pl.LazyFrame for potential memory efficiency and deferred execution
-  on_third_wide_lf = on_third_wide_pl.lazy()
-
-  return on_third_wide_lf
+  return on_base_wide_lf
@@ -6,11 +6,10 @@ import polars as pl
 
 def prep_arm_strength(path_list: List[str]) -> pl.LazyFrame:
   """
-  Prepare the arm strength data by concatenating the arm strength data and adding year columns.
-  Add 2 columns, year the data was aquired and the year after the data was aquired. The year
-  after is labled as previous year because from the perspective of a merge on the current year,
-  it would be the previous year. Concatenate all of the data sets into one. Assumes the file name
-  is arm_strength_<year>.py .
+  Prepare the arm strength data by concatenating the arm strength data and adding a year column.
+  Add the year the data was aquired as curr_year. Earlier years are used as a fallback by the
+  as-of joins in the merge functions. Concatenate all of the data sets into one. Assumes the file
+  name is arm_strength_<year>.py .
 
   Args:
       path_list: (str) list of absolute paths to arm stregth data.
@@ -29,7 +28,6 @@ def prep_arm_strength(path_list: List[str]) -> pl.LazyFrame:
     arm_strength_lf = pl.scan_csv(path)
     arm_strength_lf = arm_strength_lf.select(select_cols)
     arm_strength_lf = arm_strength_lf.with_columns(pl.lit(year).alias("curr_year"))
-    arm_strength_lf = arm_strength_lf.with_columns((pl.lit(year) + 1).alias("prev_year"))
     # Add to the arm_strength_lf to the list
     arm_strength_lf_list.append(arm_strength_lf)
 
@@ -0,0 +1,47 @@
+import os
+from typing import List
+
+import polars as pl
+
+
+def scan_on_base(
+  dataset_dir: str,
+  bases: List[str] = None,
+  years: List[int] = None,
+) -> pl.LazyFrame:
+  """
+  Lazily scan the partitioned dataset written by write_on_base_dataset.
+
+  Each base is scanned as its own hive dataset since the sprint columns are suffixed by the
+  position of the runner of interest, so the schemas differ between bases. Bases are
+  concatenated diagonally with nulls for the columns of other bases. Filters on year and column
+  selections are pushed down to the scan, so only the matching partitions and columns are read.
+
+  Args:
+      dataset_dir (str): Root directory of the partitioned dataset
+      bases (List[str], optional): Bases of the runner of interest. Defaults to every base.
+      years (List[int], optional): Seasons to scan. Defaults to every season.
+  Returns:
+      pl.LazyFrame: throw_home_runner_on_<base> data of the bases and seasons
+  """
+  if bases is None:
+    bases = sorted(
+      entry.name.split("=", 1)[1]
+      for entry in os.scandir(dataset_dir)
+      if entry.is_dir() and entry.name.startswith("base=")
+    )
+
+  base_dirs = [os.path.join(dataset_dir, f"base={base}") for base in bases]
+  missing_dirs = [base_dir for base_dir in base_dirs if not os.path.isdir(base_dir)]
+  if not base_dirs or missing_dirs:
+    raise ValueError(f"Partitioned on_base data not found at: {missing_dirs or dataset_dir}")
+
+  on_base_lfs = [pl.scan_parquet(base_dir, hive_partitioning=True) for base_dir in base_dirs]
+  on_base_lf = (
+    on_base_lfs[0] if len(on_base_lfs) == 1 else pl.concat(on_base_lfs, how="diagonal_relaxed")
+  )
+
+  if years is not None:
+    on_base_lf = on_base_lf.filter(pl.col("year").is_in(years))
+
+  return on_base_lf
@@ -0,0 +1,250 @@
+import hashlib
+import inspect
+import os
+import sys
+from types import CodeType
+from typing import Callable, Dict, List, Set
+
+import polars as pl
+
+# Salt of every stage key. Increment to invalidate all cached outputs, e.g. after a change in a
+# dependency that the hashed sources do not show.
+CACHE_VERSION = 1
+
+# Module level values hashed by repr when a stage references them
+CONSTANT_TYPES = (bool, int, float, str, bytes, tuple, list, dict, set, frozenset, type(None))
+
+
+class StageCache:
+  """
+  Content addressed checkpoint cache for data_prep and data_eng pipeline stages.
+
+  Each stage output is keyed on a hash of CACHE_VERSION, the function's name and source, its
+  arguments, and the content of the files it reads. The source of the project functions, classes and
+  modules the stage references is followed transitively, and module level constants are hashed by
+  value, e.g. FIELDER_VALUES in pivot_on_fielder or merge_by_positions in merge_sprint_by_position.
+  Editing a stage or anything it uses misses the cache for that stage and the stages after it, but
+  not the stages before it. Sources are identified by module name rather than path, so a checkout in
+  another directory shares the cache. Third party code is not hashed, so increment CACHE_VERSION
+  after an upgrade that changes stage outputs. The output is written once as <key>.parquet in
+  cache_dir and the next run with the same key scans the parquet instead of recomputing the stage.
+  LazyFrame arguments are identified by their serialized plan. The files a plan reads are identified
+  by path only, so list them in input_paths to key on their content instead. Outputs of earlier
+  cached stages scan a file named by their key, so chained stages are content addressed already.
+  PipelineProfiler passes these scans on unchanged, so profiled and unprofiled runs share keys.
+
+  When the files in cache_dir exceed max_cache_bytes, the least recently used outputs are
+  deleted.
+
+  Args:
+      cache_dir (str): Directory of the cached stage outputs.
+      max_cache_bytes (int, optional): Size limit of cache_dir before eviction. Defaults to 10 GB.
+      enabled (bool, optional): If False, stages are run without caching.
+      verbose (bool, optional): Print cache hits and misses.
+  """
+
+  def __init__(
+    self,
+    cache_dir: str,
+    max_cache_bytes: int = 10 * 1024**3,
+    enabled: bool = True,
+    verbose: bool = True,
+  ):
+    self.cache_dir = cache_dir
+    self.max_cache_bytes = max_cache_bytes
+    self.enabled = enabled
+    self.verbose = verbose
+    # File digests by (path, size, modified time) so unchanged files are hashed once
+    self._file_digests = dict()
+
+  def run(self, func: Callable, *args, input_paths: List[str] = [], **kwargs) -> pl.LazyFrame:
+    """
+    Run a pipeline stage, or scan its cached output if the stage was run with the same inputs.
+
+    Args:
+        func (Callable): Stage function returning a pl.LazyFrame or pl.DataFrame
+        *args: Positional arguments of func
+        input_paths (List[str], optional): Files read by the LazyFrame arguments
+        **kwargs: Keyword arguments of func
+    Returns:
+        pl.LazyFrame: Stage output scanned from the cache
+    """
+    if not self.enabled:
+      return func(*args, **kwargs)
+
+    key = self.stage_key(func, *args, input_paths=input_paths, **kwargs)
+    cache_path = os.path.join(self.cache_dir, f"{key}.parquet")
+
+    if os.path.exists(cache_path):
+      # Mark as recently used for eviction
+      os.utime(cache_path)
+      if self.verbose:
+        print(f"Stage cache hit for {func.__name__}: {cache_path}")
+      return pl.scan_parquet(cache_path)
+
+    if self.verbose:
+      print(f"Stage cache miss for {func.__name__}, running stage")
+
+    output = func(*args, **kwargs)
+    os.makedirs(self.cache_dir, exist_ok=True)
+
+    # Write to a temporary file and replace so an interrupted run never leaves a partial output
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    if isinstance(output, pl.LazyFrame):
+      output.sink_parquet(tmp_path)
+    else:
+      output.write_parquet(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+    self.evict()
+
+    return pl.scan_parquet(cache_path)
+
+  def stage_key(self, func: Callable, *args, input_paths: List[str] = [], **kwargs) -> str:
+    """
+    Hash of the stage function and the project code it references, its arguments, and the
+    content of its input files.
+
+    Args:
+        func (Callable): Stage function
+        *args: Positional arguments of func
+        input_paths (List[str], optional): Files read by the LazyFrame arguments
+        **kwargs: Keyword arguments of func
+    Returns:
+        str: Hex digest used as the cached output file name
+    """
+    # Input file paths are replaced by their content digests in the serialized plans
+    path_digests = dict()
+    for path in sorted(input_paths):
+      digest = self._file_digest(path)
+      path_digests[str(path)] = digest
+      path_digests[os.path.abspath(path)] = digest
+
+    hasher = hashlib.sha256()
+    hasher.update(f"{CACHE_VERSION}:{func.__module__}.{func.__qualname__}".encode())
+    for name, source in sorted(self._dependency_sources(func).items()):
+      hasher.update(f"{name}={source}".encode())
+    for name, value in [(None, arg) for arg in args] + sorted(kwargs.items()):
+      hasher.update(f"{name}=".encode())
+      hasher.update(self._value_digest(value, path_digests).encode())
+    for path in sorted(input_paths):
+      hasher.update(path_digests[str(path)].encode())
+
+    return hasher.hexdigest()
+
+  def evict(self):
+    """
+    Delete the least recently used cached outputs until cache_dir fits in max_cache_bytes.
+    """
+    cache_files = list()
+    for entry in os.scandir(self.cache_dir):
+      if entry.name.endswith(".parquet"):
+        stat = entry.stat()
+        cache_files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in cache_files)
+    for _, size, path in sorted(cache_files):
+      if total_bytes <= self.max_cache_bytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        # Already evicted by another worker
+        pass
+      total_bytes -= size
+      if self.verbose:
+        print(f"Evicted stage cache output: {path}")
+
+  def _value_digest(self, value, path_digests: dict) -> str:
+    """
+    Digest of a stage argument. Frames are hashed by their serialized plan with the input file
+    paths replaced by content digests, everything else by its repr.
+    """
+    if isinstance(value, pl.DataFrame):
+      value = value.lazy()
+    if isinstance(value, pl.LazyFrame):
+      plan = value.serialize()
+      for path, digest in path_digests.items():
+        plan = plan.replace(path.encode(), digest.encode())
+      return hashlib.sha256(plan).hexdigest()
+    return repr(value)
+
+  @staticmethod
+  def _dependency_sources(func: Callable) -> Dict[str, str]:
+    """
+    Source of the stage function and of the project functions, classes and modules it references,
+    followed transitively, and the repr of the module level constants they reference. Keyed by
+    qualified name. Objects defined outside the stage's source root are left out.
+    """
+    source_root = StageCache._source_root(func)
+    sources = dict()
+    pending = [func]
+    while pending:
+      obj = pending.pop()
+      name = f"{obj.__module__}.{obj.__qualname__}"
+      if name in sources:
+        continue
+      sources[name] = inspect.getsource(obj)
+
+      if inspect.isclass(obj):
+        functions = [value for value in vars(obj).values() if inspect.isfunction(value)]
+      else:
+        functions = [obj]
+      for function in functions:
+        for global_name in sorted(StageCache._code_names(function.__code__)):
+          if global_name not in function.__globals__:
+            continue
+          value = function.__globals__[global_name]
+          if isinstance(value, CONSTANT_TYPES):
+            sources[f"{function.__module__}.{global_name}"] = repr(value)
+          elif not StageCache._in_source_root(value, source_root):
+            continue
+          elif inspect.ismodule(value):
+            sources[value.__name__] = inspect.getsource(value)
+          elif inspect.isfunction(value) or inspect.isclass(value):
+            pending.append(value)
+
+    return sources
+
+  @staticmethod
+  def _code_names(code: CodeType) -> Set[str]:
+    """
+    Global and attribute names used by a code object and the functions and comprehensions nested
+    in it.
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+      if isinstance(const, CodeType):
+        names |= StageCache._code_names(const)
+    return names
+
+  @staticmethod
+  def _source_root(func: Callable) -> str:
+    """
+    Directory containing the top level package of the stage function, e.g. src.
+    """
+    top_module = sys.modules[func.__module__.split(".")[0]]
+    top_path = os.path.dirname(os.path.abspath(top_module.__file__))
+    return os.path.dirname(top_path) if hasattr(top_module, "__path__") else top_path
+
+  @staticmethod
+  def _in_source_root(value, source_root: str) -> bool:
+    """
+    Whether a function, class or module is defined in a file under source_root.
+    """
+    try:
+      source_file = inspect.getsourcefile(value)
+    except TypeError:
+      return False
+    return source_file is not None and os.path.abspath(source_file).startswith(source_root + os.sep)
+
+  def _file_digest(self, path: str) -> str:
+    """
+    Content digest of a file, memoized by path, size and modified time.
+    """
+    stat = os.stat(path)
+    file_id = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if file_id not in self._file_digests:
+      with open(path, "rb") as file:
+        self._file_digests[file_id] = hashlib.file_digest(file, "sha256").hexdigest()
+    return self._file_digests[file_id]
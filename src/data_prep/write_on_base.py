@@ -0,0 +1,72 @@
+import os
+from typing import List
+
+import polars as pl
+
+
+def write_on_base(
+  on_base_lf: pl.LazyFrame,
+  output_dir: str,
+  file_name: str,
+  formats: List[str] = ["parquet"],
+  compression: str = "zstd",
+  row_group_size: int = None,
+  streaming: bool = True,
+) -> List[str]:
+  """
+  Write the prepared on_base dataset to every requested file format while executing the lazy
+  plan once. The plan is sunk to the first format (parquet when requested), and every other
+  format is streamed from that written file, so the pivot, merges, and engineered features are
+  not recomputed per format and the full dataset is never held in memory.
+
+  Args:
+      on_base_lf: (pl.LazyFrame) The prepared throw_home_runner_on_<base> dataset.
+      output_dir: (str) Directory the files are written to, created if it does not exist.
+      file_name: (str) File name without the extension, e.g. throw_home_runner_on_third_wide.
+      formats: (List[str], optional) Output formats, any of "parquet" and "csv". CSV is an opt in
+          export for tools that cannot read parquet.
+      compression: (str, optional) Parquet compression, e.g. "zstd", "lz4" or "uncompressed".
+      row_group_size: (int, optional) Parquet rows per row group. None uses the Polars default.
+      streaming: (bool, optional) Use the Polars streaming engine to bound peak memory.
+  Returns:
+      List[str]: Absolute paths of the written files, parquet first when requested.
+  """
+  engine = "streaming" if streaming else "in-memory"
+
+  # Sinks by format name
+  sink_dict = {
+    "parquet": lambda lf, path: lf.sink_parquet(
+      path, compression=compression, row_group_size=row_group_size, engine=engine
+    ),
+    "csv": lambda lf, path: lf.sink_csv(path, engine=engine),
+  }
+  # Scans by format name for re-reading the first written file
+  scan_dict = {
+    "parquet": pl.scan_parquet,
+    "csv": lambda path: pl.scan_csv(path, infer_schema_length=None),
+  }
+
+  if not formats:
+    raise ValueError("At least one output format is required.")
+
+  unknown_formats = [fmt for fmt in formats if fmt not in sink_dict]
+  if unknown_formats:
+    raise ValueError(f"Unknown output formats: {unknown_formats}. Use any of {list(sink_dict)}.")
+
+  # Parquet keeps the schema intact, so it is the preferred source for the remaining formats
+  formats = sorted(dict.fromkeys(formats), key=lambda fmt: fmt != "parquet")
+  output_paths = [
+    os.path.abspath(os.path.join(output_dir, f"{file_name}.{fmt}")) for fmt in formats
+  ]
+
+  os.makedirs(output_dir, exist_ok=True)
+
+  # Execute the full plan once
+  sink_dict[formats[0]](on_base_lf, output_paths[0])
+
+  # Fan the written file out to the remaining formats
+  written_lf = scan_dict[formats[0]](output_paths[0])
+  for fmt, output_path in zip(formats[1:], output_paths[1:]):
+    sink_dict[fmt](written_lf, output_path)
+
+  return output_paths
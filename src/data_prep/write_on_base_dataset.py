@@ -0,0 +1,113 @@
+import os
+import shutil
+from typing import List
+
+import polars as pl
+
+# Hive directory name of null partition values
+HIVE_NULL_VALUE = "__HIVE_DEFAULT_PARTITION__"
+
+
+def write_on_base_dataset(
+  on_base_lf: pl.LazyFrame,
+  dataset_dir: str,
+  partition_by: List[str] = ["base", "year"],
+  sort_by: List[str] = ["game_date", "play_id"],
+  compression: str = "zstd",
+  compression_level: int = None,
+  row_group_size: int = 100_000,
+  statistics: bool = True,
+  streaming: bool = True,
+) -> List[str]:
+  """
+  Write the prepared on_base dataset as a hive partitioned parquet dataset, e.g.
+  <dataset_dir>/base=third/year=2023/part-0.parquet. Rows are sorted by sort_by and written in
+  row groups of row_group_size rows with min, max and null count statistics, so scans that filter
+  on a partition column skip whole directories and scans that filter on a sorted column skip row
+  groups.
+
+  The lazy plan is executed once into a sorted staging file next to dataset_dir, and each
+  partition is streamed out of the staging file. Partition columns are kept in the files so a
+  single file can be read on its own. Existing partitions under each value of the first partition
+  column are replaced, so workers writing different bases to the same dataset_dir do not collide.
+
+  Args:
+      on_base_lf (pl.LazyFrame): The prepared throw_home_runner_on_<base> dataset.
+      dataset_dir (str): Root directory of the partitioned dataset.
+      partition_by (List[str], optional): Partition columns, outermost first.
+      sort_by (List[str], optional): Columns the rows are sorted by within each partition. End
+          with a unique column such as play_id so the row order is reproducible.
+      compression (str, optional): Parquet compression, e.g. "zstd", "lz4", "snappy" or
+          "uncompressed".
+      compression_level (int, optional): Compression level of zstd, gzip or brotli.
+      row_group_size (int, optional): Rows per row group. None uses the Polars default.
+      statistics (bool, optional): Write column statistics to the row group metadata.
+      streaming (bool, optional): Use the Polars streaming engine to bound peak memory.
+  Returns:
+      List[str]: Absolute paths of the written partition files.
+  """
+  if not partition_by:
+    raise ValueError("At least one partition column is required.")
+
+  missing_cols = [
+    col for col in partition_by + sort_by if col not in on_base_lf.collect_schema().names()
+  ]
+  if missing_cols:
+    raise ValueError(f"Partition or sort columns not found in on_base_lf: {missing_cols}")
+
+  engine = "streaming" if streaming else "in-memory"
+  parquet_options = {
+    "compression": compression,
+    "compression_level": compression_level,
+    "statistics": statistics,
+    "row_group_size": row_group_size,
+    "engine": engine,
+  }
+
+  dataset_dir = os.path.abspath(dataset_dir)
+  parent_dir = os.path.dirname(dataset_dir)
+  os.makedirs(parent_dir, exist_ok=True)
+  staging_path = os.path.join(
+    parent_dir, f".{os.path.basename(dataset_dir)}.{os.getpid()}.staging.parquet"
+  )
+
+  try:
+    # Execute the full plan once, sorted so each partition is a contiguous run of row groups
+    on_base_lf.sort(partition_by + sort_by, nulls_last=True, maintain_order=True).sink_parquet(
+      staging_path, compression="uncompressed", engine=engine
+    )
+    staging_lf = pl.scan_parquet(staging_path)
+
+    partition_pl = staging_lf.select(partition_by).unique().sort(partition_by).collect()
+
+    # Replace the existing partitions of the values being written
+    for value in partition_pl.get_column(partition_by[0]).unique():
+      existing_dir = os.path.join(dataset_dir, _partition_dir_name(partition_by[0], value))
+      shutil.rmtree(existing_dir, ignore_errors=True)
+
+    output_paths = list()
+    for partition in partition_pl.iter_rows(named=True):
+      partition_dir = os.path.join(
+        dataset_dir, *[_partition_dir_name(col, value) for col, value in partition.items()]
+      )
+      os.makedirs(partition_dir, exist_ok=True)
+      output_path = os.path.join(partition_dir, "part-0.parquet")
+
+      partition_filter = [
+        pl.col(col).is_null() if value is None else pl.col(col) == value
+        for col, value in partition.items()
+      ]
+      staging_lf.filter(partition_filter).sink_parquet(output_path, **parquet_options)
+      output_paths.append(output_path)
+  finally:
+    if os.path.exists(staging_path):
+      os.remove(staging_path)
+
+  return output_paths
+
+
+def _partition_dir_name(col: str, value) -> str:
+  """
+  Hive directory name of a partition value, e.g. year=2023.
+  """
+  return f"{col}={HIVE_NULL_VALUE if value is None else value}"
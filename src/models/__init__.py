@@ -1,2 +1,20 @@
 from .create_model_pipeline import create_model_pipeline
-from .create_model_pipeline import model_prep_on_base
\ No newline at end of file
+from .create_model_pipeline import model_prep_on_base
+from .create_model_pipeline import stay_to_out
+from .censoring_experiment import run_censoring_experiment, run_threshold_sweep
+from .censoring_experiment import CENSORING_VARIANTS, SWEEP_TEST_LABELS
+from .sequential_search import SequentialSearchCV
+
+from .fold_cache import FoldCache
+from .approximate_neighbors import ApproximateNeighbors
+from .model_registry import MODEL_REGISTRY, register_model, make_model, XGBEarlyStoppingClassifier
+from .parallel_budget import ParallelBudget
+from .model_artifact import save_model_artifact, load_model_artifact, ARTIFACT_VERSION
+from .batch_score import batch_score
+from .compiled_predictor import CompiledPredictor, compile_pipeline
+from .scoring_server import ScoringServer, serve_model
+from .multi_response import run_multi_response, RUNNER_OUTCOMES
+from .evaluation import evaluate_models
+from .logistic_path import LogisticPathCV
+from .trial_store import TrialStore, ResumableSearchCV
+from .importance import batched_permutation_importance, IMPORTANCE_METRICS
\ No newline at end of file
@@ -0,0 +1,190 @@
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator
+from sklearn.utils import check_array, check_random_state
+
+
+class ApproximateNeighbors(BaseEstimator):
+    """
+    Approximate k nearest neighbor search for the SMOTE and ADASYN
+    oversamplers.
+
+    The fit data is partitioned into n_lists lists around centroids sampled
+    from the data and refined with one k-means step. A query only searches
+    the points of the n_probe lists nearest to its own list, with exact
+    distances computed in batched matrix products of at most chunk_size
+    queries. More probed lists are more accurate and slower, and probing every
+    list is an exact search.
+
+    Passed as k_neighbors of SMOTE or n_neighbors of ADASYN, n_neighbors must
+    include the sample itself, e.g. 6 for SMOTE's default of 5 neighbors.
+
+    Args:
+        n_neighbors: Number of neighbors returned per query
+        n_lists: Number of lists the fit data is partitioned into. Defaults to
+            the square root of the number of samples.
+        n_probe: Number of nearest lists searched per query
+        chunk_size: Maximum queries per distance batch
+        random_state: Random seed of the sampled centroids
+    """
+
+    def __init__(
+        self,
+        n_neighbors: int = 6,
+        n_lists: int = None,
+        n_probe: int = 8,
+        chunk_size: int = 1024,
+        random_state: int = None):
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        """
+        Partition the fit data into lists.
+
+        Args:
+            X: Data searched by kneighbors
+
+        Returns:
+            ApproximateNeighbors: The fitted search
+        """
+        X = _to_dense(X)
+        n_samples = X.shape[0]
+        if n_samples < self.n_neighbors:
+            raise ValueError(
+                f"Expected n_neighbors <= n_samples, got n_neighbors={self.n_neighbors} "
+                f"and n_samples={n_samples}"
+            )
+        random_state = check_random_state(self.random_state)
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n_samples))), n_samples)
+
+        # Sample centroids from the data and refine them with one k-means step
+        centroids = X[random_state.choice(n_samples, size=n_lists, replace=False)]
+        labels = self._nearest(X, centroids, 1)[:, 0]
+        counts = np.bincount(labels, minlength=n_lists)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        has_points = counts > 0
+        centroids[has_points] = sums[has_points] / counts[has_points, None]
+        labels = self._nearest(X, centroids, 1)[:, 0]
+
+        self.fit_X_ = X
+        self.centroids_ = centroids
+        self.list_order_ = np.argsort(labels, kind="stable")
+        self.list_bounds_ = np.concatenate(
+            [[0], np.cumsum(np.bincount(labels, minlength=n_lists))]
+        )
+        self.n_samples_fit_ = n_samples
+        return self
+
+    def kneighbors(self, X=None, n_neighbors: int = None, return_distance: bool = True):
+        """
+        Approximate nearest neighbors of the queries, nearest first.
+
+        Args:
+            X: Queries. None uses the fit data, including each point itself.
+            n_neighbors: Number of neighbors. Defaults to self.n_neighbors.
+            return_distance: Whether to return the distances
+
+        Returns:
+            Distances and indices, or indices, of shape (n_queries, n_neighbors)
+        """
+        X = self.fit_X_ if X is None else _to_dense(X)
+        n_neighbors = n_neighbors or self.n_neighbors
+        if n_neighbors > self.n_samples_fit_:
+            raise ValueError(
+                f"Expected n_neighbors <= n_samples_fit, got n_neighbors={n_neighbors} "
+                f"and n_samples_fit={self.n_samples_fit_}"
+            )
+
+        n_lists = len(self.centroids_)
+        n_probe = min(self.n_probe, n_lists)
+        # Lists nearest to each list, the list itself first
+        probe_lists = self._nearest(self.centroids_, self.centroids_, n_lists)
+        list_sizes = np.diff(self.list_bounds_)
+
+        query_lists = self._nearest(X, self.centroids_, 1)[:, 0]
+        distances = np.empty((X.shape[0], n_neighbors))
+        indices = np.empty((X.shape[0], n_neighbors), dtype=np.intp)
+
+        for list_idx in np.unique(query_lists):
+            # Probe at least n_probe lists and enough lists to hold n_neighbors points
+            probe = probe_lists[list_idx]
+            n_list_probe = max(
+                n_probe, np.searchsorted(np.cumsum(list_sizes[probe]), n_neighbors) + 1
+            )
+            pool = np.concatenate([
+                self.list_order_[self.list_bounds_[idx]:self.list_bounds_[idx + 1]]
+                for idx in probe[:n_list_probe]
+            ])
+            pool_X = self.fit_X_[pool]
+            pool_sq_norms = np.einsum("ij,ij->i", pool_X, pool_X)
+
+            queries = np.flatnonzero(query_lists == list_idx)
+            for start in range(0, len(queries), self.chunk_size):
+                chunk = queries[start:start + self.chunk_size]
+                chunk_X = X[chunk]
+                sq_distances = (
+                    np.einsum("ij,ij->i", chunk_X, chunk_X)[:, None]
+                    - 2 * chunk_X @ pool_X.T
+                    + pool_sq_norms[None, :]
+                )
+                np.maximum(sq_distances, 0, out=sq_distances)
+                nearest = np.argpartition(sq_distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+                nearest_sq = np.take_along_axis(sq_distances, nearest, axis=1)
+                order = np.argsort(nearest_sq, axis=1, kind="stable")
+                indices[chunk] = pool[np.take_along_axis(nearest, order, axis=1)]
+                distances[chunk] = np.sqrt(np.take_along_axis(nearest_sq, order, axis=1))
+
+        if return_distance:
+            return distances, indices
+        return indices
+
+    def kneighbors_graph(self, X=None, n_neighbors: int = None, mode: str = "connectivity"):
+        """
+        Sparse graph of the approximate nearest neighbors.
+
+        Args:
+            X: Queries. None uses the fit data.
+            n_neighbors: Number of neighbors. Defaults to self.n_neighbors.
+            mode: "connectivity" for ones or "distance" for distances
+
+        Returns:
+            sparse.csr_matrix: Graph of shape (n_queries, n_samples_fit)
+        """
+        distances, indices = self.kneighbors(X, n_neighbors, return_distance=True)
+        n_queries, n_neighbors = indices.shape
+        data = np.ones(indices.size) if mode == "connectivity" else distances.ravel()
+        indptr = np.arange(0, n_queries * n_neighbors + 1, n_neighbors)
+        return sparse.csr_matrix(
+            (data, indices.ravel(), indptr), shape=(n_queries, self.n_samples_fit_)
+        )
+
+    def _nearest(self, X, centroids, n_nearest: int) -> np.ndarray:
+        """
+        Indices of the n_nearest centroids of each row of X, nearest first.
+        """
+        centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+        nearest = np.empty((X.shape[0], n_nearest), dtype=np.intp)
+        for start in range(0, X.shape[0], self.chunk_size):
+            chunk_X = X[start:start + self.chunk_size]
+            sq_distances = centroid_sq_norms[None, :] - 2 * chunk_X @ centroids.T
+            if n_nearest < len(centroids):
+                top = np.argpartition(sq_distances, n_nearest - 1, axis=1)[:, :n_nearest]
+            else:
+                top = np.tile(np.arange(len(centroids)), (len(chunk_X), 1))
+            order = np.argsort(np.take_along_axis(sq_distances, top, axis=1), axis=1,
+                               kind="stable")
+            nearest[start:start + self.chunk_size] = np.take_along_axis(top, order, axis=1)
+        return nearest
+
+def _to_dense(X) -> np.ndarray:
+    """
+    Float64 array of the input. Sparse one hot encoded inputs are densified.
+    """
+    if sparse.issparse(X):
+        X = X.toarray()
+    return check_array(X, dtype=np.float64)
@@ -0,0 +1,100 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .model_artifact import load_model_artifact
+
+
+def batch_score(
+    artifact_dir: str,
+    source: str,
+    output_path: str,
+    id_cols: List[str] = ["game_id", "play_id"],
+    years: Optional[List[int]] = None,
+    batch_size: int = 100_000,
+    compression: str = "zstd",
+    verbose: bool = True):
+    """
+    Score on_base parquet data with a saved model artifact in fixed-size
+    record batches.
+
+    Only the id columns and the artifact's predictors are read, one batch of
+    at most batch_size rows at a time, so memory use is bounded by the batch
+    size rather than the size of the data. Each batch is converted to pandas,
+    scored and appended to the output parquet file. Rows with missing values
+    in predictors with drop imputation were dropped in training, so they get
+    a missing probability.
+
+    Args:
+        artifact_dir: Directory of an artifact from save_model_artifact
+        source: throw_home_runner_on_<base>_wide_sprint_arm parquet file, or a
+            base=<base> directory of the partitioned dataset
+        output_path: Parquet file the probabilities are written to
+        id_cols: Columns identifying a play, copied to the output
+        years: Seasons to score. None scores every season.
+        batch_size: Maximum rows per record batch
+        compression: Parquet compression codec of the output
+        verbose: Whether to print progress information
+
+    Returns:
+        dict: Output path and the number of rows and batches scored
+    """
+    pipeline, metadata = load_model_artifact(artifact_dir)
+    feature_names = metadata["feature_names"]
+    drop_null_features = metadata["drop_null_features"]
+    proba_col = f"{metadata['response_names'][0]}_proba"
+
+    # Partition columns are also stored in the files, so the directories are not parsed
+    dataset = ds.dataset(source, format="parquet")
+    read_cols = list(dict.fromkeys(id_cols + feature_names))
+    missing_cols = [col for col in read_cols if col not in dataset.schema.names]
+    if missing_cols:
+        raise ValueError(f"Columns not found in {source}: {missing_cols}")
+
+    # Read one batch ahead at most to bound memory
+    scanner = dataset.scanner(
+        columns=read_cols,
+        filter=ds.field("year").isin(years) if years is not None else None,
+        batch_size=batch_size,
+        batch_readahead=1,
+        fragment_readahead=1
+    )
+
+    output_schema = pa.schema(
+        [dataset.schema.field(col) for col in id_cols] + [pa.field(proba_col, pa.float64())]
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    n_rows, n_scored, n_batches = 0, 0, 0
+    with pq.ParquetWriter(output_path, output_schema, compression=compression) as writer:
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+
+            X_batch = batch.select(feature_names).to_pandas()
+            is_scored = ~X_batch[drop_null_features].isna().any(axis=1).to_numpy()
+            proba = np.full(batch.num_rows, np.nan)
+            if is_scored.any():
+                proba[is_scored] = pipeline.predict_proba(X_batch[is_scored])[:, -1]
+
+            writer.write_table(pa.Table.from_arrays(
+                [batch.column(col) for col in id_cols] + [pa.array(proba, mask=~is_scored)],
+                schema=output_schema
+            ))
+            n_rows += batch.num_rows
+            n_scored += int(is_scored.sum())
+            n_batches += 1
+
+    if verbose:
+        print(f"Scored {n_scored} of {n_rows} rows in {n_batches} batches to: {output_path}")
+
+    return {
+        "output_path": output_path,
+        "n_rows": n_rows,
+        "n_scored": n_scored,
+        "n_batches": n_batches,
+    }
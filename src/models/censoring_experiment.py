@@ -0,0 +1,577 @@
+import copy
+import numpy as np
+import polars as pl
+from typing import List, Dict
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import brier_score_loss, log_loss, get_scorer
+from sklearn.model_selection import GridSearchCV, ParameterGrid, check_cv, train_test_split
+
+from imblearn.pipeline import Pipeline as ImbPipeline
+
+from .create_model_pipeline import stay_to_out
+
+# Test labels of the threshold sweep
+SWEEP_TEST_LABELS = ["umod", "threshold", "converted"]
+
+# Labeling variants of the censoring study in notebooks/mod_censored.ipynb
+CENSORING_VARIANTS = {
+    "umod_umod": {
+        "is_out_censored": False, "test_stay_to_out": False, "test_stay_to_out_threshold": False
+    },
+    "censored_umod": {
+        "is_out_censored": True, "test_stay_to_out": False, "test_stay_to_out_threshold": False
+    },
+    "censored_censored": {
+        "is_out_censored": True, "test_stay_to_out": False, "test_stay_to_out_threshold": True
+    },
+    "censored_converted": {
+        "is_out_censored": True, "test_stay_to_out": True, "test_stay_to_out_threshold": False
+    },
+}
+
+
+def run_censoring_experiment(
+    on_base_lf: pl.LazyFrame,
+    grid_search: GridSearchCV,
+    variants: Dict[str, Dict] = CENSORING_VARIANTS,
+    cat_predictors_drop: List[str] = [],
+    cat_predictors_mode: List[str] = [],
+    num_predictors_drop: List[str] = [],
+    num_predictors_median: List[str] = [],
+    test_size: float = 0.30,
+    random_state: int = 123,
+    max_distance: float = 265,
+    n_jobs: int = -1,
+    verbose: bool = True):
+    """
+    Compare is_out labeling variants on one data pass.
+
+    The data is collected, split and assigned to cross-validation folds once
+    with the unmodified is_out labels, so every variant is trained and tested
+    on the same rows. The preprocessor of the grid search pipeline does not
+    use the labels, so it is fit once per fold and once on the full train set
+    and shared by every variant. Only the oversampler and classifier are fit
+    per variant, parameter set and fold, in parallel with n_jobs.
+
+    Args:
+        on_base_lf: Polars LazyFrame with the data
+        grid_search: GridSearchCV from create_model_pipeline. Its param_grid
+            may only tune the oversampler and classifier steps.
+        variants: Variant names mapped to the is_out_censored,
+            test_stay_to_out and test_stay_to_out_threshold options of
+            model_prep_on_base
+        cat_predictors_drop: Categorical predictors with drop imputation
+        cat_predictors_mode: Categorical predictors with mode imputation
+        num_predictors_drop: Numerical predictors with drop imputation
+        num_predictors_median: Numerical predictors with median imputation
+        test_size: Proportion of data for testing
+        random_state: Random seed for reproducibility
+        max_distance: Stays caught at most this many feet from home are
+            censored by is_out_censored and test_stay_to_out_threshold
+        n_jobs: Number of parallel fits, -1 uses every core
+        verbose: Whether to print the comparison table
+
+    Returns:
+        dict: comparison, one row per variant with its best parameters, CV
+            score and test metrics; cv_results, one row per variant, parameter
+            set and fold; results, model_prep_on_base style results by variant
+    """
+    # ==== Validate Inputs ====
+    if not hasattr(grid_search, "param_grid"):
+        raise ValueError("Use a grid or bayesian search_strategy, the variants share one grid")
+    param_grid = ParameterGrid(grid_search.param_grid or {})
+    tuned_steps = {name.split("__")[0] for params in param_grid for name in params}
+    if tuned_steps - {"oversampler", "classifier"}:
+        raise ValueError(
+            f"Only the oversampler and classifier can be tuned, got: {sorted(tuned_steps)}"
+        )
+
+    for name, options in variants.items():
+        if options.get("test_stay_to_out") and options.get("test_stay_to_out_threshold"):
+            raise ValueError(
+                f"Variant {name} sets both test_stay_to_out and test_stay_to_out_threshold"
+            )
+
+    scorers = _get_scorers(grid_search.scoring)
+    refit = grid_search.refit if isinstance(grid_search.refit, str) else next(iter(scorers))
+
+    # ==== Data Preparation ====
+    all_predictors = (cat_predictors_drop + cat_predictors_mode +
+                      num_predictors_drop + num_predictors_median)
+    drop_null_features = cat_predictors_drop + num_predictors_drop
+    select_cols = list(dict.fromkeys(
+        all_predictors + ["is_out", "is_stay", "distance_catch_to_home"]
+    ))
+    data = on_base_lf.select(select_cols).collect()
+
+    # Same split as model_prep_on_base
+    train_idx, test_idx = train_test_split(
+        np.arange(data.height),
+        test_size=test_size,
+        shuffle=True,
+        stratify=data.select("is_out").to_numpy(),
+        random_state=random_state
+    )
+    train_set = data[train_idx].drop_nulls(drop_null_features + ["is_out"])
+    test_set = data[test_idx].drop_nulls(drop_null_features + ["is_out"])
+
+    X_train = train_set.select(all_predictors).to_pandas()
+    X_test = test_set.select(all_predictors).to_pandas()
+
+    # Labels by variant
+    y_train_dict = dict()
+    y_test_dict = dict()
+    for name, options in variants.items():
+        variant_train = train_set
+        variant_test = test_set
+        if options.get("is_out_censored"):
+            variant_train = stay_to_out(variant_train, max_distance=max_distance)
+        if options.get("test_stay_to_out"):
+            variant_test = stay_to_out(variant_test)
+        elif options.get("test_stay_to_out_threshold"):
+            variant_test = stay_to_out(variant_test, max_distance=max_distance)
+        y_train_dict[name] = variant_train.get_column("is_out").to_numpy()
+        y_test_dict[name] = variant_test.get_column("is_out").to_numpy()
+
+    # Folds from the unmodified labels, shared by every variant
+    y_train_umod = train_set.get_column("is_out").to_numpy()
+    cv = check_cv(grid_search.cv, y_train_umod, classifier=True)
+    folds = list(cv.split(X_train, y_train_umod))
+
+    # ==== Shared Preprocessing ====
+    preprocessor = grid_search.estimator.named_steps["preprocessor"]
+    parallel = Parallel(n_jobs=n_jobs)
+    fold_data = parallel(
+        delayed(_fit_transform)(clone(preprocessor), X_train.iloc[fit_idx], X_train.iloc[val_idx])
+        for fit_idx, val_idx in folds
+    )
+    full_preprocessor, Xt_train, Xt_test = _fit_transform(clone(preprocessor), X_train, X_test)
+
+    # ==== Cross Validation by Variant ====
+    # Oversampler and classifier steps of the grid search pipeline
+    model_tail = ImbPipeline(grid_search.estimator.steps[1:])
+    tasks = [
+        (name, param_idx, fold_idx)
+        for name in variants
+        for param_idx in range(len(param_grid))
+        for fold_idx in range(len(folds))
+    ]
+    fold_scores = parallel(
+        delayed(_fit_score)(
+            clone(model_tail),
+            param_grid[param_idx],
+            fold_data[fold_idx][1],
+            y_train_dict[name][folds[fold_idx][0]],
+            fold_data[fold_idx][2],
+            y_train_dict[name][folds[fold_idx][1]],
+            scorers,
+        )
+        for name, param_idx, fold_idx in tasks
+    )
+
+    cv_results = pl.DataFrame([
+        {"variant": name, "param_index": param_idx, "params": str(param_grid[param_idx]),
+         "fold": fold_idx, **scores}
+        for (name, param_idx, fold_idx), scores in zip(tasks, fold_scores)
+    ])
+
+    best_pl = (cv_results
+        .group_by(["variant", "param_index"])
+        .agg(pl.col(refit).mean().alias("best_score"))
+        .sort(["variant", "best_score", "param_index"], descending=[False, True, False])
+        .unique(subset="variant", keep="first", maintain_order=True)
+    )
+    best_params = {
+        row["variant"]: (param_grid[row["param_index"]], row["best_score"])
+        for row in best_pl.iter_rows(named=True)
+    }
+
+    # ==== Refit and Evaluate by Variant ====
+    fitted_tails = parallel(
+        delayed(_fit_tail)(clone(model_tail), best_params[name][0], Xt_train, y_train_dict[name])
+        for name in variants
+    )
+
+    comparison_rows = list()
+    results = dict()
+    for (name, options), fitted_tail in zip(variants.items(), fitted_tails):
+        y_test = y_test_dict[name]
+        y_pred = fitted_tail.predict(Xt_test)
+        y_pred_proba = fitted_tail.predict_proba(Xt_test)[:, 1]
+        pred_brier_score = brier_score_loss(y_test, y_pred_proba)
+        pred_log_loss = log_loss(y_test, y_pred_proba, labels=[False, True])
+
+        params, best_score = best_params[name]
+        comparison_rows.append({
+            "variant": name,
+            **{option: bool(options.get(option, False)) for option in
+               ["is_out_censored", "test_stay_to_out", "test_stay_to_out_threshold"]},
+            "n_train": len(y_train_dict[name]),
+            "n_test": len(y_test),
+            "train_is_out": int(y_train_dict[name].sum()),
+            "test_is_out": int(y_test.sum()),
+            "best_params": str(params),
+            "best_cv_score": best_score,
+            "brier_score": pred_brier_score,
+            "log_loss": pred_log_loss,
+        })
+        results[name] = {
+            'pipeline': ImbPipeline([("preprocessor", full_preprocessor)] + fitted_tail.steps),
+            'y_train': y_train_dict[name],
+            'y_test': y_test,
+            'y_pred': y_pred,
+            'y_pred_proba': y_pred_proba,
+            'brier_score': pred_brier_score,
+            'log_loss': pred_log_loss,
+            'best_params': params,
+        }
+
+    comparison = pl.DataFrame(comparison_rows)
+
+    if verbose:
+        with pl.Config(tbl_cols=-1, fmt_str_lengths=80):
+            print(comparison.drop("best_params"))
+
+    return {
+        'comparison': comparison,
+        'cv_results': cv_results,
+        'results': results,
+        'X_train': X_train,
+        'X_test': X_test,
+        'feature_names': all_predictors,
+    }
+
+def run_threshold_sweep(
+    on_base_lf: pl.LazyFrame,
+    grid_search: GridSearchCV,
+    thresholds: List[float],
+    test_labels: str = "threshold",
+    cat_predictors_drop: List[str] = [],
+    cat_predictors_mode: List[str] = [],
+    num_predictors_drop: List[str] = [],
+    num_predictors_median: List[str] = [],
+    test_size: float = 0.30,
+    random_state: int = 123,
+    warm_start: bool = True,
+    n_jobs: int = -1,
+    verbose: bool = True):
+    """
+    Sweep the distance threshold of is_out censoring on one data pass.
+
+    For each threshold, stays caught at most that many feet from home are
+    relabeled as outs in the train set, as by is_out_censored with
+    max_distance. The labels of every threshold are built at once by one
+    Polars select. The data is collected, split, assigned to folds and
+    preprocessed once, like run_censoring_experiment. Thresholds with no stay
+    between them give the same labels and share their fits, so only distinct
+    label sets are fit.
+
+    The distinct label sets of a parameter set and fold are fit in threshold
+    order by one parallel task. With warm_start, a LogisticRegression
+    classifier starts each fit from the coefficients of the previous
+    threshold, which are close because the labels only change for the stays
+    between the two thresholds.
+
+    test_labels picks the test set labels:
+        "umod": Unmodified is_out
+        "threshold": Censored at the same threshold as the train set, as by
+            test_stay_to_out_threshold
+        "converted": Every stay relabeled as an out, as by test_stay_to_out
+
+    Args:
+        on_base_lf: Polars LazyFrame with the data
+        grid_search: GridSearchCV from create_model_pipeline. Its param_grid
+            may only tune the oversampler and classifier steps.
+        thresholds: Censoring distances in feet
+        test_labels: "umod", "threshold" or "converted"
+        cat_predictors_drop: Categorical predictors with drop imputation
+        cat_predictors_mode: Categorical predictors with mode imputation
+        num_predictors_drop: Numerical predictors with drop imputation
+        num_predictors_median: Numerical predictors with median imputation
+        test_size: Proportion of data for testing
+        random_state: Random seed for reproducibility
+        warm_start: Whether LogisticRegression fits start from the previous
+            threshold's coefficients
+        n_jobs: Number of parallel fits, -1 uses every core
+        verbose: Whether to print the sweep table
+
+    Returns:
+        dict: sweep, one row per threshold with the label counts, best
+            parameters, CV score and test metrics; cv_results, one row per
+            label set, parameter set and fold; results, model_prep_on_base
+            style results by threshold
+    """
+    # ==== Validate Inputs ====
+    if test_labels not in SWEEP_TEST_LABELS:
+        raise ValueError(f"Unknown test_labels: {test_labels}. Use one of {SWEEP_TEST_LABELS}")
+    if len(thresholds) == 0:
+        raise ValueError("thresholds must have at least one distance")
+    if not hasattr(grid_search, "param_grid"):
+        raise ValueError("Use a grid or bayesian search_strategy, the thresholds share one grid")
+    param_grid = ParameterGrid(grid_search.param_grid or {})
+    tuned_steps = {name.split("__")[0] for params in param_grid for name in params}
+    if tuned_steps - {"oversampler", "classifier"}:
+        raise ValueError(
+            f"Only the oversampler and classifier can be tuned, got: {sorted(tuned_steps)}"
+        )
+
+    scorers = _get_scorers(grid_search.scoring)
+    refit = grid_search.refit if isinstance(grid_search.refit, str) else next(iter(scorers))
+    thresholds = np.sort(np.asarray(thresholds, dtype=float))
+
+    # ==== Data Preparation ====
+    all_predictors = (cat_predictors_drop + cat_predictors_mode +
+                      num_predictors_drop + num_predictors_median)
+    drop_null_features = cat_predictors_drop + num_predictors_drop
+    select_cols = list(dict.fromkeys(
+        all_predictors + ["is_out", "is_stay", "distance_catch_to_home"]
+    ))
+    data = on_base_lf.select(select_cols).collect()
+
+    # Same split as model_prep_on_base
+    train_idx, test_idx = train_test_split(
+        np.arange(data.height),
+        test_size=test_size,
+        shuffle=True,
+        stratify=data.select("is_out").to_numpy(),
+        random_state=random_state
+    )
+    train_set = data[train_idx].drop_nulls(drop_null_features + ["is_out"])
+    test_set = data[test_idx].drop_nulls(drop_null_features + ["is_out"])
+
+    X_train = train_set.select(all_predictors).to_pandas()
+    X_test = test_set.select(all_predictors).to_pandas()
+
+    # Labels of every threshold, shape (n_rows, n_thresholds)
+    y_train_sweep = _censored_labels(train_set, thresholds)
+    if test_labels == "threshold":
+        y_test_sweep = _censored_labels(test_set, thresholds)
+    else:
+        y_test = (stay_to_out(test_set) if test_labels == "converted" else test_set)
+        y_test_sweep = np.repeat(
+            y_test.get_column("is_out").to_numpy()[:, None], len(thresholds), axis=1
+        )
+
+    # Labels only change with the threshold when a stay lies between two thresholds. Sorted
+    # thresholds with the same train labels share a label set and its fits.
+    changed = np.any(y_train_sweep[:, 1:] != y_train_sweep[:, :-1], axis=0)
+    label_set = np.concatenate([[0], np.cumsum(changed)])
+    set_columns = [int(np.flatnonzero(label_set == idx)[0]) for idx in range(label_set[-1] + 1)]
+    y_train_sets = [y_train_sweep[:, column] for column in set_columns]
+
+    # Folds from the unmodified labels, shared by every threshold
+    y_train_umod = train_set.get_column("is_out").to_numpy()
+    cv = check_cv(grid_search.cv, y_train_umod, classifier=True)
+    folds = list(cv.split(X_train, y_train_umod))
+
+    # ==== Shared Preprocessing ====
+    preprocessor = grid_search.estimator.named_steps["preprocessor"]
+    parallel = Parallel(n_jobs=n_jobs)
+    fold_data = parallel(
+        delayed(_fit_transform)(clone(preprocessor), X_train.iloc[fit_idx], X_train.iloc[val_idx])
+        for fit_idx, val_idx in folds
+    )
+    full_preprocessor, Xt_train, Xt_test = _fit_transform(clone(preprocessor), X_train, X_test)
+
+    # ==== Cross Validation along the Thresholds ====
+    # Oversampler and classifier steps of the grid search pipeline
+    model_tail = ImbPipeline(grid_search.estimator.steps[1:])
+    warm_start = warm_start and type(model_tail.named_steps["classifier"]).__name__ in [
+        "LogisticRegression"
+    ]
+    tasks = [
+        (param_idx, fold_idx)
+        for param_idx in range(len(param_grid))
+        for fold_idx in range(len(folds))
+    ]
+    chain_scores = parallel(
+        delayed(_fit_score_chain)(
+            clone(model_tail),
+            param_grid[param_idx],
+            fold_data[fold_idx][1],
+            [y_train[folds[fold_idx][0]] for y_train in y_train_sets],
+            fold_data[fold_idx][2],
+            [y_train[folds[fold_idx][1]] for y_train in y_train_sets],
+            scorers,
+            warm_start,
+        )
+        for param_idx, fold_idx in tasks
+    )
+
+    cv_results = pl.DataFrame([
+        {"label_set": set_idx, "param_index": param_idx, "params": str(param_grid[param_idx]),
+         "fold": fold_idx, **scores}
+        for (param_idx, fold_idx), chain in zip(tasks, chain_scores)
+        for set_idx, scores in enumerate(chain)
+    ])
+
+    best_pl = (cv_results
+        .group_by(["label_set", "param_index"])
+        .agg(pl.col(refit).mean().alias("best_score"))
+        .sort(["label_set", "best_score", "param_index"], descending=[False, True, False])
+        .unique(subset="label_set", keep="first", maintain_order=True)
+    )
+    best_params = {
+        row["label_set"]: (row["param_index"], row["best_score"])
+        for row in best_pl.iter_rows(named=True)
+    }
+
+    # ==== Refit and Evaluate by Threshold ====
+    # Label sets with the same best parameters are refit along one chain
+    refit_chains = dict()
+    for set_idx, (param_idx, _) in best_params.items():
+        refit_chains.setdefault(param_idx, list()).append(set_idx)
+    fitted_chains = parallel(
+        delayed(_fit_chain)(
+            clone(model_tail), param_grid[param_idx], Xt_train,
+            [y_train_sets[set_idx] for set_idx in set_indices], warm_start
+        )
+        for param_idx, set_indices in refit_chains.items()
+    )
+    fitted_tails = {
+        set_idx: fitted_tail
+        for set_indices, chain in zip(refit_chains.values(), fitted_chains)
+        for set_idx, fitted_tail in zip(set_indices, chain)
+    }
+    set_proba = {
+        set_idx: fitted_tail.predict_proba(Xt_test)[:, 1]
+        for set_idx, fitted_tail in fitted_tails.items()
+    }
+
+    n_stays_train = int(train_set.get_column("is_stay").fill_null(False).sum())
+    sweep_rows = list()
+    results = dict()
+    for column, threshold in enumerate(thresholds):
+        set_idx = int(label_set[column])
+        param_idx, best_score = best_params[set_idx]
+        y_train = y_train_sets[set_idx]
+        y_test = y_test_sweep[:, column]
+        y_pred_proba = set_proba[set_idx]
+        pred_brier_score = brier_score_loss(y_test, y_pred_proba)
+        pred_log_loss = log_loss(y_test, y_pred_proba, labels=[False, True])
+
+        sweep_rows.append({
+            "threshold": float(threshold),
+            "label_set": set_idx,
+            "n_train": len(y_train),
+            "n_test": len(y_test),
+            "train_censored": int(y_train.sum() - y_train_umod.sum()),
+            "train_censored_share": (y_train.sum() - y_train_umod.sum()) / max(n_stays_train, 1),
+            "train_is_out": int(y_train.sum()),
+            "test_is_out": int(y_test.sum()),
+            "best_params": str(param_grid[param_idx]),
+            "best_cv_score": best_score,
+            "brier_score": pred_brier_score,
+            "log_loss": pred_log_loss,
+        })
+        results[float(threshold)] = {
+            'pipeline': ImbPipeline(
+                [("preprocessor", full_preprocessor)] + fitted_tails[set_idx].steps
+            ),
+            'y_train': y_train,
+            'y_test': y_test,
+            'y_pred': y_pred_proba >= 0.5,
+            'y_pred_proba': y_pred_proba,
+            'brier_score': pred_brier_score,
+            'log_loss': pred_log_loss,
+            'best_params': param_grid[param_idx],
+        }
+
+    sweep = pl.DataFrame(sweep_rows)
+
+    if verbose:
+        print(f"Fit {len(y_train_sets)} distinct label sets for {len(thresholds)} thresholds")
+        with pl.Config(tbl_cols=-1, tbl_rows=-1, fmt_str_lengths=80):
+            print(sweep.drop("best_params"))
+
+    return {
+        'sweep': sweep,
+        'cv_results': cv_results,
+        'results': results,
+        'X_train': X_train,
+        'X_test': X_test,
+        'feature_names': all_predictors,
+    }
+
+def _get_scorers(scoring) -> Dict:
+    """
+    Scorers by name from a GridSearchCV scoring argument.
+    """
+    if isinstance(scoring, dict):
+        return {name: get_scorer(scorer) for name, scorer in scoring.items()}
+    return {"score": get_scorer(scoring) if scoring is not None else None}
+
+def _fit_transform(preprocessor, X_fit, X_other):
+    """
+    Fit a preprocessor and transform the fit and held out data.
+    """
+    Xt_fit = preprocessor.fit_transform(X_fit)
+    return preprocessor, Xt_fit, preprocessor.transform(X_other)
+
+def _fit_tail(model_tail, params, Xt, y):
+    """
+    Fit the oversampler and classifier on preprocessed data.
+    """
+    return model_tail.set_params(**params).fit(Xt, y)
+
+def _fit_score(model_tail, params, Xt_fit, y_fit, Xt_val, y_val, scorers) -> Dict:
+    """
+    Fit the oversampler and classifier on one fold and score the held out fold.
+    """
+    model_tail = _fit_tail(model_tail, params, Xt_fit, y_fit)
+    return {
+        name: scorer(model_tail, Xt_val, y_val) if scorer is not None
+        else model_tail.score(Xt_val, y_val)
+        for name, scorer in scorers.items()
+    }
+
+def _censored_labels(on_base_df: pl.DataFrame, thresholds: np.ndarray) -> np.ndarray:
+    """
+    is_out censored at each threshold as by stay_to_out, shape (n_rows, n_thresholds).
+    """
+    is_stay = pl.col("is_stay").fill_null(False)
+    distance = pl.col("distance_catch_to_home")
+    return on_base_df.select([
+        (pl.col("is_out") | (is_stay & (distance <= threshold)).fill_null(False))
+        .alias(f"is_out_{column}")
+        for column, threshold in enumerate(thresholds)
+    ]).to_numpy()
+
+def _fit_chain(model_tail, params, Xt, y_sets, warm_start) -> List:
+    """
+    Fit the oversampler and classifier on each label set in order, optionally
+    warm-starting the classifier from the previous fit. Returns a copy of
+    the fitted tail per label set.
+    """
+    model_tail = model_tail.set_params(**params)
+    if warm_start:
+        model_tail.set_params(classifier__warm_start=True)
+    fitted_tails = list()
+    for y in y_sets:
+        fitted_tail = copy.deepcopy(model_tail.fit(Xt, y))
+        if warm_start:
+            fitted_tail.set_params(classifier__warm_start=False)
+        fitted_tails.append(fitted_tail)
+    return fitted_tails
+
+def _fit_score_chain(model_tail, params, Xt_fit, y_fit_sets, Xt_val, y_val_sets, scorers,
+                     warm_start) -> List[Dict]:
+    """
+    Fit the oversampler and classifier on one fold for each label set in
+    order, optionally warm-starting the classifier, and score the held out
+    fold.
+    """
+    model_tail = model_tail.set_params(**params)
+    if warm_start:
+        model_tail.set_params(classifier__warm_start=True)
+    chain_scores = list()
+    for y_fit, y_val in zip(y_fit_sets, y_val_sets):
+        model_tail.fit(Xt_fit, y_fit)
+        chain_scores.append({
+            name: scorer(model_tail, Xt_val, y_val) if scorer is not None
+            else model_tail.score(Xt_val, y_val)
+            for name, scorer in scorers.items()
+        })
+    return chain_scores
@@ -0,0 +1,315 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Models are matched by class name, so loading and running a compiled predictor only needs NumPy
+LINEAR_MODELS = ["LogisticRegression"]
+TREE_MODELS = ["RandomForestClassifier", "GradientBoostingClassifier",
+               "HistGradientBoostingClassifier"]
+
+
+class CompiledPredictor:
+    """
+    NumPy predictor compiled from a fitted create_model_pipeline pipeline
+    for low latency scoring of single plays or small batches.
+
+    The preprocessor is compiled to arrays of imputation values, means and
+    scales and to a dictionary per categorical predictor from category to
+    one hot column. For LogisticRegression the scaler is folded into the
+    coefficients and each category maps directly to its coefficient, so a
+    play is scored with one dot product and one lookup per categorical
+    predictor. Tree ensembles are flattened into one set of node arrays and
+    every tree is traversed at once, one level per step.
+
+    Plays are passed as dictionaries of predictor values. Plays missing a
+    predictor with drop imputation were dropped in training and get a
+    missing probability.
+
+    Use compile_pipeline to create a CompiledPredictor.
+    """
+
+    def __init__(self, preprocessor: Dict, model: Dict):
+        self.preprocessor = preprocessor
+        self.model = model
+        self.feature_names = preprocessor["num_cols"] + preprocessor["cat_cols"]
+
+    def predict_proba(self, rows: List[Dict]) -> np.ndarray:
+        """
+        Probabilities of the positive class.
+
+        Args:
+            rows: Plays as dictionaries of predictor values
+
+        Returns:
+            np.ndarray: Probability per play, nan for plays missing a
+                predictor with drop imputation
+        """
+        prep = self.preprocessor
+        num, cat_idx, is_valid = self._encode(rows)
+
+        if self.model["kind"] == "linear":
+            logit = self.model["intercept"] + num @ self.model["num_weights"]
+            for col_idx, weights in enumerate(self.model["cat_weights"]):
+                logit += np.where(cat_idx[:, col_idx] >= 0, weights[cat_idx[:, col_idx]], 0.0)
+            proba = _sigmoid(logit)
+        else:
+            X = np.zeros((len(rows), prep["n_features_out"]))
+            X[:, prep["num_out_idx"]] = (num - prep["num_mean"]) / prep["num_scale"]
+            for col_idx, offset in enumerate(prep["cat_offsets"]):
+                has_cat = cat_idx[:, col_idx] >= 0
+                X[has_cat, offset + cat_idx[has_cat, col_idx]] = 1.0
+            proba = self._predict_trees(X)
+
+        return np.where(is_valid, proba, np.nan)
+
+    def predict_one(self, row: Dict) -> Optional[float]:
+        """
+        Probability of the positive class of one play, None when it is
+        missing a predictor with drop imputation.
+        """
+        proba = self.predict_proba([row])[0]
+        return None if np.isnan(proba) else float(proba)
+
+    def _encode(self, rows: List[Dict]):
+        """
+        Imputed numeric predictors, one hot column of each categorical
+        predictor, -1 for unknown categories, and whether each play can be
+        scored.
+        """
+        prep = self.preprocessor
+        num = np.array(
+            [[row.get(col) for col in prep["num_cols"]] for row in rows], dtype=np.float64
+        ).reshape(len(rows), len(prep["num_cols"]))
+        is_missing = np.isnan(num)
+        is_valid = ~(is_missing & prep["num_required"]).any(axis=1)
+        num = np.where(is_missing, prep["num_impute"], num)
+
+        cat_idx = np.full((len(rows), len(prep["cat_cols"])), -1, dtype=np.intp)
+        for col_idx, col in enumerate(prep["cat_cols"]):
+            lookup = prep["cat_lookup"][col_idx]
+            impute = prep["cat_impute"][col_idx]
+            for row_idx, row in enumerate(rows):
+                value = row.get(col)
+                if value is None or value != value:
+                    if prep["cat_required"][col_idx]:
+                        is_valid[row_idx] = False
+                        continue
+                    value = impute
+                cat_idx[row_idx, col_idx] = lookup.get(value, -1)
+
+        return num, cat_idx, is_valid
+
+    def _predict_trees(self, X: np.ndarray) -> np.ndarray:
+        """
+        Average probability or summed log odds of the trees.
+        """
+        leaf_values = self._leaf_values(X)
+        if self.model["aggregate"] == "mean_proba":
+            return leaf_values.mean(axis=1)
+        return _sigmoid(self.model["baseline"] + leaf_values.sum(axis=1))
+
+    def _leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """
+        Traverse the flattened trees one level per step for every play and tree at once.
+        """
+        trees = self.model
+        if trees["float32_features"]:
+            X = X.astype(np.float32)
+        node = np.tile(trees["roots"], (X.shape[0], 1))
+        rows = np.arange(X.shape[0])[:, None]
+        for _ in range(trees["max_depth"]):
+            is_leaf = trees["is_leaf"][node]
+            if is_leaf.all():
+                break
+            x = X[rows, trees["feature"][node]]
+            go_left = np.where(
+                np.isnan(x), trees["missing_left"][node], x <= trees["threshold"][node]
+            )
+            child = np.where(go_left, trees["left"][node], trees["right"][node])
+            node = np.where(is_leaf, node, child)
+
+        return trees["value"][node]
+
+def compile_pipeline(pipeline) -> CompiledPredictor:
+    """
+    Compile a fitted pipeline from create_model_pipeline into a NumPy predictor.
+
+    Supports LogisticRegression, RandomForestClassifier,
+    GradientBoostingClassifier and HistGradientBoostingClassifier with binary
+    responses.
+
+    Args:
+        pipeline: Fitted pipeline, e.g. the pipeline of model_prep_on_base
+
+    Returns:
+        CompiledPredictor: Predictor with the probabilities of the pipeline
+    """
+    classifier = pipeline.steps[-1][1]
+    model_type = type(classifier).__name__
+    if model_type not in LINEAR_MODELS + TREE_MODELS:
+        raise ValueError(
+            f"Cannot compile {model_type}. Use any of {LINEAR_MODELS + TREE_MODELS}."
+        )
+    if len(classifier.classes_) != 2:
+        raise ValueError(
+            f"Only binary responses can be compiled, got {len(classifier.classes_)} classes"
+        )
+
+    preprocessor = _compile_preprocessor(pipeline.named_steps["preprocessor"])
+    if model_type in LINEAR_MODELS:
+        model = _compile_linear(classifier, preprocessor)
+    else:
+        model = _compile_trees(classifier)
+
+    predictor = CompiledPredictor(preprocessor, model)
+    if model_type in ["GradientBoostingClassifier", "HistGradientBoostingClassifier"]:
+        # The initial raw prediction is the decision function of any play minus its leaf values
+        X0 = np.zeros((1, preprocessor["n_features_out"]))
+        tree_sum = predictor._leaf_values(X0).sum()
+        predictor.model["baseline"] = float(classifier.decision_function(X0)[0] - tree_sum)
+
+    return predictor
+
+def _compile_preprocessor(preprocessor) -> Dict:
+    """
+    Arrays and lookups of the imputers, scalers and one hot encoders of the
+    ColumnTransformer, in the order of its output columns.
+    """
+    num = {"cols": [], "out_idx": [], "impute": [], "mean": [], "scale": [], "required": []}
+    cat = {"cols": [], "offsets": [], "lookup": [], "impute": [], "required": []}
+    n_features_out = 0
+
+    for name, transformer, cols in preprocessor.transformers_:
+        if transformer == "drop" or len(cols) == 0:
+            continue
+        steps = dict(transformer.steps)
+        imputer = steps.get("imputer")
+        # Rows missing drop imputed predictors were dropped in training
+        required = name in ["num_drop", "cat_drop"]
+
+        if "scaler" in steps:
+            scaler = steps["scaler"]
+            n_cols = len(cols)
+            num["cols"] += list(cols)
+            num["out_idx"] += list(range(n_features_out, n_features_out + n_cols))
+            num["impute"] += (list(imputer.statistics_) if imputer is not None
+                              else [np.nan] * n_cols)
+            num["mean"] += (list(scaler.mean_) if scaler.mean_ is not None else [0.0] * n_cols)
+            num["scale"] += (list(scaler.scale_) if scaler.scale_ is not None else [1.0] * n_cols)
+            num["required"] += [required] * n_cols
+            n_features_out += n_cols
+        elif "encoder" in steps:
+            encoder = steps["encoder"]
+            for col_idx, col in enumerate(cols):
+                categories = encoder.categories_[col_idx]
+                cat["cols"].append(col)
+                cat["offsets"].append(n_features_out)
+                cat["lookup"].append({value: idx for idx, value in enumerate(categories.tolist())})
+                cat["impute"].append(imputer.statistics_[col_idx] if imputer is not None else None)
+                cat["required"].append(required)
+                n_features_out += len(categories)
+        else:
+            raise ValueError(f"Cannot compile the {name} transformer with steps {list(steps)}")
+
+    return {
+        "num_cols": num["cols"],
+        "num_out_idx": np.array(num["out_idx"], dtype=np.intp),
+        "num_impute": np.array(num["impute"], dtype=np.float64),
+        "num_mean": np.array(num["mean"], dtype=np.float64),
+        "num_scale": np.array(num["scale"], dtype=np.float64),
+        "num_required": np.array(num["required"], dtype=bool),
+        "cat_cols": cat["cols"],
+        "cat_offsets": cat["offsets"],
+        "cat_lookup": cat["lookup"],
+        "cat_impute": cat["impute"],
+        "cat_required": cat["required"],
+        "n_features_out": n_features_out,
+    }
+
+def _compile_linear(classifier, preprocessor: Dict) -> Dict:
+    """
+    Fold the scaler into the coefficients and map each category to its coefficient.
+    """
+    coef = classifier.coef_[0]
+    num_coef = coef[preprocessor["num_out_idx"]]
+    num_weights = num_coef / preprocessor["num_scale"]
+    intercept = classifier.intercept_[0] - np.sum(num_weights * preprocessor["num_mean"])
+
+    cat_weights = [
+        coef[offset:offset + len(lookup)]
+        for offset, lookup in zip(preprocessor["cat_offsets"], preprocessor["cat_lookup"])
+    ]
+    return {
+        "kind": "linear",
+        "intercept": float(intercept),
+        "num_weights": num_weights,
+        "cat_weights": cat_weights,
+    }
+
+def _compile_trees(classifier) -> Dict:
+    """
+    Concatenate the nodes of every tree of the ensemble into flat arrays with
+    global child indices.
+    """
+    model_type = type(classifier).__name__
+    trees = list()
+    if model_type == "HistGradientBoostingClassifier":
+        for (predictor,) in classifier._predictors:
+            nodes = predictor.nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Cannot compile native categorical splits")
+            trees.append({
+                "left": nodes["left"].astype(np.intp),
+                "right": nodes["right"].astype(np.intp),
+                "feature": nodes["feature_idx"].astype(np.intp),
+                "threshold": nodes["num_threshold"].astype(np.float64),
+                "missing_left": nodes["missing_go_to_left"].astype(bool),
+                "is_leaf": nodes["is_leaf"].astype(bool),
+                "value": nodes["value"].astype(np.float64),
+                "max_depth": int(nodes["depth"].max()),
+            })
+    else:
+        if model_type == "RandomForestClassifier":
+            estimators = classifier.estimators_
+        else:
+            estimators = classifier.estimators_[:, 0]
+        for estimator in estimators:
+            tree = estimator.tree_
+            if model_type == "RandomForestClassifier":
+                class_value = tree.value[:, 0, :]
+                value = class_value[:, 1] / class_value.sum(axis=1)
+            else:
+                value = classifier.learning_rate * tree.value[:, 0, 0]
+            is_leaf = tree.children_left == -1
+            trees.append({
+                "left": np.where(is_leaf, 0, tree.children_left).astype(np.intp),
+                "right": np.where(is_leaf, 0, tree.children_right).astype(np.intp),
+                "feature": np.where(is_leaf, 0, tree.feature).astype(np.intp),
+                "threshold": tree.threshold.astype(np.float64),
+                "missing_left": np.asarray(
+                    getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool
+                ),
+                "is_leaf": is_leaf,
+                "value": value.astype(np.float64),
+                "max_depth": int(tree.max_depth),
+            })
+
+    offsets = np.cumsum([0] + [len(tree["is_leaf"]) for tree in trees])[:-1]
+    return {
+        "kind": "trees",
+        "aggregate": "mean_proba" if model_type == "RandomForestClassifier" else "sum_logit",
+        "float32_features": model_type != "HistGradientBoostingClassifier",
+        "roots": offsets.astype(np.intp),
+        "left": np.concatenate([tree["left"] + offset for tree, offset in zip(trees, offsets)]),
+        "right": np.concatenate([tree["right"] + offset for tree, offset in zip(trees, offsets)]),
+        "feature": np.concatenate([tree["feature"] for tree in trees]),
+        "threshold": np.concatenate([tree["threshold"] for tree in trees]),
+        "missing_left": np.concatenate([tree["missing_left"] for tree in trees]),
+        "is_leaf": np.concatenate([tree["is_leaf"] for tree in trees]),
+        "value": np.concatenate([tree["value"] for tree in trees]),
+        "max_depth": max(tree["max_depth"] for tree in trees),
+        "baseline": 0.0,
+    }
+
+def _sigmoid(logit: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-logit))
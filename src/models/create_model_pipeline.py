@@ -1,21 +1,27 @@
+import numpy as np
 import polars as pl
-import pandas as pd
 from typing import List, Dict, Optional
 
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, brier_score_loss, log_loss
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
 
 from imblearn.pipeline import Pipeline as ImbPipeline
 from imblearn.over_sampling import SMOTE, ADASYN, RandomOverSampler
 
+from .approximate_neighbors import ApproximateNeighbors
+from .fold_cache import FoldCache
+from .model_registry import MODEL_REGISTRY, make_model
+from .parallel_budget import ParallelBudget
+from .logistic_path import LogisticPathCV
+from .sequential_search import SequentialSearchCV
+from .trial_store import ResumableSearchCV
+
 
 def create_model_pipeline(
     cat_predictors_drop: List[str] = [],
@@ -29,34 +35,104 @@ def create_model_pipeline(
     refit: str = "brier_score",
     cv: int = 5,
     random_state: int = 123,
+    search_strategy: str = "grid",
+    n_iter: int = 30,
+    halving_factor: int = 3,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 2 * 1024**3,
+    neighbors_n_probe: int = 8,
+    model_threads: int = 1,
+    parallel_budget: Optional[ParallelBudget] = None,
+    trial_store: Optional[str] = None,
     verbose: bool = True):
     """
     Create and train a machine learning pipeline with preprocessing,
     oversampling, and model selection.
+
+    search_strategy picks how param_grid is searched. Every strategy returns
+    a fitted search with best_params_, best_score_, best_estimator_ and
+    cv_results_, so it can be passed to model_prep_on_base.
+        "grid": Exhaustive GridSearchCV
+        "random": RandomizedSearchCV over n_iter candidates
+        "halving_grid": HalvingGridSearchCV, every candidate starts on a
+            subsample and the best 1 / halving_factor advance each round
+        "halving_random": HalvingRandomSearchCV from n_iter candidates
+        "bayesian": SequentialSearchCV, a Gaussian process proposes n_iter
+            candidates and bad candidates are pruned between folds
+        "path": LogisticPathCV, LogisticRegression only. Each fold sweeps
+            classifier__C from strong to weak regularization per
+            classifier__l1_ratio, warm-starting each solve from the previous
+            coefficients. classifier__max_iter is not searched.
+    The halving strategies support one metric, so scoring[refit] is used.
     
     Args:
         cat_predictors_drop: Categorical predictors with drop imputation
         cat_predictors_mode: Categorical predictors with mode imputation  
         num_predictors_drop: Numerical predictors with drop imputation
         num_predictors_median: Numerical predictors with median imputation
-        model_type: Type of model to use
-        oversampling_method: Method for handling class imbalance
+        model_type: Type of model to use, any name in MODEL_REGISTRY.
+            HistGradientBoostingClassifier and XGBClassifier stop early on a
+            validation split of the training data and handle missing values,
+            so median imputation is skipped when the over sampler accepts
+            missing values.
+        oversampling_method: Method for handling class imbalance. None skips
+            over sampling.
         param_grid: Parameters for GridSearchCV
         scoring: Scoring metric for model selection
         refit: Scoring metric when refitting on the full dataset
         cv: Cross-validation folds
         random_state: Random seed for reproducibility
+        search_strategy: "grid", "random", "halving_grid", "halving_random",
+            "bayesian" or "path"
+        n_iter: Candidate budget of the random, halving_random and bayesian
+            strategies
+        halving_factor: Candidate reduction factor of the halving strategies
+        cache_dir: Directory of a FoldCache for the preprocessing and
+            oversampling outputs of each fold. Reused across candidates that
+            only change classifier__* parameters. None disables caching.
+        cache_max_bytes: Size limit of the cache_dir
+        neighbors_n_probe: Lists searched by the approximate neighbors of
+            FastSMOTE and FastADASYN. More is more accurate and slower.
+        model_threads: Threads per multithreaded model fit. The search
+            already fits candidates in parallel processes.
+        parallel_budget: CPU budget of the search. The search runs
+            parallel_budget.n_workers parallel fits with
+            parallel_budget.threads_per_worker model threads. Fit the search
+            with parallel_budget.fit to apply its thread limits and backend.
+            None runs a fit per core.
+        trial_store: SQLite file of a TrialStore for the grid strategy. The
+            search is a ResumableSearchCV that stores each fold result and
+            skips the candidates and folds already in the store.
         verbose: Whether to print progress information
     
     Returns:
         dict: Create a pipeline and a gridsearch
     """
+    # Split the CPU budget between the search workers and the model threads
+    n_jobs = -1
+    if parallel_budget is not None:
+        n_jobs = parallel_budget.n_workers
+        model_threads = parallel_budget.threads_per_worker
+
+    # Model selection
+    base_model = make_model(model_type, random_state=random_state, n_threads=model_threads)
+
+    # Models with native missing value handling skip median imputation unless
+    # the over sampler needs complete data
+    native_missing = (MODEL_REGISTRY[model_type]["native_missing"] and
+                      oversampling_method in [None, "RandomOverSampler"])
+
     # ==== Preprocessing Pipeline ====
     # Column specific preprocessing steps
-    numeric_median_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="median")), 
-        ("scaler", StandardScaler())
-    ])
+    if native_missing:
+        numeric_median_pipeline = Pipeline([
+            ("scaler", StandardScaler())
+        ])
+    else:
+        numeric_median_pipeline = Pipeline([
+            ("imputer", SimpleImputer(strategy="median")), 
+            ("scaler", StandardScaler())
+        ])
     
     numeric_drop_pipeline = Pipeline([
         ("scaler", StandardScaler())
@@ -82,53 +158,157 @@ def create_model_pipeline(
     if cat_predictors_mode:
         transformers.append(("cat_mode", categorical_mode_pipeline, cat_predictors_mode))
     
-    preprocessor = ColumnTransformer(transformers=transformers)
+    # Dense output for models that don't accept the sparse one hot encoding
+    sparse_threshold = 0 if MODEL_REGISTRY[model_type]["dense_input"] else 0.3
+    preprocessor = ColumnTransformer(transformers=transformers, sparse_threshold=sparse_threshold)
     
     # Over sampling selection
-    if oversampling_method == "SMOTE":
+    if oversampling_method is None:
+        oversampler = "passthrough"
+    elif oversampling_method == "SMOTE":
         oversampler = SMOTE(random_state=random_state)
     elif oversampling_method == "ADASYN":
         oversampler = ADASYN(random_state=random_state)
     elif oversampling_method == "RandomOverSampler":
         oversampler = RandomOverSampler(random_state=random_state)
+    elif oversampling_method == "FastSMOTE":
+        # SMOTE's 5 neighbors plus the sample itself
+        oversampler = SMOTE(
+            k_neighbors=ApproximateNeighbors(
+                n_neighbors=6, n_probe=neighbors_n_probe, random_state=random_state
+            ),
+            random_state=random_state
+        )
+    elif oversampling_method == "FastADASYN":
+        oversampler = ADASYN(
+            n_neighbors=ApproximateNeighbors(
+                n_neighbors=6, n_probe=neighbors_n_probe, random_state=random_state
+            ),
+            random_state=random_state
+        )
     else:
         raise ValueError(f"Unknown oversampling method: {oversampling_method}")
     
-    # Model selection
-    if model_type == "LogisticRegression":
-        base_model = LogisticRegression(random_state=random_state)
-    elif model_type == "RandomForestClassifier":
-        base_model = RandomForestClassifier(random_state=random_state)
-    elif model_type == "GradientBoostingClassifier":
-        base_model = GradientBoostingClassifier(random_state=random_state)
-    elif model_type == "KNeighborsClassifier":
-        base_model = KNeighborsClassifier()
-    elif model_type == "MLPClassifier":
-        base_model = MLPClassifier(random_state=random_state)
-    else:
-        raise ValueError(f"Unknown model type: {model_type}")
-    
     # Combine preprocessor, over sampler, and model into one pipeline
+    memory = FoldCache(cache_dir, bytes_limit=cache_max_bytes) if cache_dir else None
     pipeline = ImbPipeline([
         ("preprocessor", preprocessor),
         ("oversampler", oversampler),
         ("classifier", base_model)
-    ])
+    ], memory=memory)
     
-    # Wrap pipeline in a Gridsearch. Each CV set will have its own pipeline.
+    # Wrap pipeline in a search. Each CV set will have its own pipeline.
     # For param_grid, start with classifier__{parameter} as the name.
-    grid_search = GridSearchCV(
-        estimator=pipeline,
-        param_grid=param_grid,
-        cv=cv,
-        scoring=scoring,
-        verbose=1 if verbose else 0,
-        n_jobs=-1,
-        refit=refit
-    )
+    if trial_store is not None and search_strategy != "grid":
+        raise ValueError(f"trial_store needs the grid search_strategy, got {search_strategy}")
+
+    if search_strategy == "grid" and trial_store is not None:
+        grid_search = ResumableSearchCV(
+            estimator=pipeline,
+            param_grid=param_grid,
+            trial_store=trial_store,
+            cv=cv,
+            scoring=scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=refit
+        )
+    elif search_strategy == "grid":
+        grid_search = GridSearchCV(
+            estimator=pipeline,
+            param_grid=param_grid,
+            cv=cv,
+            scoring=scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=refit
+        )
+    elif search_strategy == "random":
+        grid_search = RandomizedSearchCV(
+            estimator=pipeline,
+            param_distributions=param_grid,
+            n_iter=n_iter,
+            cv=cv,
+            scoring=scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=refit,
+            random_state=random_state
+        )
+    elif search_strategy in ["halving_grid", "halving_random"]:
+        # Successive halving ranks candidates by a single metric. The first
+        # round uses the largest subsample that still ends on every sample, so
+        # the oversampler sees enough of the minority class.
+        halving_scoring = scoring[refit] if isinstance(scoring, dict) else scoring
+        halving_kwargs = dict(
+            estimator=pipeline,
+            factor=halving_factor,
+            min_resources="exhaust",
+            cv=cv,
+            scoring=halving_scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=True,
+            random_state=random_state
+        )
+        if search_strategy == "halving_grid":
+            grid_search = HalvingGridSearchCV(param_grid=param_grid, **halving_kwargs)
+        else:
+            grid_search = HalvingRandomSearchCV(
+                param_distributions=param_grid, n_candidates=n_iter, **halving_kwargs
+            )
+    elif search_strategy == "bayesian":
+        grid_search = SequentialSearchCV(
+            estimator=pipeline,
+            param_grid=param_grid,
+            n_iter=n_iter,
+            cv=cv,
+            scoring=scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=refit,
+            random_state=random_state
+        )
+    elif search_strategy == "path":
+        if model_type != "LogisticRegression":
+            raise ValueError(f"The path search_strategy needs LogisticRegression, got {model_type}")
+        grid_search = LogisticPathCV(
+            estimator=pipeline,
+            param_grid=param_grid,
+            cv=cv,
+            scoring=scoring,
+            verbose=1 if verbose else 0,
+            n_jobs=n_jobs,
+            refit=refit
+        )
+    else:
+        raise ValueError(f"Unknown search strategy: {search_strategy}")
 
     return grid_search
 
+def stay_to_out(on_base_df: pl.DataFrame, max_distance: Optional[float] = None):
+    """
+    Censor runners that stayed by relabeling them as thrown out.
+
+    Args:
+        on_base_df: Polars DataFrame with is_stay, is_out and distance_catch_to_home
+        max_distance: Only relabel stays caught at most this many feet from home.
+            None relabels every stay.
+
+    Returns:
+        pl.DataFrame: Data with the relabeled is_out column
+    """
+    is_censored = pl.col("is_stay") == True
+    if max_distance is not None:
+        is_censored = is_censored & (pl.col("distance_catch_to_home") <= max_distance)
+
+    return on_base_df.with_columns(
+        pl.when(is_censored)
+          .then(True)
+          .otherwise(pl.col("is_out"))
+          .alias("is_out")
+    )
+
 def model_prep_on_base(
     on_base_lf: pl.LazyFrame,
     grid_search: GridSearchCV,
@@ -142,10 +322,16 @@ def model_prep_on_base(
     is_out_censored: bool = False,
     test_stay_to_out: bool = False,
     test_stay_to_out_threshold: bool = False,
+    max_distance: float = 265,
+    parallel_budget: Optional[ParallelBudget] = None,
     verbose: bool = True):
     """
     Create and train a machine learning pipeline with preprocessing,
     oversampling, and model selection.
+
+    The needed columns are collected once. The train/test split, censoring and
+    drop imputation run in Polars, and the splits are converted to pandas once
+    for scikit-learn.
     
     Args:
         on_base_lf: Polars LazyFrame with the data
@@ -162,6 +348,12 @@ def model_prep_on_base(
         cv: Cross-validation folds
         test_size: Proportion of data for testing
         random_state: Random seed for reproducibility
+        max_distance: Stays caught at most this many feet from home are
+            censored by is_out_censored and test_stay_to_out_threshold. Use
+            run_threshold_sweep to compare distances.
+        parallel_budget: CPU budget the search is fit within, usually the one
+            passed to create_model_pipeline. The achieved CPU utilization is
+            returned as cpu_utilization.
         verbose: Whether to print progress information
     
     Returns:
@@ -179,54 +371,37 @@ def model_prep_on_base(
         print(f"Total Predictors: {len(all_predictors)}")
         print(f"Total Responses: {len(responses)}")
 
-    if (is_out_censored) and ("is_out" in responses):
-        responses_censoring = set(responses + ["is_stay", "is_out", "is_advance"])
-        predictors_censoring = set(all_predictors + ["distance_catch_to_home"])
-        X = on_base_lf.select(predictors_censoring).collect().to_pandas()
-        y = on_base_lf.select(responses_censoring).collect().to_pandas()
-    else:
-        X = on_base_lf.select(all_predictors).collect().to_pandas()
-        y = on_base_lf.select(responses).collect().to_pandas()
+    # Collect every needed column in one pass over the plan. The censoring columns are only
+    # needed when a censoring option is set.
+    censor_cols = []
+    if ("is_out" in responses) and (is_out_censored or test_stay_to_out or
+                                    test_stay_to_out_threshold):
+        censor_cols = ["is_stay", "distance_catch_to_home"]
+    select_cols = list(dict.fromkeys(all_predictors + responses + censor_cols))
+    data = on_base_lf.select(select_cols).collect()
 
-    # Split the predictor and response sets into train and test sets
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, 
-        test_size=test_size, 
+    # Split row indices instead of copying the data through pandas. The split only depends on the
+    # row count and the stratification labels, so it matches splitting the data itself.
+    train_idx, test_idx = train_test_split(
+        np.arange(data.height),
+        test_size=test_size,
         shuffle=True,
-        stratify=y[responses],
+        stratify=data.select(responses).to_numpy(),
         random_state=random_state
     )
 
-    train_set = pl.from_pandas(pd.concat([X_train, y_train], axis=1))
-    test_set = pl.from_pandas(pd.concat([X_test, y_test], axis=1))
+    train_set = data[train_idx]
+    test_set = data[test_idx]
 
-    
     # Select all features and perform drop imputation on specific columns
     if (is_out_censored) and ("is_out" in responses):
-        train_set = train_set.with_columns(
-            pl.when((pl.col("is_stay") == True) & 
-                    (pl.col("distance_catch_to_home") <= 265))
-              .then(True)
-              .otherwise(pl.col("is_out"))
-              .alias("is_out")
-        )
+        train_set = stay_to_out(train_set, max_distance=max_distance)
 
     if (test_stay_to_out) and ("is_out" in responses) and (test_stay_to_out_threshold == False):
-        test_set = test_set.with_columns(
-            pl.when(pl.col("is_stay") == True)
-              .then(True)
-              .otherwise(pl.col("is_out"))
-              .alias("is_out")
-        )
+        test_set = stay_to_out(test_set)
 
     elif (test_stay_to_out_threshold) and ("is_out" in responses) and (test_stay_to_out == False):
-        test_set = test_set.with_columns(
-            pl.when((pl.col("is_stay") == True) & 
-                    (pl.col("distance_catch_to_home") <= 265))
-              .then(True)
-              .otherwise(pl.col("is_out"))
-              .alias("is_out")
-        )
+        test_set = stay_to_out(test_set, max_distance=max_distance)
     else:
         pass
 
@@ -240,13 +415,17 @@ def model_prep_on_base(
         .drop_nulls(drop_null_features + responses)
     )
 
+    # Hand off to scikit-learn once. Named pandas columns are kept for the ColumnTransformer.
     X_train = train_set.select(all_predictors).to_pandas()
     X_test = test_set.select(all_predictors).to_pandas()
     y_train = train_set.select(responses).to_pandas().squeeze()
-    y_test = test_set .select(responses).to_pandas().squeeze()
+    y_test = test_set.select(responses).to_pandas().squeeze()
 
     # Train the model
-    grid_search.fit(X_train, y_train)
+    if parallel_budget is not None:
+        parallel_budget.fit(grid_search, X_train, y_train, verbose=verbose)
+    else:
+        grid_search.fit(X_train, y_train)
     
     if verbose:
         best_param = [f"{param} = {value}" for param, value in grid_search.best_params_.items()]
@@ -284,7 +463,9 @@ def model_prep_on_base(
         'brier_score': pred_brier_score,
         'log_loss': pred_log_loss,
         'feature_names': all_predictors,
-        'response_names': responses
+        'response_names': responses,
+        'drop_null_features': drop_null_features,
+        'cpu_utilization': parallel_budget.utilization_ if parallel_budget else None
     }
     
     return results
\ No newline at end of file
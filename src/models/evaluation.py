@@ -0,0 +1,158 @@
+import numpy as np
+import polars as pl
+from scipy import sparse
+from typing import Dict, List, Union
+
+# Probabilities are clipped to [EPS, 1 - EPS] for the log loss
+EPS = 1e-15
+
+
+def evaluate_models(
+    y_true: np.ndarray,
+    proba: Union[np.ndarray, Dict[str, np.ndarray]],
+    model_names: List[str] = None,
+    reference: str = None,
+    n_bins: int = 10,
+    n_bootstrap: int = 2000,
+    confidence: float = 0.95,
+    max_chunk_values: int = 500_000,
+    random_state: int = 123):
+    """
+    Evaluate the probabilities of many models on the same test rows at once.
+
+    Every metric is computed for all models in batched NumPy operations.
+    Bootstrap replicates resample the test rows with replacement, and all
+    models share the same resamples, so the confidence intervals of the
+    differences to the reference model are paired. A replicate is the count
+    of each row in the resample, so the metrics of a chunk of replicates are
+    one matrix product of the counts with the per row losses of every model.
+
+    Args:
+        y_true: Boolean response of each test row
+        proba: Probabilities of the positive class, an array of shape
+            (n_models, n_rows) or a dictionary of model name to probabilities
+        model_names: Names of the rows of proba. Defaults to the dictionary
+            keys or model_0, model_1, ...
+        reference: Model the differences are computed against. Defaults to
+            the model with the lowest Brier score.
+        n_bins: Number of equal width calibration bins
+        n_bootstrap: Number of bootstrap replicates, 0 skips the intervals
+        confidence: Confidence level of the percentile intervals
+        max_chunk_values: Largest number of replicate counts held in memory.
+            Small chunks stay in cache and reuse their memory.
+        random_state: Random seed of the bootstrap
+
+    Returns:
+        dict: metrics, one row per model with the Brier score, log loss,
+            expected calibration error, their confidence intervals and the
+            paired differences to the reference; calibration, one row per
+            model and bin with the count, mean probability and observed rate
+    """
+    if isinstance(proba, dict):
+        model_names = model_names or list(proba)
+        proba = np.vstack([np.asarray(proba[name], dtype=np.float64) for name in model_names])
+    proba = np.atleast_2d(np.asarray(proba, dtype=np.float64))
+    y_true = np.asarray(y_true, dtype=np.float64)
+    n_models, n_rows = proba.shape
+    model_names = model_names or [f"model_{idx}" for idx in range(n_models)]
+
+    if len(y_true) != n_rows:
+        raise ValueError(f"Expected {n_rows} responses, got {len(y_true)}")
+    if len(model_names) != n_models:
+        raise ValueError(f"Expected {n_models} model names, got {len(model_names)}")
+
+    # ==== Per Row Losses ====
+    clipped = np.clip(proba, EPS, 1 - EPS)
+    row_losses = {
+        "brier_score": (proba - y_true) ** 2,
+        "log_loss": -(y_true * np.log(clipped) + (1 - y_true) * np.log1p(-clipped)),
+    }
+
+    # Signed error of each row in its model's calibration bin. The expected calibration error is
+    # the sum over bins of the absolute summed error divided by the number of rows.
+    bins = np.minimum((proba * n_bins).astype(np.intp), n_bins - 1)
+    bin_cols = (np.arange(n_models)[:, None] * n_bins + bins).ravel()
+    bin_error = sparse.csr_matrix(
+        ((proba - y_true).ravel(), (np.tile(np.arange(n_rows), n_models), bin_cols)),
+        shape=(n_rows, n_models * n_bins)
+    )
+
+    point = {metric: losses.mean(axis=1) for metric, losses in row_losses.items()}
+    point["ece"] = _ece(np.ones((1, n_rows)), bin_error, n_models, n_bins)[0]
+
+    if reference is None:
+        reference_idx = int(np.argmin(point["brier_score"]))
+    elif reference in model_names:
+        reference_idx = model_names.index(reference)
+    else:
+        raise ValueError(f"Unknown reference model: {reference}")
+
+    metrics = {"model": model_names, **point}
+    for metric in row_losses:
+        metrics[f"{metric}_diff"] = point[metric] - point[metric][reference_idx]
+
+    # ==== Paired Bootstrap ====
+    if n_bootstrap > 0:
+        rng = np.random.default_rng(random_state)
+        chunk_size = max(1, max_chunk_values // n_rows)
+        replicates = {metric: list() for metric in list(row_losses) + ["ece"]}
+        for start in range(0, n_bootstrap, chunk_size):
+            n_chunk = min(chunk_size, n_bootstrap - start)
+            counts = _bootstrap_counts(rng, n_chunk, n_rows)
+            for metric, losses in row_losses.items():
+                replicates[metric].append(counts @ losses.T / n_rows)
+            replicates["ece"].append(_ece(counts, bin_error, n_models, n_bins))
+
+        alpha = (1 - confidence) / 2
+        for metric, chunks in replicates.items():
+            values = np.vstack(chunks)
+            low, high = np.quantile(values, [alpha, 1 - alpha], axis=0)
+            metrics[f"{metric}_ci_low"] = low
+            metrics[f"{metric}_ci_high"] = high
+            if metric in row_losses:
+                diffs = values - values[:, [reference_idx]]
+                low, high = np.quantile(diffs, [alpha, 1 - alpha], axis=0)
+                metrics[f"{metric}_diff_ci_low"] = low
+                metrics[f"{metric}_diff_ci_high"] = high
+
+    metrics_pl = pl.DataFrame(metrics).with_columns(
+        (pl.col("model") == model_names[reference_idx]).alias("is_reference")
+    )
+
+    # ==== Calibration Bins ====
+    bin_count = np.bincount(bin_cols, minlength=n_models * n_bins)
+    bin_proba = np.bincount(bin_cols, weights=proba.ravel(), minlength=n_models * n_bins)
+    bin_observed = np.bincount(
+        bin_cols, weights=np.broadcast_to(y_true, proba.shape).ravel(),
+        minlength=n_models * n_bins
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        calibration_pl = pl.DataFrame({
+            "model": np.repeat(model_names, n_bins),
+            "bin": np.tile(np.arange(n_bins), n_models),
+            "bin_low": np.tile(np.arange(n_bins) / n_bins, n_models),
+            "bin_high": np.tile(np.arange(1, n_bins + 1) / n_bins, n_models),
+            "n": bin_count,
+            "mean_proba": bin_proba / bin_count,
+            "observed_rate": bin_observed / bin_count,
+        }).fill_nan(None)
+
+    return {"metrics": metrics_pl, "calibration": calibration_pl}
+
+def _bootstrap_counts(rng: np.random.Generator, n_replicates: int, n_rows: int) -> np.ndarray:
+    """
+    Number of times each row is drawn in each replicate, shape (n_replicates, n_rows).
+    """
+    draws = rng.integers(0, n_rows, size=(n_replicates, n_rows))
+    flat = (draws + (np.arange(n_replicates) * n_rows)[:, None]).ravel()
+    counts = np.bincount(flat, minlength=n_replicates * n_rows)
+    return counts.reshape(n_replicates, n_rows).astype(np.float64)
+
+def _ece(weights: np.ndarray, bin_error: sparse.csr_matrix, n_models: int, n_bins: int):
+    """
+    Expected calibration error of each model under each row weighting, shape
+    (n_weightings, n_models).
+    """
+    summed_error = np.asarray((bin_error.T @ weights.T).T)
+    total = weights.sum(axis=1, keepdims=True)
+    return np.abs(summed_error).reshape(-1, n_models, n_bins).sum(axis=2) / total
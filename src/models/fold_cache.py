@@ -0,0 +1,49 @@
+from functools import wraps
+
+from joblib import Memory
+
+
+class FoldCache(Memory):
+    """
+    Bounded cache of the preprocessing and oversampling outputs of a pipeline
+    during a grid search.
+
+    Passed as the memory of the ImbPipeline, the fitted ColumnTransformer and
+    the resampled training matrix of each fold are stored on disk keyed by the
+    step parameters and the fold data. Candidates that only change
+    classifier__* parameters load the fold's resampled matrix instead of
+    refitting the imputers, scalers and encoders and rerunning the
+    oversampler. Cached arrays are memory mapped on load, so parallel workers
+    share one copy. After each cached call the least recently used outputs are
+    deleted until the cache fits in bytes_limit.
+
+    Args:
+        location: Directory of the cache, shared by the parallel workers
+        bytes_limit: Size limit of the cache in bytes
+        mmap_mode: Memory map mode of the loaded arrays, None loads copies
+    """
+
+    def __init__(
+        self,
+        location: str,
+        bytes_limit: int = 2 * 1024**3,
+        mmap_mode: str = "r"):
+        super().__init__(location=location, mmap_mode=mmap_mode, verbose=0)
+        self.max_bytes = bytes_limit
+
+    def cache(self, func=None, **kwargs):
+        """
+        Cache func and shrink the cache to the size limit after each call.
+        """
+        if func is None:
+            return lambda func: self.cache(func, **kwargs)
+
+        cached_func = super().cache(func, **kwargs)
+
+        @wraps(func)
+        def bounded_func(*args, **func_kwargs):
+            output = cached_func(*args, **func_kwargs)
+            self.reduce_size(bytes_limit=self.max_bytes)
+            return output
+
+        return bounded_func
@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+import polars as pl
+from scipy import sparse
+from typing import List
+
+from joblib import Parallel, delayed
+
+from .evaluation import EPS
+
+# Metrics of the permutation importance and whether larger values are better
+IMPORTANCE_METRICS = {"brier_score": False, "log_loss": False, "accuracy": True}
+
+
+def batched_permutation_importance(
+    pipeline,
+    X: pd.DataFrame,
+    y,
+    n_repeats: int = 100,
+    features: List[str] = None,
+    metrics: List[str] = ["brier_score", "log_loss", "accuracy"],
+    max_batch_rows: int = 500_000,
+    confidence: float = 0.95,
+    n_jobs: int = -1,
+    random_state: int = 123,
+    verbose: bool = True):
+    """
+    Permutation importance of the predictors of a model_prep_on_base pipeline.
+
+    The preprocessor output of X is computed once and shared by every
+    permutation. Permuting a predictor only changes the output columns of
+    its ColumnTransformer group, so only that group is transformed again, on
+    the permuted predictor with the other columns of the group unchanged.
+    The permuted rows of many repeats are stacked into one matrix, up to
+    max_batch_rows rows, and scored with one classifier predict_proba call.
+    The oversampler is not used at prediction time. Predictors and chunks
+    of repeats are spread over a process pool with n_jobs.
+
+    Importance is the drop in performance from the unpermuted baseline, so
+    larger is more important for every metric: the increase in the Brier
+    score and log loss, and the decrease in accuracy. Each repeat of a
+    predictor uses its own seeded permutation, so results do not depend on
+    max_batch_rows or n_jobs.
+
+    Args:
+        pipeline: Fitted pipeline with preprocessor and classifier steps, as
+            results["pipeline"] of model_prep_on_base
+        X: Predictors, as results["X_test"]
+        y: Boolean response, as results["y_test"]
+        n_repeats: Permutations per predictor
+        features: Predictors to permute. Defaults to every column of X.
+        metrics: Metrics in IMPORTANCE_METRICS
+        max_batch_rows: Largest number of stacked rows per predict_proba call
+        confidence: Confidence level of the percentile intervals over repeats
+        n_jobs: Number of parallel tasks, -1 uses every core
+        random_state: Random seed of the permutations
+        verbose: Whether to print the importance table
+
+    Returns:
+        pl.DataFrame: One row per predictor and metric with the baseline, the
+            mean, standard deviation and interval of the importance over
+            repeats, and its rank within the metric
+    """
+    unknown = [metric for metric in metrics if metric not in IMPORTANCE_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {unknown}. Use {list(IMPORTANCE_METRICS)}")
+    features = features or list(X.columns)
+    missing = [feature for feature in features if feature not in X.columns]
+    if missing:
+        raise ValueError(f"Features not in X: {missing}")
+
+    preprocessor = pipeline.named_steps["preprocessor"]
+    classifier = pipeline.named_steps["classifier"]
+    y = np.asarray(y, dtype=np.float64)
+    positive_idx = list(classifier.classes_).index(True)
+
+    # ==== Cached Baseline ====
+    Xt = _dense(preprocessor.transform(X))
+    baseline_proba = classifier.predict_proba(Xt)[:, positive_idx]
+    baseline = _metric_values(baseline_proba[None, :], y, metrics)[0]
+
+    # ColumnTransformer group of each predictor. Predictors the preprocessor
+    # drops do not change the predictions.
+    groups = dict()
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == "drop":
+            continue
+        columns = [X.columns[column] if isinstance(column, (int, np.integer)) else column
+                   for column in columns]
+        for column in columns:
+            groups[column] = (name, columns)
+
+    # ==== Batched Permutations ====
+    n_rows = len(y)
+    chunk_repeats = max(1, max_batch_rows // max(n_rows, 1))
+    tasks = [
+        (feature_idx, start, min(start + chunk_repeats, n_repeats))
+        for feature_idx, feature in enumerate(features)
+        if feature in groups
+        for start in range(0, n_repeats, chunk_repeats)
+    ]
+    chunk_values = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_metrics)(
+            classifier,
+            positive_idx,
+            preprocessor.named_transformers_[groups[features[feature_idx]][0]],
+            X[groups[features[feature_idx]][1]],
+            features[feature_idx],
+            Xt,
+            preprocessor.output_indices_[groups[features[feature_idx]][0]],
+            y,
+            metrics,
+            [random_state, feature_idx],
+            start,
+            stop,
+        )
+        for feature_idx, start, stop in tasks
+    )
+
+    # Metric values of each predictor, shape (n_repeats, n_metrics)
+    permuted = {
+        feature: np.tile(baseline, (n_repeats, 1)) for feature in features
+    }
+    for (feature_idx, start, stop), values in zip(tasks, chunk_values):
+        permuted[features[feature_idx]][start:stop] = values
+
+    # ==== Importance Table ====
+    alpha = (1 - confidence) / 2
+    rows = list()
+    for feature in features:
+        for metric_idx, metric in enumerate(metrics):
+            values = permuted[feature][:, metric_idx]
+            drop = baseline[metric_idx] - values
+            if not IMPORTANCE_METRICS[metric]:
+                drop = -drop
+            low, high = np.quantile(drop, [alpha, 1 - alpha])
+            rows.append({
+                "feature": feature,
+                "metric": metric,
+                "baseline": float(baseline[metric_idx]),
+                "importance_mean": float(drop.mean()),
+                "importance_std": float(drop.std()),
+                "importance_low": float(low),
+                "importance_high": float(high),
+            })
+
+    importance = (pl.DataFrame(rows)
+        .with_columns(
+            pl.col("importance_mean").rank("ordinal", descending=True).over("metric")
+            .cast(pl.Int64).alias("rank")
+        )
+        .sort(["metric", "rank"])
+    )
+
+    if verbose:
+        with pl.Config(tbl_cols=-1, tbl_rows=-1, fmt_str_lengths=80):
+            print(f"Permutation importance over {n_repeats} repeats of {n_rows} rows")
+            print(importance.filter(pl.col("metric") == metrics[0]))
+
+    return importance
+
+def _dense(Xt) -> np.ndarray:
+    """
+    Dense float64 array of a preprocessor output.
+    """
+    if sparse.issparse(Xt):
+        Xt = Xt.toarray()
+    return np.asarray(Xt, dtype=np.float64)
+
+def _metric_values(proba: np.ndarray, y: np.ndarray, metrics: List[str]) -> np.ndarray:
+    """
+    Metrics of each row of probabilities, shape (n_repeats, n_metrics).
+    """
+    values = dict()
+    if "brier_score" in metrics:
+        values["brier_score"] = np.mean((proba - y) ** 2, axis=1)
+    if "log_loss" in metrics:
+        clipped = np.clip(proba, EPS, 1 - EPS)
+        values["log_loss"] = -np.mean(y * np.log(clipped) + (1 - y) * np.log1p(-clipped), axis=1)
+    if "accuracy" in metrics:
+        values["accuracy"] = np.mean((proba >= 0.5) == (y == 1), axis=1)
+    return np.column_stack([values[metric] for metric in metrics])
+
+def _permuted_metrics(classifier, positive_idx, transformer, X_group, feature, Xt, output_slice,
+                      y, metrics, seed, start, stop) -> np.ndarray:
+    """
+    Metrics of repeats start to stop of one predictor. The repeats are
+    stacked, the predictor's group is transformed once for all of them and
+    the classifier scores the stacked rows in one call.
+    """
+    n_rows = len(X_group)
+    n_chunk = stop - start
+    column = X_group[feature].to_numpy()
+
+    # Permutation of each repeat, seeded by predictor and repeat
+    permuted_column = np.concatenate([
+        column[np.random.default_rng(seed + [repeat]).permutation(n_rows)]
+        for repeat in range(start, stop)
+    ])
+    X_stacked = pd.DataFrame(
+        {name: (permuted_column if name == feature else np.tile(X_group[name].to_numpy(), n_chunk))
+         for name in X_group.columns},
+        columns=X_group.columns
+    ).astype(X_group.dtypes.to_dict())
+
+    Xt_stacked = np.tile(Xt, (n_chunk, 1))
+    Xt_stacked[:, output_slice] = _dense(transformer.transform(X_stacked))
+    proba = classifier.predict_proba(Xt_stacked)[:, positive_idx]
+    return _metric_values(proba.reshape(n_chunk, n_rows), y, metrics)
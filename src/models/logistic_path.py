@@ -0,0 +1,287 @@
+import time
+import numpy as np
+from typing import Dict
+
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.utils import _safe_indexing
+
+# Parameters swept by the path instead of searched as grid points
+PATH_PARAMS = ["classifier__C", "classifier__l1_ratio", "classifier__max_iter"]
+
+
+class LogisticPathCV(BaseEstimator):
+    """
+    Cross-validated regularization path of a LogisticRegression pipeline.
+
+    The classifier__C values of param_grid are swept from the strongest to
+    the weakest regularization. Each solve is warm-started from the
+    coefficients of the previous C and runs until the coefficients change by
+    less than tol, so weakly regularized fits start next to their solution
+    instead of from zero. For each fold the preprocessor and oversampler are
+    fit once and shared by every path of the fold, and each classifier__l1_ratio
+    is a separate path fit in parallel. Other parameters of param_grid are
+    searched as a grid, with a path per combination. classifier__max_iter is
+    not searched; solves stop on tol, capped at max_iter. Results follow the
+    GridSearchCV contract: best_params_, best_score_, best_estimator_ and
+    cv_results_.
+
+    When param_grid has classifier__l1_ratio the classifier uses the saga
+    solver with the elastic net penalty.
+
+    Args:
+        estimator: Pipeline with preprocessor, oversampler and a
+            LogisticRegression classifier step
+        param_grid: Parameter grid as for GridSearchCV with classifier__C
+        scoring: Scoring metric or dict of metrics as for GridSearchCV
+        refit: Metric optimized and refit on the full dataset
+        cv: Cross-validation folds
+        tol: Convergence tolerance of each solve
+        max_iter: Largest number of solver iterations per solve
+        n_jobs: Number of parallel fits, -1 uses every core
+        verbose: Whether to print progress information
+    """
+
+    def __init__(
+        self,
+        estimator,
+        param_grid,
+        scoring=None,
+        refit=True,
+        cv=5,
+        tol: float = 1e-4,
+        max_iter: int = 10_000,
+        n_jobs: int = -1,
+        verbose: int = 0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.tol = tol
+        self.max_iter = max_iter
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def fit(self, X, y):
+        """
+        Fit the regularization paths and refit the best candidate.
+
+        Args:
+            X: Predictors
+            y: Response
+
+        Returns:
+            LogisticPathCV: The fitted search
+        """
+        classifier = self.estimator.named_steps["classifier"]
+        if type(classifier).__name__ != "LogisticRegression":
+            raise ValueError(
+                "Path fitting needs a LogisticRegression classifier, "
+                f"got {type(classifier).__name__}"
+            )
+        if not isinstance(self.param_grid, dict) or "classifier__C" not in self.param_grid:
+            raise ValueError("param_grid must be a dict with classifier__C values")
+
+        Cs = sorted(self.param_grid["classifier__C"])
+        l1_ratios = list(self.param_grid.get("classifier__l1_ratio", [classifier.l1_ratio]))
+        path_classifier = clone(classifier).set_params(
+            warm_start=True, tol=self.tol, max_iter=self.max_iter
+        )
+        if "classifier__l1_ratio" in self.param_grid:
+            path_classifier.set_params(solver="saga", penalty="elasticnet")
+        outer_candidates = list(ParameterGrid(
+            {name: values for name, values in self.param_grid.items() if name not in PATH_PARAMS}
+        ))
+
+        # Scorers by name and the metric that is optimized
+        if isinstance(self.scoring, dict):
+            scorers = {
+                name: check_scoring(classifier, scoring=scoring)
+                for name, scoring in self.scoring.items()
+            }
+            if self.refit not in scorers:
+                raise ValueError(f"refit must name one of the scoring metrics, got: {self.refit}")
+            refit_metric = self.refit
+        else:
+            scorers = {"score": check_scoring(classifier, scoring=self.scoring)}
+            refit_metric = "score"
+
+        cv = check_cv(self.cv, y, classifier=True)
+        folds = list(cv.split(X, y))
+        parallel = Parallel(n_jobs=self.n_jobs)
+
+        # ==== Shared Preprocessing and Over Sampling by Fold ====
+        fold_keys = [
+            (outer_idx, fold_idx)
+            for outer_idx in range(len(outer_candidates))
+            for fold_idx in range(len(folds))
+        ]
+        fold_data = parallel(
+            delayed(_prepare_fold)(
+                clone(self.estimator).set_params(**outer_candidates[outer_idx]),
+                X, y, *folds[fold_idx]
+            )
+            for outer_idx, fold_idx in fold_keys
+        )
+        fold_data = dict(zip(fold_keys, fold_data))
+
+        # ==== Paths by Fold and l1_ratio ====
+        path_keys = [
+            (outer_idx, l1_idx, fold_idx)
+            for outer_idx in range(len(outer_candidates))
+            for l1_idx in range(len(l1_ratios))
+            for fold_idx in range(len(folds))
+        ]
+        paths = parallel(
+            delayed(_fit_path)(
+                _outer_classifier(path_classifier, outer_candidates[outer_idx]),
+                Cs, l1_ratios[l1_idx], *fold_data[(outer_idx, fold_idx)], scorers
+            )
+            for outer_idx, l1_idx, fold_idx in path_keys
+        )
+        paths = dict(zip(path_keys, paths))
+
+        # Candidates in grid order of outer parameters, l1_ratio and C
+        candidates = list()
+        fold_scores = list()
+        fit_times = list()
+        n_iters = list()
+        for outer_idx, outer_params in enumerate(outer_candidates):
+            for l1_idx, l1_ratio in enumerate(l1_ratios):
+                for C_idx, C in enumerate(Cs):
+                    params = {**outer_params, "classifier__C": C}
+                    if "classifier__l1_ratio" in self.param_grid:
+                        params["classifier__l1_ratio"] = l1_ratio
+                    candidates.append(params)
+                    steps = [paths[(outer_idx, l1_idx, fold_idx)][C_idx]
+                             for fold_idx in range(len(folds))]
+                    fold_scores.append([step["scores"] for step in steps])
+                    fit_times.append([step["fit_time"] for step in steps])
+                    n_iters.append([step["n_iter"] for step in steps])
+
+        self.cv_results_ = _cv_results(candidates, fold_scores, fit_times, n_iters, scorers)
+        self.best_index_ = int(np.argmin(self.cv_results_[f"rank_test_{refit_metric}"]))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = self.cv_results_[f"mean_test_{refit_metric}"][self.best_index_]
+        self.scorer_ = scorers if isinstance(self.scoring, dict) else scorers["score"]
+
+        if self.verbose:
+            print(f"Fit {len(path_keys)} paths of {len(Cs)} C values, "
+                  f"mean solver iterations per fit: {np.mean(n_iters):.1f}")
+
+        if self.refit:
+            self.best_estimator_ = self._refit_best(X, y, path_classifier, Cs)
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X, y):
+        scorer = self.scorer_[self.refit] if isinstance(self.scorer_, dict) else self.scorer_
+        return scorer(self.best_estimator_, X, y)
+
+    def _refit_best(self, X, y, path_classifier, Cs):
+        """
+        Fit the best candidate on the full data along its path up to the best C.
+        """
+        outer_params = {
+            name: value for name, value in self.best_params_.items() if name not in PATH_PARAMS
+        }
+        pipeline = clone(self.estimator).set_params(**outer_params)
+        Xt, yt = _prepare(pipeline, X, y)
+
+        classifier = _outer_classifier(path_classifier, outer_params)
+        if "classifier__l1_ratio" in self.best_params_:
+            classifier.set_params(l1_ratio=self.best_params_["classifier__l1_ratio"])
+        for C in Cs[:Cs.index(self.best_params_["classifier__C"]) + 1]:
+            classifier.set_params(C=C).fit(Xt, yt)
+        classifier.set_params(warm_start=False)
+
+        pipeline.steps[-1] = ("classifier", classifier)
+        return pipeline
+
+def _outer_classifier(path_classifier, outer_params: Dict):
+    """
+    Path classifier with the classifier parameters of an outer candidate.
+    """
+    classifier_params = {
+        name.split("__", 1)[1]: value for name, value in outer_params.items()
+        if name.startswith("classifier__")
+    }
+    return clone(path_classifier).set_params(**classifier_params)
+
+def _prepare(pipeline, X, y):
+    """
+    Fit the preprocessor and oversampler of the pipeline in place and return
+    the resampled training data.
+    """
+    Xt = pipeline.named_steps["preprocessor"].fit_transform(X, y)
+    oversampler = pipeline.named_steps["oversampler"]
+    if oversampler is None or oversampler == "passthrough":
+        return Xt, y
+    return oversampler.fit_resample(Xt, y)
+
+def _prepare_fold(pipeline, X, y, train_idx, test_idx):
+    """
+    Resampled training data and preprocessed held out data of one fold.
+    """
+    Xt_train, yt_train = _prepare(
+        pipeline, _safe_indexing(X, train_idx), _safe_indexing(y, train_idx)
+    )
+    Xt_test = pipeline.named_steps["preprocessor"].transform(_safe_indexing(X, test_idx))
+    return Xt_train, yt_train, Xt_test, _safe_indexing(y, test_idx)
+
+def _fit_path(classifier, Cs, l1_ratio, Xt_train, yt_train, Xt_test, y_test, scorers):
+    """
+    Sweep C from the strongest regularization, warm-starting each solve, and
+    score each fit on the held out fold.
+    """
+    classifier = classifier.set_params(l1_ratio=l1_ratio)
+    path = list()
+    for C in Cs:
+        start = time.perf_counter()
+        classifier.set_params(C=C).fit(Xt_train, yt_train)
+        fit_time = time.perf_counter() - start
+        path.append({
+            "scores": {
+                name: scorer(classifier, Xt_test, y_test) for name, scorer in scorers.items()
+            },
+            "fit_time": fit_time,
+            "n_iter": int(np.max(classifier.n_iter_)),
+        })
+    return path
+
+def _cv_results(candidates, fold_scores, fit_times, n_iters, scorers) -> Dict:
+    """
+    GridSearchCV style cv_results_ of the path candidates.
+    """
+    n_folds = len(fold_scores[0])
+    cv_results = {
+        "params": candidates,
+        "mean_fit_time": np.mean(fit_times, axis=1),
+        "std_fit_time": np.std(fit_times, axis=1),
+        "mean_n_iter": np.mean(n_iters, axis=1),
+    }
+    for name in sorted({name for params in candidates for name in params}):
+        cv_results[f"param_{name}"] = [params.get(name) for params in candidates]
+
+    for name in scorers:
+        scores = np.array([[score[name] for score in candidate] for candidate in fold_scores])
+        for fold_idx in range(n_folds):
+            cv_results[f"split{fold_idx}_test_{name}"] = scores[:, fold_idx]
+        mean_scores = scores.mean(axis=1)
+        rank_scores = np.nan_to_num(mean_scores, nan=-np.inf)
+        cv_results[f"mean_test_{name}"] = mean_scores
+        cv_results[f"std_test_{name}"] = scores.std(axis=1)
+        cv_results[f"rank_test_{name}"] = (
+            np.argsort(np.argsort(-rank_scores, kind="stable"), kind="stable") + 1
+        )
+
+    return cv_results
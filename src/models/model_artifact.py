@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import warnings
+from datetime import datetime, timezone
+from typing import Dict
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+# Version of the artifact layout. Bump when the files or metadata change.
+ARTIFACT_VERSION = 1
+PIPELINE_FILE = "pipeline.joblib"
+METADATA_FILE = "metadata.json"
+
+
+def save_model_artifact(results: Dict, artifact_dir: str):
+    """
+    Save a trained pipeline as a versioned artifact for batch scoring.
+
+    The artifact directory holds the pipeline and a metadata file with the
+    predictors it was trained on, the response names, the predictors with
+    drop imputation and a hash of the training data, so scores can be traced
+    back to the exact training set.
+
+    Args:
+        results: Results of model_prep_on_base, with the pipeline,
+            feature_names, response_names, X_train and y_train
+        artifact_dir: Directory the artifact is written to
+
+    Returns:
+        dict: Metadata of the artifact
+    """
+    missing_keys = [
+        key for key in ["pipeline", "feature_names", "response_names", "X_train", "y_train"]
+        if key not in results
+    ]
+    if missing_keys:
+        raise ValueError(f"Results are missing: {missing_keys}")
+
+    metadata = {
+        "artifact_version": ARTIFACT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sklearn_version": sklearn.__version__,
+        "model_type": type(results["pipeline"].steps[-1][1]).__name__,
+        "feature_names": list(results["feature_names"]),
+        "response_names": list(results["response_names"]),
+        "drop_null_features": list(results.get("drop_null_features", [])),
+        "classes": np.asarray(results["pipeline"].classes_).tolist(),
+        "n_train": len(results["X_train"]),
+        "training_data_hash": training_data_hash(results["X_train"], results["y_train"]),
+        "metrics": {
+            metric: float(results[metric]) for metric in ["brier_score", "log_loss"]
+            if metric in results
+        },
+    }
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    joblib.dump(results["pipeline"], os.path.join(artifact_dir, PIPELINE_FILE))
+    with open(os.path.join(artifact_dir, METADATA_FILE), "w") as file:
+        json.dump(metadata, file, indent=2)
+
+    return metadata
+
+def load_model_artifact(artifact_dir: str):
+    """
+    Load an artifact written by save_model_artifact.
+
+    Args:
+        artifact_dir: Directory of the artifact
+
+    Returns:
+        tuple: The pipeline and the metadata
+    """
+    metadata_path = os.path.join(artifact_dir, METADATA_FILE)
+    if not os.path.isfile(metadata_path):
+        raise ValueError(f"Model artifact not found at: {artifact_dir}")
+
+    with open(metadata_path) as file:
+        metadata = json.load(file)
+
+    if metadata.get("artifact_version") != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact version {metadata.get('artifact_version')}, "
+            f"expected {ARTIFACT_VERSION}"
+        )
+    if metadata["sklearn_version"] != sklearn.__version__:
+        warnings.warn(
+            f"Artifact was saved with scikit-learn {metadata['sklearn_version']} and is loaded "
+            f"with {sklearn.__version__}. Predictions may differ."
+        )
+
+    pipeline = joblib.load(os.path.join(artifact_dir, PIPELINE_FILE))
+    return pipeline, metadata
+
+def training_data_hash(X_train: pd.DataFrame, y_train) -> str:
+    """
+    SHA-256 of the training predictors, their column names and the responses.
+    Row order matters, the index does not.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(list(X_train.columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(X_train, index=False).to_numpy().tobytes())
+    y_hashes = pd.util.hash_pandas_object(pd.DataFrame(np.asarray(y_train)), index=False)
+    hasher.update(y_hashes.to_numpy().tobytes())
+    return hasher.hexdigest()
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import Callable
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import (GradientBoostingClassifier, HistGradientBoostingClassifier,
+                              RandomForestClassifier)
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+
+# Model factories by model_type. Each factory takes random_state and n_threads.
+MODEL_REGISTRY = dict()
+
+
+def register_model(
+    name: str,
+    factory: Callable,
+    native_missing: bool = False,
+    dense_input: bool = False):
+    """
+    Add a model_type to create_model_pipeline.
+
+    Args:
+        name: model_type name
+        factory: Function of random_state and n_threads returning an
+            unfitted classifier
+        native_missing: Whether the classifier handles missing values, so
+            median imputation can be skipped
+        dense_input: Whether the classifier requires dense inputs instead of
+            the sparse one hot encoding
+    """
+    MODEL_REGISTRY[name] = {
+        "factory": factory,
+        "native_missing": native_missing,
+        "dense_input": dense_input
+    }
+
+def make_model(model_type: str, random_state: int = 123, n_threads: int = 1):
+    """
+    Create a registered classifier.
+
+    Args:
+        model_type: Registered model_type name
+        random_state: Random seed for reproducibility
+        n_threads: Threads of multithreaded classifiers
+
+    Returns:
+        Unfitted classifier
+    """
+    if model_type not in MODEL_REGISTRY:
+        raise ValueError(
+            f"Unknown model type: {model_type}. Use any of {list(MODEL_REGISTRY)}."
+        )
+    return MODEL_REGISTRY[model_type]["factory"](random_state=random_state, n_threads=n_threads)
+
+
+class XGBEarlyStoppingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    XGBoost classifier with the hist tree method that stops adding trees
+    when the log loss of a stratified validation split of the training data
+    stops improving. xgboost is the optional xgboost extra of the project and
+    is imported when the classifier is fit.
+
+    Args:
+        n_estimators: Maximum number of trees
+        learning_rate: Shrinkage of each tree
+        max_depth: Maximum tree depth
+        min_child_weight: Minimum hessian weight of a leaf
+        subsample: Row subsample ratio per tree
+        colsample_bytree: Column subsample ratio per tree
+        reg_lambda: L2 regularization of the leaf weights
+        scale_pos_weight: Weight of the positive class
+        early_stopping_rounds: Trees without improvement before stopping
+        validation_fraction: Share of the training data held out for early
+            stopping
+        n_jobs: Number of threads
+        random_state: Random seed for reproducibility
+    """
+
+    def __init__(
+        self,
+        n_estimators: int = 1000,
+        learning_rate: float = 0.1,
+        max_depth: int = 6,
+        min_child_weight: float = 1.0,
+        subsample: float = 1.0,
+        colsample_bytree: float = 1.0,
+        reg_lambda: float = 1.0,
+        scale_pos_weight: float = 1.0,
+        early_stopping_rounds: int = 20,
+        validation_fraction: float = 0.1,
+        n_jobs: int = 1,
+        random_state: int = None):
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_child_weight = min_child_weight
+        self.subsample = subsample
+        self.colsample_bytree = colsample_bytree
+        self.reg_lambda = reg_lambda
+        self.scale_pos_weight = scale_pos_weight
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        try:
+            from xgboost import XGBClassifier
+        except ImportError as error:
+            raise ImportError(
+                "model_type XGBClassifier requires xgboost. "
+                "Install the extra with: uv sync --extra xgboost"
+            ) from error
+
+        self.classes_, y_encoded = np.unique(np.asarray(y), return_inverse=True)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y_encoded,
+            test_size=self.validation_fraction,
+            stratify=y_encoded,
+            random_state=self.random_state
+        )
+
+        self.model_ = XGBClassifier(
+            tree_method="hist",
+            n_estimators=self.n_estimators,
+            learning_rate=self.learning_rate,
+            max_depth=self.max_depth,
+            min_child_weight=self.min_child_weight,
+            subsample=self.subsample,
+            colsample_bytree=self.colsample_bytree,
+            reg_lambda=self.reg_lambda,
+            scale_pos_weight=self.scale_pos_weight,
+            early_stopping_rounds=self.early_stopping_rounds,
+            eval_metric="logloss",
+            n_jobs=self.n_jobs,
+            random_state=self.random_state,
+        )
+        self.model_.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        self.best_iteration_ = self.model_.best_iteration
+        self.n_features_in_ = self.model_.n_features_in_
+        return self
+
+    def predict_proba(self, X):
+        return self.model_.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# ==== Registered Models ====
+register_model(
+    "LogisticRegression",
+    lambda random_state, n_threads: LogisticRegression(random_state=random_state)
+)
+register_model(
+    "RandomForestClassifier",
+    lambda random_state, n_threads: RandomForestClassifier(random_state=random_state)
+)
+register_model(
+    "GradientBoostingClassifier",
+    lambda random_state, n_threads: GradientBoostingClassifier(random_state=random_state)
+)
+register_model(
+    "KNeighborsClassifier",
+    lambda random_state, n_threads: KNeighborsClassifier()
+)
+register_model(
+    "MLPClassifier",
+    lambda random_state, n_threads: MLPClassifier(random_state=random_state)
+)
+# Histogram boosting stops on a validation split of each training fold. Its OpenMP threads are
+# limited by joblib in the parallel search workers.
+register_model(
+    "HistGradientBoostingClassifier",
+    lambda random_state, n_threads: HistGradientBoostingClassifier(
+        max_iter=1000,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=20,
+        random_state=random_state
+    ),
+    native_missing=True,
+    dense_input=True
+)
+register_model(
+    "XGBClassifier",
+    lambda random_state, n_threads: XGBEarlyStoppingClassifier(
+        n_jobs=n_threads, random_state=random_state
+    ),
+    native_missing=True
+)
@@ -0,0 +1,279 @@
+import numpy as np
+import polars as pl
+from typing import List
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import brier_score_loss, log_loss
+from sklearn.model_selection import GridSearchCV, ParameterGrid, check_cv, train_test_split
+
+from imblearn.pipeline import Pipeline as ImbPipeline
+
+from .censoring_experiment import _get_scorers, _fit_transform, _fit_tail, _fit_score
+
+# Mutually exclusive outcomes of the runner, exactly one is True per play
+RUNNER_OUTCOMES = ["is_advance", "is_out", "is_stay"]
+
+
+def run_multi_response(
+    on_base_lf: pl.LazyFrame,
+    grid_search: GridSearchCV,
+    responses: List[str] = ["is_out", "is_stay", "is_advance", "is_successful"],
+    mode: str = "heads",
+    cat_predictors_drop: List[str] = [],
+    cat_predictors_mode: List[str] = [],
+    num_predictors_drop: List[str] = [],
+    num_predictors_median: List[str] = [],
+    test_size: float = 0.30,
+    random_state: int = 123,
+    n_jobs: int = -1,
+    verbose: bool = True):
+    """
+    Train models for several responses on one data pass.
+
+    The data is collected, split and assigned to cross-validation folds once,
+    stratified by the combination of responses, so every response is trained
+    and tested on the same rows. The preprocessor of the grid search pipeline
+    does not use the labels, so it is fit once per fold and once on the full
+    train set and shared by every model. Only the oversampler and classifier
+    are fit per model, parameter set and fold, in parallel with n_jobs.
+
+    mode picks the models:
+        "heads": One binary model per response. The folds of every response
+            are fit in the same parallel run.
+        "multiclass": One multiclass model over RUNNER_OUTCOMES. Each
+            response in RUNNER_OUTCOMES gets the probability of its outcome.
+            Parameters are selected by the multiclass Brier score. Other
+            responses, like is_successful, are trained as heads.
+
+    Args:
+        on_base_lf: Polars LazyFrame with the data
+        grid_search: GridSearchCV from create_model_pipeline. Its param_grid
+            may only tune the oversampler and classifier steps.
+        responses: Boolean responses to train
+        mode: "heads" or "multiclass"
+        cat_predictors_drop: Categorical predictors with drop imputation
+        cat_predictors_mode: Categorical predictors with mode imputation
+        num_predictors_drop: Numerical predictors with drop imputation
+        num_predictors_median: Numerical predictors with median imputation
+        test_size: Proportion of data for testing
+        random_state: Random seed for reproducibility
+        n_jobs: Number of parallel fits, -1 uses every core
+        verbose: Whether to print the metrics table
+
+    Returns:
+        dict: metrics, one row per response with the model, best parameters,
+            CV score and test metrics; cv_results, one row per model,
+            parameter set and fold; results, model_prep_on_base style results
+            by response
+    """
+    # ==== Validate Inputs ====
+    if mode not in ["heads", "multiclass"]:
+        raise ValueError(f"Unknown mode: {mode}. Use heads or multiclass.")
+    if not hasattr(grid_search, "param_grid"):
+        raise ValueError("Use a grid or bayesian search_strategy, the models share one grid")
+    param_grid = ParameterGrid(grid_search.param_grid or {})
+    tuned_steps = {name.split("__")[0] for params in param_grid for name in params}
+    if tuned_steps - {"oversampler", "classifier"}:
+        raise ValueError(
+            f"Only the oversampler and classifier can be tuned, got: {sorted(tuned_steps)}"
+        )
+
+    outcome_responses = [response for response in responses if response in RUNNER_OUTCOMES]
+    if mode == "multiclass" and len(outcome_responses) == 0:
+        raise ValueError(f"Multiclass mode needs a response in {RUNNER_OUTCOMES}")
+
+    scorers = _get_scorers(grid_search.scoring)
+    refit = grid_search.refit if isinstance(grid_search.refit, str) else next(iter(scorers))
+
+    # ==== Data Preparation ====
+    all_predictors = (cat_predictors_drop + cat_predictors_mode +
+                      num_predictors_drop + num_predictors_median)
+    drop_null_features = cat_predictors_drop + num_predictors_drop
+    label_cols = list(dict.fromkeys(
+        responses + (RUNNER_OUTCOMES if mode == "multiclass" else [])
+    ))
+    data = on_base_lf.select(list(dict.fromkeys(all_predictors + label_cols))).collect()
+
+    # Stratify by the combination of responses
+    train_idx, test_idx = train_test_split(
+        np.arange(data.height),
+        test_size=test_size,
+        shuffle=True,
+        stratify=data.select(responses).to_numpy(),
+        random_state=random_state
+    )
+    train_set = data[train_idx].drop_nulls(drop_null_features + label_cols)
+    test_set = data[test_idx].drop_nulls(drop_null_features + label_cols)
+
+    X_train = train_set.select(all_predictors).to_pandas()
+    X_test = test_set.select(all_predictors).to_pandas()
+
+    # Labels by model
+    targets = dict()
+    if mode == "multiclass":
+        outcomes_train = train_set.select(RUNNER_OUTCOMES).to_numpy()
+        outcomes_test = test_set.select(RUNNER_OUTCOMES).to_numpy()
+        if (outcomes_train.sum(axis=1) != 1).any() or (outcomes_test.sum(axis=1) != 1).any():
+            raise ValueError(f"Plays must have exactly one True outcome of {RUNNER_OUTCOMES}")
+        targets["outcome"] = {
+            "responses": outcome_responses,
+            "y_train": np.array(RUNNER_OUTCOMES)[outcomes_train.argmax(axis=1)],
+            "y_test": np.array(RUNNER_OUTCOMES)[outcomes_test.argmax(axis=1)],
+            "scorers": {"brier_score": _multiclass_brier_scorer},
+            "refit": "brier_score",
+        }
+    for response in responses:
+        if mode == "multiclass" and response in RUNNER_OUTCOMES:
+            continue
+        targets[response] = {
+            "responses": [response],
+            "y_train": train_set.get_column(response).to_numpy(),
+            "y_test": test_set.get_column(response).to_numpy(),
+            "scorers": scorers,
+            "refit": refit,
+        }
+
+    # Folds from the combination of responses, shared by every model
+    _, y_strata = np.unique(train_set.select(responses).to_numpy(), axis=0, return_inverse=True)
+    y_strata = y_strata.ravel()
+    cv = check_cv(grid_search.cv, y_strata, classifier=True)
+    folds = list(cv.split(X_train, y_strata))
+
+    # ==== Shared Preprocessing ====
+    preprocessor = grid_search.estimator.named_steps["preprocessor"]
+    parallel = Parallel(n_jobs=n_jobs)
+    fold_data = parallel(
+        delayed(_fit_transform)(clone(preprocessor), X_train.iloc[fit_idx], X_train.iloc[val_idx])
+        for fit_idx, val_idx in folds
+    )
+    full_preprocessor, Xt_train, Xt_test = _fit_transform(clone(preprocessor), X_train, X_test)
+
+    # ==== Cross Validation by Model ====
+    # Oversampler and classifier steps of the grid search pipeline
+    model_tail = ImbPipeline(grid_search.estimator.steps[1:])
+    tasks = [
+        (name, param_idx, fold_idx)
+        for name in targets
+        for param_idx in range(len(param_grid))
+        for fold_idx in range(len(folds))
+    ]
+    fold_scores = parallel(
+        delayed(_fit_score)(
+            clone(model_tail),
+            param_grid[param_idx],
+            fold_data[fold_idx][1],
+            targets[name]["y_train"][folds[fold_idx][0]],
+            fold_data[fold_idx][2],
+            targets[name]["y_train"][folds[fold_idx][1]],
+            targets[name]["scorers"],
+        )
+        for name, param_idx, fold_idx in tasks
+    )
+
+    cv_results = pl.DataFrame([
+        {"model": name, "param_index": param_idx, "params": str(param_grid[param_idx]),
+         "fold": fold_idx, "score": scores[targets[name]["refit"]]}
+        for (name, param_idx, fold_idx), scores in zip(tasks, fold_scores)
+    ])
+
+    best_pl = (cv_results
+        .group_by(["model", "param_index"])
+        .agg(pl.col("score").mean().alias("best_score"))
+        .sort(["model", "best_score", "param_index"], descending=[False, True, False])
+        .unique(subset="model", keep="first", maintain_order=True)
+    )
+    best_params = {
+        row["model"]: (param_grid[row["param_index"]], row["best_score"])
+        for row in best_pl.iter_rows(named=True)
+    }
+
+    # ==== Refit and Evaluate by Response ====
+    fitted_tails = parallel(
+        delayed(_fit_tail)(clone(model_tail), best_params[name][0], Xt_train, target["y_train"])
+        for name, target in targets.items()
+    )
+
+    metric_rows = list()
+    results = dict()
+    for (name, target), fitted_tail in zip(targets.items(), fitted_tails):
+        pipeline = ImbPipeline([("preprocessor", full_preprocessor)] + fitted_tail.steps)
+        proba = fitted_tail.predict_proba(Xt_test)
+        classes = list(fitted_tail.classes_)
+        params, best_score = best_params[name]
+        if name == "outcome":
+            proba = _align_proba(proba, classes, RUNNER_OUTCOMES)
+
+        for response in target["responses"]:
+            if name == "outcome":
+                y_test = test_set.get_column(response).to_numpy()
+                y_pred_proba = proba[:, RUNNER_OUTCOMES.index(response)]
+            else:
+                y_test = target["y_test"]
+                y_pred_proba = proba[:, classes.index(True)]
+            pred_brier_score = brier_score_loss(y_test, y_pred_proba)
+            pred_log_loss = log_loss(y_test, y_pred_proba, labels=[False, True])
+
+            metric_rows.append({
+                "response": response,
+                "model": "multiclass" if name == "outcome" else "head",
+                "n_train": len(target["y_train"]),
+                "n_test": len(y_test),
+                "test_rate": float(np.mean(y_test)),
+                "best_params": str(params),
+                "best_cv_score": best_score,
+                "brier_score": pred_brier_score,
+                "log_loss": pred_log_loss,
+            })
+            results[response] = {
+                'pipeline': pipeline,
+                'y_test': y_test,
+                'y_pred': y_pred_proba >= 0.5,
+                'y_pred_proba': y_pred_proba,
+                'brier_score': pred_brier_score,
+                'log_loss': pred_log_loss,
+                'best_params': params,
+            }
+
+    metrics = pl.DataFrame(metric_rows)
+
+    if verbose:
+        with pl.Config(tbl_cols=-1, fmt_str_lengths=80):
+            print(metrics.drop("best_params"))
+
+    return {
+        'metrics': metrics,
+        'cv_results': cv_results,
+        'results': results,
+        'X_train': X_train,
+        'X_test': X_test,
+        'feature_names': all_predictors,
+        'response_names': responses,
+    }
+
+def _align_proba(proba: np.ndarray, classes: List, labels: List) -> np.ndarray:
+    """
+    Probability columns reordered from the estimator's classes to labels.
+    Labels the estimator was not fit on get probability 0.
+    """
+    aligned = np.zeros((proba.shape[0], len(labels)))
+    aligned[:, [labels.index(label) for label in classes]] = proba
+    return aligned
+
+def _multiclass_brier_scorer(estimator, X, y_true) -> float:
+    """
+    Negated multiclass Brier score over RUNNER_OUTCOMES, so larger is better
+    as for GridSearchCV scorers. The probabilities are aligned through
+    estimator.classes_, so a fold missing an outcome is scored correctly.
+    """
+    proba = _align_proba(estimator.predict_proba(X), list(estimator.classes_), RUNNER_OUTCOMES)
+    return -_multiclass_brier_score(y_true, proba, RUNNER_OUTCOMES)
+
+def _multiclass_brier_score(y_true, y_proba, labels: List[str]) -> float:
+    """
+    Mean over plays of the squared error summed over the outcomes. The
+    columns of y_proba are in the order of labels and y_true is one hot
+    encoded against all labels.
+    """
+    y_onehot = (np.asarray(y_true)[:, None] == np.asarray(labels)[None, :]).astype(float)
+    return float(np.mean(np.sum((y_onehot - y_proba) ** 2, axis=1)))
@@ -0,0 +1,130 @@
+import os
+import time
+from contextlib import contextmanager
+
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
+
+
+class ParallelBudget:
+    """
+    CPU budget of a search, split between the parallel search workers and
+    the threads of each worker.
+
+    Each search worker fits one candidate on one fold. The BLAS threads of
+    LogisticRegression and MLPClassifier and the OpenMP threads of the
+    boosting models are limited to threads_per_worker, so the workers use at
+    most n_cpus cores in total instead of each worker starting a thread per
+    core. The loky backend runs the workers in processes and the threading
+    backend runs them in threads of this process, which avoids copying the
+    data to each worker but only helps when the fits release the GIL.
+
+    Args:
+        n_cpus: Total number of cores of the search. Defaults to the cores
+            available to this process.
+        n_workers: Number of parallel search workers. Defaults to n_cpus, one
+            thread per worker.
+        backend: joblib backend of the search workers, "loky" or "threading"
+    """
+
+    def __init__(
+        self,
+        n_cpus: int = None,
+        n_workers: int = None,
+        backend: str = "loky"):
+        if backend not in ["loky", "threading"]:
+            raise ValueError(f"Unknown backend: {backend}. Use loky or threading.")
+
+        self.n_cpus = n_cpus or _available_cpus()
+        self.n_workers = min(n_workers or self.n_cpus, self.n_cpus)
+        self.threads_per_worker = max(1, self.n_cpus // self.n_workers)
+        self.backend = backend
+        self.utilization_ = None
+
+    @contextmanager
+    def limits(self):
+        """
+        Run parallel joblib calls inside the block with the budget's workers
+        and thread limits.
+        """
+        # Loky sets the thread limits of its worker processes. Threading workers share this
+        # process's thread pools, so its limits apply to every worker.
+        inner_max_num_threads = self.threads_per_worker if self.backend == "loky" else None
+        with parallel_config(
+            backend=self.backend,
+            n_jobs=self.n_workers,
+            inner_max_num_threads=inner_max_num_threads
+        ), threadpool_limits(limits=self.threads_per_worker):
+            yield self
+
+    def fit(self, search, X, y, verbose: bool = True, **fit_params):
+        """
+        Fit a search within the budget and record the achieved CPU utilization.
+
+        Args:
+            search: Unfitted search, e.g. from create_model_pipeline
+            X: Training predictors
+            y: Training responses
+            verbose: Whether to print the CPU utilization
+            **fit_params: Parameters passed to search.fit
+
+        Returns:
+            The fitted search
+        """
+        start_cpu = _process_tree_cpu_times()
+        start_time = time.perf_counter()
+        with self.limits():
+            search.fit(X, y, **fit_params)
+        wall_s = time.perf_counter() - start_time
+        end_cpu = _process_tree_cpu_times()
+
+        # Processes that exited during the fit are not counted
+        cpu_s = sum(cpu - start_cpu.get(pid, 0.0) for pid, cpu in end_cpu.items())
+        self.utilization_ = {
+            "n_cpus": self.n_cpus,
+            "n_workers": self.n_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "backend": self.backend,
+            "wall_s": wall_s,
+            "cpu_s": cpu_s,
+            "utilization": cpu_s / (wall_s * self.n_cpus),
+        }
+
+        if verbose:
+            print(
+                f"CPU utilization: {self.utilization_['utilization']:.1%} of {self.n_cpus} cores "
+                f"({self.n_workers} workers x {self.threads_per_worker} threads, "
+                f"{cpu_s:.1f} CPU s in {wall_s:.1f} s)"
+            )
+
+        return search
+
+def _available_cpus() -> int:
+    """
+    Cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _process_tree_cpu_times() -> dict:
+    """
+    User and system CPU seconds of this process and its child processes by pid.
+    Without psutil only this process and its exited children are counted.
+    """
+    try:
+        import psutil
+    except ImportError:
+        times = os.times()
+        return {os.getpid(): times.user + times.system +
+                times.children_user + times.children_system}
+
+    process = psutil.Process()
+    cpu_times = dict()
+    for proc in [process] + process.children(recursive=True):
+        try:
+            times = proc.cpu_times()
+            cpu_times[proc.pid] = times.user + times.system
+        except psutil.NoSuchProcess:
+            pass
+    return cpu_times
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .compiled_predictor import CompiledPredictor, compile_pipeline
+from .model_artifact import load_model_artifact
+
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+class ScoringServer:
+    """
+    Local asyncio HTTP service scoring plays with a CompiledPredictor.
+
+    Requests are micro-batched. The plays of requests that arrive within
+    max_wait_ms of the first waiting request, up to max_batch_size plays,
+    are scored with one predict_proba call, so concurrent requests share the
+    per-call overhead. With the default of 0 a batch holds the requests that
+    arrived while the previous batch was scored, so a lone request is never
+    delayed. The event loop's timer resolution is about a millisecond, so
+    small positive windows add about a millisecond to each request.
+    Connections are kept alive between requests.
+
+    Endpoints:
+        GET /health: Status and the predictor's feature names
+        POST /score: A JSON play, or {"plays": [...]}, of predictor values.
+            Returns {"probabilities": [...]}, null for plays missing a
+            predictor with drop imputation.
+
+    Args:
+        predictor: Compiled predictor of a trained pipeline
+        host: Host name to listen on
+        port: Port to listen on, 0 picks a free port
+        max_batch_size: Maximum plays per predict_proba call
+        max_wait_ms: Longest a request waits for other requests to batch with,
+            0 only batches requests that are already waiting
+    """
+
+    def __init__(
+        self,
+        predictor: CompiledPredictor,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 0.0):
+        self.predictor = predictor
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._server = None
+        self._batcher = None
+        self._queue = None
+
+    async def start(self):
+        """
+        Start listening and batching. Sets port to the bound port.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def score(self, plays: List[Dict]) -> List:
+        """
+        Probabilities of plays, scored in the next batch.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((plays, future))
+        return await future
+
+    async def _batch_loop(self):
+        """
+        Collect waiting requests into batches and score each batch at once.
+        """
+        loop = asyncio.get_running_loop()
+        max_wait_s = self.max_wait_ms / 1000
+        while True:
+            batch = [await self._queue.get()]
+            n_plays = len(batch[0][0])
+            deadline = loop.time() + max_wait_s
+            while n_plays < self.max_batch_size:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                n_plays += len(item[0])
+
+            try:
+                proba = self.predictor.predict_proba([play for plays, _ in batch for play in plays])
+            except Exception:
+                # Score the requests one by one so an invalid play only fails its own request
+                for plays, future in batch:
+                    try:
+                        self._set_result(future, self.predictor.predict_proba(plays))
+                    except Exception as error:
+                        if not future.done():
+                            future.set_exception(error)
+                continue
+
+            start = 0
+            for plays, future in batch:
+                self._set_result(future, proba[start:start + len(plays)])
+                start += len(plays)
+
+    @staticmethod
+    def _set_result(future: asyncio.Future, proba: np.ndarray):
+        if not future.done():
+            future.set_result([None if np.isnan(p) else float(p) for p in proba])
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve HTTP/1.1 requests on one connection until the client closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in [b"\r\n", b"\n", b""]:
+                        break
+                    key, value = line.decode("latin-1").split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._route(method, path, body)
+                response_body = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response_body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + response_body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "feature_names": self.predictor.feature_names}
+        if method != "POST" or path != "/score":
+            return 404, {"error": f"Unknown endpoint: {method} {path}"}
+
+        try:
+            request = json.loads(body)
+        except json.JSONDecodeError as error:
+            return 400, {"error": f"Invalid JSON: {error}"}
+        plays = request.get("plays", [request]) if isinstance(request, dict) else None
+        if not isinstance(plays, list) or not all(isinstance(play, dict) for play in plays):
+            return 400, {"error": "Send a play or {\"plays\": [...]} of predictor values"}
+
+        try:
+            return 200, {"probabilities": await self.score(plays)}
+        except (TypeError, ValueError) as error:
+            return 400, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": str(error)}
+
+def serve_model(
+    artifact_dir: str,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch_size: int = 64,
+    max_wait_ms: float = 0.0):
+    """
+    Compile a saved model artifact and serve it until interrupted.
+
+    Args:
+        artifact_dir: Directory of an artifact from save_model_artifact
+        host: Host name to listen on
+        port: Port to listen on
+        max_batch_size: Maximum plays per predict_proba call
+        max_wait_ms: Longest a request waits for other requests to batch with
+    """
+    pipeline, metadata = load_model_artifact(artifact_dir)
+    server = ScoringServer(
+        compile_pipeline(pipeline),
+        host=host,
+        port=port,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms
+    )
+    print(f"Serving {metadata['model_type']} from {artifact_dir} on http://{host}:{port}")
+    asyncio.run(server.serve_forever())
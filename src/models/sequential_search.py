@@ -0,0 +1,318 @@
+import numpy as np
+import warnings
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import BaseEstimator, clone, is_classifier
+from sklearn.exceptions import FitFailedWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.utils import _safe_indexing
+from scipy.stats import norm
+
+
+class SequentialSearchCV(BaseEstimator):
+    """
+    Model based sequential search over a parameter grid with early stopping of
+    bad candidates.
+
+    Candidates are proposed in batches. The first n_initial candidates are
+    drawn at random, later ones maximize the expected improvement of a
+    Gaussian process fit to the mean CV score of the evaluated candidates.
+    A batch is evaluated one fold at a time, and after each fold a candidate
+    whose running mean score is below the median running mean of the
+    completed candidates at the same fold is pruned. Results follow the
+    GridSearchCV contract: best_params_, best_score_, best_estimator_ and
+    cv_results_. Failed fits score nan and are reported with a
+    FitFailedWarning, and a ValueError is raised if no candidate completes
+    every fold without failing.
+
+    Args:
+        estimator: Estimator or pipeline to tune
+        param_grid: Parameter grid as for GridSearchCV
+        n_iter: Number of candidates to evaluate
+        n_initial: Random candidates before the Gaussian process is used.
+            Defaults to max(5, n_iter // 4).
+        batch_size: Candidates proposed and evaluated together. Defaults to
+            the number of CPU cores, capped at 8.
+        scoring: Scoring metric or dict of metrics as for GridSearchCV
+        refit: Metric optimized and refit on the full dataset
+        cv: Cross-validation folds
+        prune: Whether to stop bad candidates early
+        n_jobs: Number of parallel fits, -1 uses every core
+        random_state: Random seed for reproducibility
+        verbose: Whether to print progress information
+    """
+
+    def __init__(
+        self,
+        estimator,
+        param_grid,
+        n_iter: int = 30,
+        n_initial: int = None,
+        batch_size: int = None,
+        scoring=None,
+        refit=True,
+        cv=5,
+        prune: bool = True,
+        n_jobs: int = -1,
+        random_state: int = None,
+        verbose: int = 0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.n_iter = n_iter
+        self.n_initial = n_initial
+        self.batch_size = batch_size
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.prune = prune
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, X, y):
+        """
+        Run the sequential search and refit the best candidate.
+
+        Args:
+            X: Predictors
+            y: Response
+
+        Returns:
+            SequentialSearchCV: The fitted search
+        """
+        candidates = list(ParameterGrid(self.param_grid))
+        n_iter = min(self.n_iter, len(candidates))
+        n_initial = min(self.n_initial or max(5, n_iter // 4), n_iter)
+        batch_size = self.batch_size or min(8, effective_n_jobs(self.n_jobs))
+        rng = np.random.RandomState(self.random_state)
+
+        # Scorers by name and the metric that is optimized
+        if isinstance(self.scoring, dict):
+            scorers = {
+                name: check_scoring(self.estimator, scoring=scoring)
+                for name, scoring in self.scoring.items()
+            }
+            if self.refit not in scorers:
+                raise ValueError(f"refit must name one of the scoring metrics, got: {self.refit}")
+            refit_metric = self.refit
+        else:
+            scorers = {"score": check_scoring(self.estimator, scoring=self.scoring)}
+            refit_metric = "score"
+
+        cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
+        folds = list(cv.split(X, y))
+        encoded = _encode_candidates(candidates)
+
+        # Fold scores by candidate index
+        fold_scores = dict()
+        pruned = dict()
+        fit_errors = list()
+        parallel = Parallel(n_jobs=self.n_jobs)
+
+        while len(fold_scores) < n_iter:
+            n_batch = min(batch_size, n_iter - len(fold_scores))
+            unevaluated = [idx for idx in range(len(candidates)) if idx not in fold_scores]
+            if len(fold_scores) < n_initial:
+                batch = list(rng.choice(unevaluated, size=n_batch, replace=False))
+            else:
+                batch = self._propose(encoded, fold_scores, refit_metric, unevaluated, n_batch)
+
+            for idx in batch:
+                fold_scores[idx] = list()
+                pruned[idx] = False
+
+            for fold_idx, (train_idx, test_idx) in enumerate(folds):
+                alive = [idx for idx in batch if not pruned[idx]]
+                results = parallel(
+                    delayed(_fit_score)(
+                        clone(self.estimator), candidates[idx], X, y, train_idx, test_idx, scorers
+                    )
+                    for idx in alive
+                )
+                for idx, (score, error) in zip(alive, results):
+                    fold_scores[idx].append(score)
+                    if error is not None:
+                        fit_errors.append(error)
+
+                if self.prune and fold_idx < len(folds) - 1:
+                    self._prune(alive, fold_scores, pruned, refit_metric, fold_idx + 1)
+
+            if self.verbose:
+                best_score = max(_mean_score(fold_scores[idx], refit_metric)
+                                 for idx in fold_scores if not pruned[idx])
+                print(f"Evaluated {len(fold_scores)}/{n_iter} candidates, "
+                      f"{sum(pruned.values())} pruned, best {refit_metric}: {best_score:.4f}")
+
+        n_fits = sum(len(scores) for scores in fold_scores.values())
+        error_summary = "\n".join(
+            f"{count} fits failed with {error}"
+            for error, count in Counter(fit_errors).most_common()
+        )
+        completed = [
+            idx for idx in fold_scores
+            if not pruned[idx] and np.isfinite(_mean_score(fold_scores[idx], refit_metric))
+        ]
+        if not completed:
+            raise ValueError(
+                f"No candidate completed every fold, {len(fit_errors)} of {n_fits} fits failed:\n"
+                f"{error_summary}"
+            )
+        if fit_errors:
+            warnings.warn(
+                f"{len(fit_errors)} of {n_fits} fits failed and scored nan:\n{error_summary}",
+                FitFailedWarning
+            )
+
+        self.cv_results_ = self._cv_results(candidates, fold_scores, pruned, scorers, len(folds))
+        self.n_candidates_ = len(fold_scores)
+        self.n_pruned_ = sum(pruned.values())
+
+        best_idx = max(completed, key=lambda idx: _mean_score(fold_scores[idx], refit_metric))
+        self.best_index_ = sorted(fold_scores).index(best_idx)
+        self.best_params_ = candidates[best_idx]
+        self.best_score_ = _mean_score(fold_scores[best_idx], refit_metric)
+        self.scorer_ = scorers if isinstance(self.scoring, dict) else scorers["score"]
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X, y):
+        scorer = self.scorer_[self.refit] if isinstance(self.scorer_, dict) else self.scorer_
+        return scorer(self.best_estimator_, X, y)
+
+    def _propose(self, encoded, fold_scores, refit_metric, unevaluated, n_batch) -> List[int]:
+        """
+        Unevaluated candidates with the largest expected improvement.
+        """
+        evaluated = list(fold_scores)
+        scores = np.array([_mean_score(fold_scores[idx], refit_metric) for idx in evaluated])
+        finite = np.isfinite(scores)
+        if finite.sum() < 2:
+            return unevaluated[:n_batch]
+
+        gp = GaussianProcessRegressor(
+            kernel=Matern(nu=2.5) + WhiteKernel(),
+            normalize_y=True,
+            random_state=self.random_state,
+        )
+        gp.fit(encoded[np.array(evaluated)[finite]], scores[finite])
+        mean, std = gp.predict(encoded[unevaluated], return_std=True)
+        std = np.maximum(std, 1e-12)
+        improvement = mean - scores[finite].max()
+        expected_improvement = improvement * norm.cdf(improvement / std) + std * norm.pdf(
+            improvement / std
+        )
+        order = np.argsort(-expected_improvement, kind="stable")[:n_batch]
+        return [unevaluated[idx] for idx in order]
+
+    def _prune(self, alive, fold_scores, pruned, refit_metric, n_folds):
+        """
+        Prune candidates below the median running mean of completed candidates.
+        """
+        completed = [idx for idx in fold_scores if not pruned[idx] and idx not in alive]
+        if not completed:
+            return
+        reference = [_mean_score(fold_scores[idx][:n_folds], refit_metric) for idx in completed]
+        threshold = np.nanmedian(reference)
+        for idx in alive:
+            running_score = _mean_score(fold_scores[idx], refit_metric)
+            if not running_score >= threshold:
+                pruned[idx] = True
+
+    def _cv_results(self, candidates, fold_scores, pruned, scorers, n_folds) -> Dict:
+        """
+        GridSearchCV style cv_results_ of the evaluated candidates.
+        """
+        evaluated = sorted(fold_scores)
+        cv_results = {
+            "params": [candidates[idx] for idx in evaluated],
+            "n_folds_evaluated": np.array([len(fold_scores[idx]) for idx in evaluated]),
+            "pruned": np.array([pruned[idx] for idx in evaluated]),
+        }
+        for name in sorted({name for params in candidates for name in params}):
+            cv_results[f"param_{name}"] = [candidates[idx].get(name) for idx in evaluated]
+
+        for name in scorers:
+            scores = np.full((len(evaluated), n_folds), np.nan)
+            for row, idx in enumerate(evaluated):
+                scores[row, :len(fold_scores[idx])] = [score[name] for score in fold_scores[idx]]
+            for fold_idx in range(n_folds):
+                cv_results[f"split{fold_idx}_test_{name}"] = scores[:, fold_idx]
+            mean_scores = np.nanmean(scores, axis=1)
+            # Pruned and failed candidates rank after every completed candidate
+            rank_scores = np.nan_to_num(mean_scores, nan=-np.inf)
+            rank_scores[cv_results["pruned"]] = -np.inf
+            cv_results[f"mean_test_{name}"] = mean_scores
+            cv_results[f"std_test_{name}"] = np.nanstd(scores, axis=1)
+            cv_results[f"rank_test_{name}"] = (
+                np.argsort(np.argsort(-rank_scores, kind="stable"), kind="stable") + 1
+            )
+
+        return cv_results
+
+def _encode_candidates(candidates: List[Dict]) -> np.ndarray:
+    """
+    Encode candidates for the Gaussian process. Numeric parameters are scaled
+    to [0, 1], on a log scale when they span an order of magnitude, and other
+    parameters are one hot encoded.
+    """
+    names = sorted({name for params in candidates for name in params})
+    columns = list()
+    for name in names:
+        values = [params.get(name) for params in candidates]
+        is_numeric = all(
+            isinstance(value, (int, float)) and not isinstance(value, bool) for value in values
+        )
+        if is_numeric:
+            values = np.array(values, dtype=float)
+            if values.min() > 0 and values.max() / values.min() >= 10:
+                values = np.log10(values)
+            value_range = values.max() - values.min()
+            columns.append((values - values.min()) / value_range if value_range > 0
+                           else np.zeros(len(values)))
+        else:
+            labels = [repr(value) for value in values]
+            for label in dict.fromkeys(labels):
+                columns.append(np.array([label == other for other in labels], dtype=float))
+
+    if not columns:
+        return np.zeros((len(candidates), 1))
+    return np.column_stack(columns)
+
+def _mean_score(fold_scores: List[Dict], metric: str) -> float:
+    """
+    Mean score of the evaluated folds, -inf when a fold failed.
+    """
+    scores = np.array([score[metric] for score in fold_scores], dtype=float)
+    if len(scores) == 0 or not np.isfinite(scores).all():
+        return -np.inf
+    return scores.mean()
+
+def _fit_score(estimator, params, X, y, train_idx, test_idx, scorers) -> Tuple[Dict, str]:
+    """
+    Fit a candidate on one fold and score the held out fold. Failed fits
+    score nan like GridSearchCV and return the error, otherwise the error
+    is None.
+    """
+    try:
+        estimator = estimator.set_params(**params).fit(
+            _safe_indexing(X, train_idx), _safe_indexing(y, train_idx)
+        )
+        X_test = _safe_indexing(X, test_idx)
+        y_test = _safe_indexing(y, test_idx)
+        return {name: scorer(estimator, X_test, y_test) for name, scorer in scorers.items()}, None
+    except Exception as exception:
+        return {name: np.nan for name in scorers}, f"{type(exception).__name__}: {exception}"
@@ -0,0 +1,419 @@
+import hashlib
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+import polars as pl
+from typing import Dict, List, Optional
+
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.utils import _safe_indexing
+
+from .model_artifact import training_data_hash
+
+TRIALS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    trial_key TEXT PRIMARY KEY,
+    run_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    preprocessor_hash TEXT NOT NULL,
+    pipeline_hash TEXT NOT NULL,
+    fold_hash TEXT NOT NULL,
+    fold INTEGER NOT NULL,
+    n_folds INTEGER NOT NULL,
+    model_type TEXT NOT NULL,
+    oversampler TEXT NOT NULL,
+    params TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    fit_time REAL NOT NULL,
+    score_time REAL NOT NULL,
+    error TEXT
+)
+"""
+
+
+class TrialStore:
+    """
+    SQLite store of the fold results of grid searches.
+
+    Each trial is one candidate fit on one cross-validation fold. Trials are
+    keyed by a hash of the training data, the fold's rows and the pipeline
+    with the candidate's parameters set, which covers the preprocessing
+    configuration, the oversampler and the classifier. Each trial records the
+    fold's test scores and fit time, so a ResumableSearchCV with the same
+    store only fits the trials it has not seen. Failed trials are stored
+    with their error and nan scores, and are fit again by the next search.
+
+    The trials table can be queried with any SQLite client or loaded with
+    trials and summary to compare runs across days.
+
+    Args:
+        path: SQLite database file, created when missing
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with self._connect() as connection:
+            connection.execute(TRIALS_SCHEMA)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS trials_run_name ON trials (run_name, created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60)
+
+    def get(self, trial_keys: List[str]) -> Dict[str, Dict]:
+        """
+        Stored successful trials by key among trial_keys. Failed trials are
+        left out, so a resumed search fits them again.
+        """
+        found = dict()
+        with self._connect() as connection:
+            # SQLite limits the number of query parameters
+            for start in range(0, len(trial_keys), 500):
+                chunk = trial_keys[start:start + 500]
+                rows = connection.execute(
+                    "SELECT trial_key, scores, fit_time, score_time FROM trials "
+                    f"WHERE error IS NULL AND trial_key IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                for trial_key, scores, fit_time, score_time in rows:
+                    found[trial_key] = {
+                        "scores": json.loads(scores),
+                        "fit_time": fit_time,
+                        "score_time": score_time,
+                    }
+        return found
+
+    def put(self, trial: Dict):
+        """
+        Store one trial, replacing a trial with the same key.
+        """
+        columns = [
+            "trial_key", "run_name", "created_at", "data_hash", "preprocessor_hash",
+            "pipeline_hash", "fold_hash", "fold", "n_folds", "model_type", "oversampler",
+            "params", "scores", "fit_time", "score_time", "error",
+        ]
+        values = dict(trial)
+        values["params"] = json.dumps(trial["params"], sort_keys=True, default=repr)
+        values["scores"] = json.dumps(trial["scores"])
+        with self._connect() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO trials ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [values.get(column) for column in columns]
+            )
+
+    def trials(self, run_name: Optional[str] = None, data_hash: Optional[str] = None):
+        """
+        Stored trials with one test_{metric} column per scoring metric.
+
+        Args:
+            run_name: Only trials of this run
+            data_hash: Only trials on this training data
+
+        Returns:
+            pl.DataFrame: One row per trial
+        """
+        query = "SELECT * FROM trials"
+        filters = {"run_name": run_name, "data_hash": data_hash}
+        conditions = [f"{name} = ?" for name, value in filters.items() if value is not None]
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._connect() as connection:
+            cursor = connection.execute(
+                query + " ORDER BY created_at, fold",
+                [value for value in filters.values() if value is not None]
+            )
+            names = [description[0] for description in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+
+        for row in rows:
+            for name, score in json.loads(row.pop("scores")).items():
+                row[f"test_{name}"] = score
+        return pl.DataFrame(rows, infer_schema_length=None)
+
+    def summary(self, run_name: Optional[str] = None, data_hash: Optional[str] = None):
+        """
+        Mean fold scores and fit times of each candidate.
+
+        Args:
+            run_name: Only trials of this run
+            data_hash: Only trials on this training data
+
+        Returns:
+            pl.DataFrame: One row per run, training data and pipeline, newest first
+        """
+        trials = self.trials(run_name=run_name, data_hash=data_hash)
+        if trials.height == 0:
+            return trials
+        score_cols = [name for name in trials.columns if name.startswith("test_")]
+        return (trials
+            .group_by(["run_name", "data_hash", "pipeline_hash"])
+            .agg(
+                pl.col("model_type", "oversampler", "params").first(),
+                pl.col("created_at").max(),
+                pl.len().alias("n_folds_evaluated"),
+                pl.col("n_folds").first(),
+                pl.col("fit_time").mean().alias("mean_fit_time"),
+                *[pl.col(name).mean().alias(f"mean_{name}") for name in score_cols],
+            )
+            .sort("created_at", descending=True)
+        )
+
+class ResumableSearchCV(BaseEstimator):
+    """
+    Exhaustive grid search that stores each fold result in a TrialStore.
+
+    Before fitting, every candidate and fold is looked up in the store and
+    only the missing trials are fit, in parallel. Each trial is stored as
+    soon as it finishes, so a search that dies halfway resumes where it
+    stopped, and a search over an extended param_grid only fits the new
+    candidates and the trials that failed before. Trials are shared across
+    runs, estimators and searches that fit the same pipeline on the same
+    fold of the same data. Results follow the GridSearchCV contract:
+    best_params_, best_score_, best_estimator_ and cv_results_.
+
+    Args:
+        estimator: Estimator or pipeline to tune
+        param_grid: Parameter grid as for GridSearchCV
+        trial_store: TrialStore or path of its SQLite database
+        scoring: Scoring metric or dict of metrics as for GridSearchCV
+        refit: Metric optimized and refit on the full dataset
+        cv: Cross-validation folds
+        run_name: Name of the run stored with the new trials. Defaults to
+            the start time of the fit.
+        n_jobs: Number of parallel fits, -1 uses every core
+        verbose: Whether to print progress information
+    """
+
+    def __init__(
+        self,
+        estimator,
+        param_grid,
+        trial_store,
+        scoring=None,
+        refit=True,
+        cv=5,
+        run_name: str = None,
+        n_jobs: int = -1,
+        verbose: int = 0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.trial_store = trial_store
+        self.scoring = scoring
+        self.refit = refit
+        self.cv = cv
+        self.run_name = run_name
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def fit(self, X, y):
+        """
+        Fit the missing trials and refit the best candidate.
+
+        Args:
+            X: Predictors
+            y: Response
+
+        Returns:
+            ResumableSearchCV: The fitted search
+        """
+        store = (self.trial_store if isinstance(self.trial_store, TrialStore)
+                 else TrialStore(self.trial_store))
+        run_name = self.run_name or time.strftime("search_%Y%m%d_%H%M%S")
+        candidates = list(ParameterGrid(self.param_grid))
+
+        # Scorers by name and the metric that is optimized
+        if isinstance(self.scoring, dict):
+            scorers = {
+                name: check_scoring(self.estimator, scoring=scoring)
+                for name, scoring in self.scoring.items()
+            }
+            if self.refit not in scorers:
+                raise ValueError(f"refit must name one of the scoring metrics, got: {self.refit}")
+            refit_metric = self.refit
+        else:
+            scorers = {"score": check_scoring(self.estimator, scoring=self.scoring)}
+            refit_metric = "score"
+
+        cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
+        folds = list(cv.split(X, y))
+
+        # ==== Trial Keys ====
+        data_hash = training_data_hash(
+            X if isinstance(X, pd.DataFrame) else pd.DataFrame(X), y
+        )
+        fold_hashes = [_fold_hash(train_idx, test_idx) for train_idx, test_idx in folds]
+        trials = dict()
+        for candidate_idx, params in enumerate(candidates):
+            config = _pipeline_config(self.estimator, params)
+            for fold_idx, fold_hash in enumerate(fold_hashes):
+                trial_key = joblib.hash(
+                    [data_hash, fold_hash, config["pipeline_hash"], self.scoring]
+                )
+                trials[(candidate_idx, fold_idx)] = {
+                    "trial_key": trial_key,
+                    "run_name": run_name,
+                    "data_hash": data_hash,
+                    "fold_hash": fold_hash,
+                    "fold": fold_idx,
+                    "n_folds": len(folds),
+                    "params": params,
+                    **config,
+                }
+
+        stored = store.get([trial["trial_key"] for trial in trials.values()])
+        missing = [task for task, trial in trials.items() if trial["trial_key"] not in stored]
+        self.n_resumed_ = len(trials) - len(missing)
+        self.n_fitted_ = len(missing)
+        if self.verbose:
+            print(f"Found {self.n_resumed_}/{len(trials)} trials in {store.path}, "
+                  f"fitting {len(missing)}")
+
+        # ==== Fit Missing Trials ====
+        # Each trial is stored as it finishes so an interrupted search keeps its progress
+        results = Parallel(n_jobs=self.n_jobs, return_as="generator_unordered")(
+            delayed(_fit_score)(
+                clone(self.estimator), candidates[candidate_idx], X, y,
+                *folds[fold_idx], scorers, (candidate_idx, fold_idx)
+            )
+            for candidate_idx, fold_idx in missing
+        )
+        for task, result in results:
+            trial = {
+                **trials[task], **result,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            store.put(trial)
+            stored[trial["trial_key"]] = result
+
+        # ==== Results ====
+        trial_results = [
+            [stored[trials[(candidate_idx, fold_idx)]["trial_key"]]
+             for fold_idx in range(len(folds))]
+            for candidate_idx in range(len(candidates))
+        ]
+        self.cv_results_ = _cv_results(candidates, trial_results, scorers)
+        self.best_index_ = int(np.argmin(self.cv_results_[f"rank_test_{refit_metric}"]))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = self.cv_results_[f"mean_test_{refit_metric}"][self.best_index_]
+        self.scorer_ = scorers if isinstance(self.scoring, dict) else scorers["score"]
+        self.run_name_ = run_name
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X, y):
+        scorer = self.scorer_[self.refit] if isinstance(self.scorer_, dict) else self.scorer_
+        return scorer(self.best_estimator_, X, y)
+
+def _fold_hash(train_idx: np.ndarray, test_idx: np.ndarray) -> str:
+    """
+    SHA-256 of the train and test rows of a fold.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(np.asarray(train_idx, dtype=np.int64).tobytes())
+    hasher.update(b"|")
+    hasher.update(np.asarray(test_idx, dtype=np.int64).tobytes())
+    return hasher.hexdigest()
+
+def _pipeline_config(estimator, params: Dict) -> Dict:
+    """
+    Hashes and step names of the estimator with params set. The cache
+    memory of a pipeline does not change its results, so it is not hashed.
+    """
+    estimator = clone(estimator).set_params(**params)
+    if "memory" in estimator.get_params(deep=False):
+        estimator.set_params(memory=None)
+
+    steps = getattr(estimator, "named_steps", {})
+    preprocessor = steps.get("preprocessor")
+    oversampler = steps.get("oversampler")
+    classifier = steps.get("classifier", estimator)
+    return {
+        "pipeline_hash": joblib.hash(estimator),
+        "preprocessor_hash": joblib.hash(preprocessor),
+        "model_type": type(classifier).__name__,
+        "oversampler": ("passthrough" if oversampler in [None, "passthrough"]
+                        else type(oversampler).__name__),
+    }
+
+def _fit_score(estimator, params, X, y, train_idx, test_idx, scorers, task):
+    """
+    Fit a candidate on one fold and score the held out fold. Failed fits
+    score nan like GridSearchCV and record the error.
+    """
+    start = time.perf_counter()
+    try:
+        estimator = estimator.set_params(**params).fit(
+            _safe_indexing(X, train_idx), _safe_indexing(y, train_idx)
+        )
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        X_test = _safe_indexing(X, test_idx)
+        y_test = _safe_indexing(y, test_idx)
+        scores = {
+            name: float(scorer(estimator, X_test, y_test)) for name, scorer in scorers.items()
+        }
+        error = None
+    except Exception as exception:
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scores = {name: np.nan for name in scorers}
+        error = f"{type(exception).__name__}: {exception}"
+
+    return task, {
+        "scores": scores,
+        "fit_time": fit_time,
+        "score_time": time.perf_counter() - start,
+        "error": error,
+    }
+
+def _cv_results(candidates, trial_results, scorers) -> Dict:
+    """
+    GridSearchCV style cv_results_ of the candidates.
+    """
+    n_folds = len(trial_results[0])
+    fit_times = np.array([[trial["fit_time"] for trial in trials] for trials in trial_results])
+    score_times = np.array([[trial["score_time"] for trial in trials] for trials in trial_results])
+    cv_results = {
+        "params": candidates,
+        "mean_fit_time": fit_times.mean(axis=1),
+        "std_fit_time": fit_times.std(axis=1),
+        "mean_score_time": score_times.mean(axis=1),
+        "std_score_time": score_times.std(axis=1),
+    }
+    for name in sorted({name for params in candidates for name in params}):
+        cv_results[f"param_{name}"] = [params.get(name) for params in candidates]
+
+    for name in scorers:
+        scores = np.array(
+            [[trial["scores"][name] for trial in trials] for trials in trial_results],
+            dtype=float
+        )
+        for fold_idx in range(n_folds):
+            cv_results[f"split{fold_idx}_test_{name}"] = scores[:, fold_idx]
+        mean_scores = scores.mean(axis=1)
+        rank_scores = np.nan_to_num(mean_scores, nan=-np.inf)
+        cv_results[f"mean_test_{name}"] = mean_scores
+        cv_results[f"std_test_{name}"] = scores.std(axis=1)
+        cv_results[f"rank_test_{name}"] = (
+            np.argsort(np.argsort(-rank_scores, kind="stable"), kind="stable") + 1
+        )
+
+    return cv_results
@@ -0,0 +1,130 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from data_prep import merge_arm_strength_by_position, merge_by_positions, merge_sprint_by_position
+
+POSITIONS = ["mlb_person_id_CF", "mlb_person_id_RF"]
+
+
+@pytest.fixture
+def on_base_lf() -> pl.LazyFrame:
+  """
+  Plays with a null player ID and a repeated play.
+  """
+  return pl.LazyFrame(
+    {
+      "play_id": ["a", "b", "c", "d", "e", "a"],
+      "year": [2023, 2023, 2022, 2023, 2024, 2023],
+      "mlb_person_id_CF": [1, 3, 1, None, 4, 1],
+      "mlb_person_id_RF": [2, None, 4, 1, 3, 2],
+    },
+    schema_overrides={"mlb_person_id_CF": pl.Int64, "mlb_person_id_RF": pl.Int64},
+  )
+
+
+@pytest.fixture
+def player_data_lf() -> pl.LazyFrame:
+  """
+  Yearly player data with a duplicate player season (1, 2023), a season only reached with a
+  lookback of 1 (2, 2022), a gap beyond one season (3, 2020) and a current season row with a
+  null value (4, 2024).
+  """
+  return pl.LazyFrame(
+    {
+      "player_id": [1, 1, 1, 2, 3, 4, 4],
+      "curr_year": [2023, 2023, 2022, 2022, 2020, 2024, 2023],
+      "arm_overall": [80.0, 81.0, 78.0, 70.0, 60.0, None, 72.0],
+      "arm_max": [90.0, 91.0, 88.0, 75.0, 65.0, 85.0, 82.0],
+    }
+  )
+
+
+def merge_per_position(
+  on_base_lf: pl.LazyFrame,
+  player_data_lf: pl.LazyFrame,
+  position: str,
+  max_lookback_years: int,
+) -> pl.LazyFrame:
+  """
+  Reference merge with one left join on (player ID, year) per position and lookback season, as the
+  per position merges did before merge_by_positions. Duplicate player seasons keep the first row
+  and each play takes every value from the latest season found.
+  """
+  player_data_lf = player_data_lf.unique(
+    subset=["player_id", "curr_year"], keep="first", maintain_order=True
+  )
+  value_cols = [
+    col for col in player_data_lf.collect_schema().names() if col not in ["player_id", "curr_year"]
+  ]
+
+  merged_lf = on_base_lf
+  for lag in range(max_lookback_years + 1):
+    lag_lf = player_data_lf.select(
+      pl.col("player_id").alias(position),
+      (pl.col("curr_year") + lag).alias("year"),
+      pl.lit(True).alias(f"found_{lag}"),
+      *[pl.col(col).alias(f"{col}_{lag}") for col in value_cols],
+    )
+    merged_lf = merged_lf.join(lag_lf, on=[position, "year"], how="left", maintain_order="left")
+
+  value_exprs = list()
+  for col in value_cols:
+    value_expr = pl.when(pl.col("found_0")).then(pl.col(f"{col}_0"))
+    for lag in range(1, max_lookback_years + 1):
+      value_expr = value_expr.when(pl.col(f"found_{lag}")).then(pl.col(f"{col}_{lag}"))
+    value_exprs.append(value_expr.alias(f"{col}_{position}"))
+
+  return merged_lf.select(*on_base_lf.collect_schema().names(), *value_exprs)
+
+
+@pytest.mark.parametrize("max_lookback_years", [0, 1, 3])
+def test_matches_per_position_joins(on_base_lf, player_data_lf, max_lookback_years):
+  expected_lf = on_base_lf
+  for position in POSITIONS:
+    expected_lf = merge_per_position(expected_lf, player_data_lf, position, max_lookback_years)
+
+  merged_lf = merge_by_positions(on_base_lf, player_data_lf, POSITIONS, max_lookback_years)
+
+  assert_frame_equal(merged_lf.collect(), expected_lf.collect())
+
+
+@pytest.mark.parametrize(
+  "merge_func", [merge_sprint_by_position, merge_arm_strength_by_position]
+)
+def test_single_position_merges_match_per_position_joins(
+  on_base_lf, player_data_lf, merge_func
+):
+  expected_lf = merge_per_position(on_base_lf, player_data_lf, "mlb_person_id_CF", 1)
+
+  merged_lf = merge_func(on_base_lf, player_data_lf, "mlb_person_id_CF", 1)
+
+  assert_frame_equal(merged_lf.collect(), expected_lf.collect())
+
+
+def test_merged_values(on_base_lf, player_data_lf):
+  merged_pl = merge_by_positions(on_base_lf, player_data_lf, POSITIONS, 1).collect()
+
+  # Every play is kept once, in order
+  assert merged_pl.get_column("play_id").to_list() == ["a", "b", "c", "d", "e", "a"]
+  # Duplicate player season keeps the first row
+  assert merged_pl.get_column("arm_overall_mlb_person_id_CF").to_list()[0] == 80.0
+  # Season one year back is used
+  assert merged_pl.get_column("arm_max_mlb_person_id_RF").to_list()[0] == 75.0
+  # Gap beyond max_lookback_years and null player ID are not merged
+  assert merged_pl.get_column("arm_max_mlb_person_id_CF").to_list()[1] is None
+  assert merged_pl.get_column("arm_max_mlb_person_id_CF").to_list()[3] is None
+  assert merged_pl.get_column("arm_max_mlb_person_id_RF").to_list()[1] is None
+  # Null value of the current season is not filled from an earlier season
+  assert merged_pl.get_column("arm_overall_mlb_person_id_CF").to_list()[4] is None
+  assert merged_pl.get_column("arm_max_mlb_person_id_CF").to_list()[4] == 85.0
+
+  merged_pl = merge_by_positions(on_base_lf, player_data_lf, POSITIONS, 3).collect()
+
+  # Gap is reached with a deeper lookback
+  assert merged_pl.get_column("arm_max_mlb_person_id_CF").to_list()[1] == 65.0
+
+
+def test_negative_lookback_raises(on_base_lf, player_data_lf):
+  with pytest.raises(ValueError):
+    merge_by_positions(on_base_lf, player_data_lf, POSITIONS, -1)